@@ -0,0 +1,223 @@
+# aggregates.py
+"""Pre-aggregated salary cube for the dashboard, analytics and report endpoints.
+
+Rows are collapsed once per dataset version into cells (one per distinct
+Year × Sector × Location × Company_Name × Rating combination) holding the
+Avg_Salary sum and row count. A filter is expressed as a boolean mask over
+each dimension's categories, so answering it touches cells, never rows.
+Appended postings are folded into the cells in place of a rebuild.
+"""
+import copy
+import numpy as np
+import pandas as pd
+from datastore import incremental
+
+CUBE_DIMENSIONS = ["Year", "Sector", "Location", "Company_Name", "Rating"]
+MEASURE = "Avg_Salary"
+
+
+class AggregateCube:
+    """Sum/count of Avg_Salary per dimension cell."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.dimensions = [d for d in CUBE_DIMENSIONS if d in df.columns]
+        self.n_rows = len(df)
+
+        # Category codes in first-appearance order (matches Series.unique());
+        # `_sorted` gives the order pandas groupby would report groups in.
+        self._categories = {}
+        self._sorted = {}
+        self.row_codes = {}
+        for dim in self.dimensions:
+            codes, uniques = pd.factorize(df[dim], sort=False, use_na_sentinel=False)
+            categories = np.empty(len(uniques), dtype=object)
+            categories[:] = list(uniques)  # plain Python scalars, JSON-serializable
+            self._categories[dim] = categories
+            self._sorted[dim] = np.array(sorted(range(len(categories)), key=lambda i: categories[i]),
+                                         dtype=np.intp)
+            self.row_codes[dim] = codes.astype(np.int32)
+
+        salary = df[MEASURE].to_numpy(dtype=float) if MEASURE in df.columns else np.zeros(self.n_rows)
+        if self.dimensions and self.n_rows:
+            keys = np.column_stack([self.row_codes[d] for d in self.dimensions])
+            cells, self.row_cell = np.unique(keys, axis=0, return_inverse=True)
+            self.row_cell = self.row_cell.reshape(-1)
+        else:
+            cells = np.zeros((1 if self.n_rows else 0, len(self.dimensions)), dtype=np.int32)
+            self.row_cell = np.zeros(self.n_rows, dtype=np.intp)
+        self.cell_codes = {d: cells[:, i] for i, d in enumerate(self.dimensions)}
+        self.n_cells = len(cells)
+        self.sum = np.bincount(self.row_cell, weights=salary, minlength=self.n_cells)
+        self.count = np.bincount(self.row_cell, minlength=self.n_cells).astype(np.int64)
+        self._lookup = None
+
+    # ---------------- Appending ----------------
+    def extended(self, delta: pd.DataFrame) -> "AggregateCube":
+        """New cube with `delta` rows added; existing cells are never re-grouped.
+
+        Values are mapped to codes and rows to cells through dictionaries shared
+        along the append chain, so hashing/grouping work is proportional to
+        len(delta); existing arrays are only extended.
+        """
+        lookup = self._lookup
+        if lookup is None or lookup.n_rows != self.n_rows:
+            lookup = _CubeLookup(self)
+        new = copy.copy(self)
+        new._categories, new._sorted, new.row_codes = dict(self._categories), dict(self._sorted), dict(self.row_codes)
+        n = len(delta)
+        new.n_rows = self.n_rows + n
+
+        delta_codes = []
+        for dim in self.dimensions:
+            index = lookup.codes[dim]
+            codes = np.empty(n, dtype=np.int32)
+            added = []
+            for i, value in enumerate(delta[dim].astype(object).tolist()):
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(self._categories[dim]) + len(added)
+                    added.append(value)
+                codes[i] = code
+            if added:
+                extra = np.empty(len(added), dtype=object)
+                extra[:] = added
+                categories = np.concatenate([self._categories[dim], extra])
+                new._categories[dim] = categories
+                new._sorted[dim] = np.array(sorted(range(len(categories)), key=lambda i: categories[i]),
+                                            dtype=np.intp)
+            new.row_codes[dim] = np.concatenate([self.row_codes[dim], codes])
+            delta_codes.append(codes.tolist())
+
+        delta_cells = np.empty(n, dtype=np.intp)
+        added = []
+        for i, key in enumerate(zip(*delta_codes)):
+            cell = lookup.cells.get(key)
+            if cell is None:
+                cell = lookup.cells[key] = self.n_cells + len(added)
+                added.append(key)
+            delta_cells[i] = cell
+        added = np.array(added, dtype=np.int32).reshape(-1, len(self.dimensions))
+        new.cell_codes = {d: np.concatenate([self.cell_codes[d], added[:, i]])
+                          for i, d in enumerate(self.dimensions)}
+        new.n_cells = self.n_cells + len(added)
+        new.row_cell = np.concatenate([self.row_cell, delta_cells])
+
+        salary = delta[MEASURE].to_numpy(dtype=float) if MEASURE in delta.columns else np.zeros(n)
+        new.sum = np.concatenate([self.sum, np.zeros(len(added))])
+        new.count = np.concatenate([self.count, np.zeros(len(added), dtype=np.int64)])
+        np.add.at(new.sum, delta_cells, salary)
+        np.add.at(new.count, delta_cells, 1)
+
+        lookup.n_rows = new.n_rows
+        new._lookup = lookup
+        return new
+
+    # ---------------- Selection ----------------
+    def categories(self, dim):
+        """Distinct values of a dimension (first-appearance order, same as codes)."""
+        return self._categories[dim]
+
+    def category_mask(self, dim, predicate):
+        """Boolean mask over a dimension's categories from a per-value predicate."""
+        values = self._categories[dim]
+        return np.fromiter((bool(predicate(v)) for v in values), dtype=bool, count=len(values))
+
+    def code_mask(self, dim, codes):
+        """Boolean mask over a dimension's categories with `codes` set."""
+        mask = np.zeros(len(self._categories[dim]), dtype=bool)
+        mask[codes] = True
+        return mask
+
+    def select(self, **masks):
+        """Boolean mask over cells; each kwarg is a category mask (None = no filter)."""
+        sel = np.ones(self.n_cells, dtype=bool)
+        for dim, mask in masks.items():
+            if mask is not None:
+                sel &= mask[self.cell_codes[dim]]
+        return sel
+
+    def row_mask(self, **masks):
+        """Boolean mask over rows for the same category masks as select()."""
+        sel = np.ones(self.n_rows, dtype=bool)
+        for dim, mask in masks.items():
+            if mask is not None:
+                sel &= mask[self.row_codes[dim]]
+        return sel
+
+    # ---------------- Aggregation ----------------
+    def total(self, cells=None):
+        """(row count, salary sum) of the selected cells."""
+        if cells is None:
+            return int(self.count.sum()), float(self.sum.sum())
+        return int(self.count[cells].sum()), float(self.sum[cells].sum())
+
+    def _group(self, dim, cells):
+        codes = self.cell_codes[dim] if cells is None else self.cell_codes[dim][cells]
+        n = len(self._categories[dim])
+        sums = np.bincount(codes, weights=self.sum if cells is None else self.sum[cells], minlength=n)
+        counts = np.bincount(codes, weights=self.count if cells is None else self.count[cells], minlength=n)
+        return sums, counts.astype(np.int64)
+
+    def mean_columns(self, dim, cells=None, label=MEASURE):
+        """{dim: values, label: means} arrays in groupby order, observed groups only."""
+        sums, counts = self._group(dim, cells)
+        order = self._sorted[dim][counts[self._sorted[dim]] > 0]
+        return {dim: self._categories[dim][order], label: sums[order] / counts[order]}
+
+    def mean_by(self, dim, cells=None, label=MEASURE):
+        """Records [{dim: value, label: mean}] in groupby order, observed groups only."""
+        return _records(self.mean_columns(dim, cells, label))
+
+    def top_mean_columns(self, dim, cells=None, n=10, label=MEASURE):
+        """Highest-mean groups, like groupby().mean().sort_values(ascending=False).head(n)."""
+        columns = self.mean_columns(dim, cells, label)
+        order = np.argsort(-columns[label], kind="stable")[:n]
+        return {k: v[order] for k, v in columns.items()}
+
+    def top_mean_by(self, dim, cells=None, n=10, label=MEASURE):
+        """Records form of top_mean_columns()."""
+        return _records(self.top_mean_columns(dim, cells, n, label))
+
+    def counts_columns(self, dim, cells=None, n=None, label="Count"):
+        """{dim: values, label: rows} by descending count, like value_counts()."""
+        _, counts = self._group(dim, cells)
+        order = np.argsort(-counts, kind="stable")
+        order = order[counts[order] > 0][:n]
+        return {dim: self._categories[dim][order], label: counts[order]}
+
+    def counts_by(self, dim, cells=None, n=None, label="Count"):
+        """Records [{dim: value, label: rows}] by descending count, like value_counts()."""
+        return _records(self.counts_columns(dim, cells, n, label))
+
+    def top_value(self, dim, cells=None, default="-"):
+        """Most frequent value of a dimension (value_counts().idxmax())."""
+        top = self.counts_by(dim, cells, n=1)
+        return top[0][dim] if top else default
+
+
+def _records(columns):
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(v.tolist() for v in columns.values()))]
+
+
+class _CubeLookup:
+    """Value → code and cell key → cell id maps, shared along one append chain.
+
+    Only the newest cube of a chain may extend through it (n_rows marks which).
+    """
+
+    def __init__(self, cube):
+        self.n_rows = cube.n_rows
+        self.codes = {d: {v: i for i, v in enumerate(cube.categories(d).tolist())} for d in cube.dimensions}
+        keys = zip(*(cube.cell_codes[d].tolist() for d in cube.dimensions))
+        self.cells = {key: i for i, key in enumerate(keys)}
+
+
+def build_cube(dataset) -> AggregateCube:
+    """Dataset.derived() builder: one cube per dataset version."""
+    return AggregateCube(dataset.frame(CUBE_DIMENSIONS + [MEASURE]))
+
+
+@incremental("cube")
+def extend_cube(cube, delta, dataset):
+    return cube.extended(delta)
@@ -1,176 +1,261 @@
 # app.py
-from flask import Flask, render_template, jsonify, request, make_response
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
-import pandas as pd, os, io, sqlite3, json
+from flask import Flask, render_template, jsonify, request, make_response, Response, stream_with_context, g
+import os, io, csv, json, time, codecs, logging, hashlib, tempfile, functools
 from datetime import datetime
-from fuzzywuzzy import fuzz, process
 import numpy as np
+from datastore import DatasetStore
+from model_registry import ModelRegistry
+from aggregates import build_cube
+from skills_index import build_skills_index, build_cell_skills, masked_sum
+from matcher import build_matchers
+from filters import build_filter_engine
+from suggest import FIELD_ALIASES, build_suggesters
+from predictions_db import PredictionStore, PUBLIC_COLUMNS
+from ingest import append_postings
+from response_cache import ResponseCache, normalize_params
+from recommender import build_recommender, role_map_key
+from percentiles import build_salary_sketches, HISTOGRAM_BINS
+from sort_index import SORTABLE_COLUMNS, sort_index_builder
+from prediction_cache import PredictionCache, prediction_key, normalize_rating, normalize_skills
+from csv_stream import iter_csv, iter_frame_csv, gzip_chunks
+from instrumentation import METRICS, PROFILER, configure_logging, set_route, stage
+from serialize import json_response, shaper, wants_columns
+from warmup import WarmupWorker, WARMUP_INTERVAL
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config["JSON_SORT_KEYS"] = False
 
+# Leveled logging ($LOG_LEVEL, default INFO), written by a background listener
+configure_logging()
+log = logging.getLogger(__name__)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, "data", "data_analyst_jobs.csv")
-PRED_DB_PATH = os.path.join(BASE_DIR, "data", "predictions.db")  # DB file
+# $PORTAL_DATA_DIR / $PORTAL_MODEL_DIR point the app elsewhere (e.g. benchmark.py's temp dirs)
+DATA_DIR = os.environ.get("PORTAL_DATA_DIR") or os.path.join(BASE_DIR, "data")
+MODEL_DIR = os.environ.get("PORTAL_MODEL_DIR") or os.path.join(BASE_DIR, "model")
+DATA_PATH = os.path.join(DATA_DIR, "data_analyst_jobs.csv")
+PRED_DB_PATH = os.path.join(DATA_DIR, "predictions.db")  # DB file
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshot")  # compiled by snapshot.py
+DELTA_PATH = os.path.join(DATA_DIR, "postings.delta.ndjson")  # appended by ingest.py
 
 # ---------------- Ensure data folder exists ----------------
-os.makedirs(os.path.join(BASE_DIR, "data"), exist_ok=True)
-
-# ---------------- SQLite helper: init DB ----------------
-def init_pred_db():
-    """Create predictions DB & table if missing."""
-    conn = sqlite3.connect(PRED_DB_PATH, check_same_thread=False)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS predictions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT,
-            job_title TEXT,
-            sector TEXT,
-            rating REAL,
-            location TEXT,
-            skills TEXT,
-            predicted_salary INTEGER,
-            min_salary INTEGER,
-            max_salary INTEGER,
-            confidence INTEGER,
-            recommendations TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def save_prediction_row(row: dict):
-    """Insert a prediction dict into SQLite predictions table."""
-    conn = sqlite3.connect(PRED_DB_PATH, check_same_thread=False)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO predictions (
-            ts, job_title, sector, rating, location, skills,
-            predicted_salary, min_salary, max_salary, confidence, recommendations
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?)
-    """, (
-        row.get("ts"),
-        row.get("job_title"),
-        row.get("sector"),
-        row.get("rating"),
-        row.get("location"),
-        row.get("skills"),
-        int(row.get("predicted_salary")),
-        int(row.get("min_salary")),
-        int(row.get("max_salary")),
-        int(row.get("confidence")),
-        json.dumps(row.get("recommendations", []), ensure_ascii=False)
-    ))
-    conn.commit()
-    conn.close()
-
-def query_predictions(limit=200, start=None, end=None, sector=None, location=None):
-    """Return list of prediction rows as dicts with optional filters."""
-    conn = sqlite3.connect(PRED_DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    sql = "SELECT * FROM predictions WHERE 1=1"
-    params = []
-
-    if start:
-        sql += " AND ts >= ?"
-        params.append(start)
-    if end:
-        sql += " AND ts <= ?"
-        params.append(end)
-    if sector:
-        sql += " AND lower(sector) LIKE ?"
-        params.append(f"%{sector.lower()}%")
-    if location:
-        sql += " AND lower(location) LIKE ?"
-        params.append(f"%{location.lower()}%")
-
-    sql += " ORDER BY ts DESC LIMIT ?"
-    params.append(int(limit))
-
-    cur.execute(sql, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    # parse recommendations JSON string back to list
-    for r in rows:
-        try:
-            r["recommendations"] = json.loads(r["recommendations"]) if r.get("recommendations") else []
-        except Exception:
-            r["recommendations"] = []
-    return rows
+os.makedirs(DATA_DIR, exist_ok=True)
 
-# initialize DB at start
-init_pred_db()
+# ---------------- Predictions DB ----------------
+# WAL + a bounded connection pool; inserts are group-committed by a background writer.
+PREDICTIONS = PredictionStore(PRED_DB_PATH)
 
 # ---------------- Load and clean dataset ----------------
-def load_df():
-    if not os.path.exists(DATA_PATH):
-        print("⚠️ Data file not found:", DATA_PATH)
-        return pd.DataFrame()
-
-    try:
-        df = pd.read_csv(DATA_PATH, encoding="utf-8")
-    except Exception:
-        df = pd.read_csv(DATA_PATH, encoding="latin1")
-
-    df.columns = [c.strip() for c in df.columns]
-
-    # Normalize numeric columns
-    for col in ["Avg_Salary", "Min_Salary", "Max_Salary", "Rating"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-    # Fill text fields
-    for col in ["Skills", "Sector", "Location", "Company_Name"]:
-        if col in df.columns:
-            df[col] = df[col].fillna("Unknown")
-
-    # Derive year
-    if "Date" in df.columns:
-        df["Year"] = pd.to_datetime(df["Date"], errors="coerce").dt.year.fillna(2023).astype(int)
-    elif "Year" not in df.columns:
-        df["Year"] = 2023
+# Parsed and normalized once per file version (or memory-mapped from a compiled
+# snapshot), plus postings appended since; see datastore.DatasetStore.
+DATASET = DatasetStore(DATA_PATH, snapshot_dir=SNAPSHOT_DIR, delta_path=DELTA_PATH)
+
+def load_df(columns=None):
+    """Return the cached dataset frame with only `columns` (read-only, shared across requests)."""
+    return DATASET.get(columns)
+
+def current_dataset(ds=None):
+    """`ds` if given (e.g. a version being prepared), else the current dataset."""
+    return DATASET.current() if ds is None else ds
+
+def get_cube(ds=None):
+    """Aggregate cube for the current dataset version (built once per version)."""
+    return current_dataset(ds).derived("cube", build_cube)
+
+def get_filters(ds=None):
+    """Shared category-mask filter engine for the current dataset version."""
+    return current_dataset(ds).derived("filters", build_filter_engine)
+
+def get_matchers(ds=None):
+    """Fuzzy matchers for the analytics filter columns (per dataset version)."""
+    ds = current_dataset(ds)
+    return ds.derived("matchers", lambda _: build_matchers(ds.derived("cube", build_cube)))
+
+def get_suggesters(ds=None):
+    """Per-field suggestion indexes for the current dataset version."""
+    ds = current_dataset(ds)
+    return ds.derived("suggesters", lambda _: build_suggesters(ds, ds.derived("cube", build_cube),
+                                                               ds.derived("skills", build_skills_index)))
+
+def get_skills_index(ds=None):
+    """Tokenized skills index for the current dataset version."""
+    return current_dataset(ds).derived("skills", build_skills_index)
+
+def build_filter_options(ds):
+    """Sorted distinct Year / Sector / Location values for the filter drop-downs."""
+    df = ds.frame(["Year", "Sector", "Location"])
+    if df.empty:
+        return {"years": [], "sectors": [], "locations": []}
+    return {"years": sorted(df["Year"].dropna().unique().tolist()),
+            "sectors": sorted(df["Sector"].dropna().astype(str).unique().tolist()),
+            "locations": sorted(df["Location"].dropna().astype(str).unique().tolist())}
+
+def get_salary_sketches(ds=None):
+    """Per Year × Sector × Location salary quantile sketches for the current dataset version."""
+    return current_dataset(ds).derived("salary_sketches", build_salary_sketches)
+
+def get_sort_index(column, ds=None):
+    """Precomputed ascending/descending row orders of a sortable column (per dataset version)."""
+    return current_dataset(ds).derived(("sort_index", column), sort_index_builder(column))
+
+def get_filter_options(ds=None):
+    return current_dataset(ds).derived("filter_options", build_filter_options)
+
+def cell_skill_counts(cells=None):
+    """Per-skill counts for the cube cells selected by `cells` (all rows when None)."""
+    ds = DATASET.current()
+    if cells is None:
+        return ds.derived("skills", build_skills_index).totals
+    return masked_sum(ds.derived("cell_skills", build_cell_skills), cells)
+
+# ---------------- Salary model ----------------
+# Published by train_model.py (hot-swapped on change) or fitted once per dataset version.
+MODELS = ModelRegistry(DATASET, MODEL_DIR)
+MODELS.refresh()
+
+# ---------------- Response cache ----------------
+# Read-only endpoints are served from cached JSON bytes until the dataset or model changes.
+RESPONSES = ResponseCache()
+# Single-profile predictions, keyed by normalized input and dropped on model change
+PREDICTION_CACHE = PredictionCache()
+
+def data_version():
+    """Token that changes whenever the dataset, the served model or the role map changes."""
+    return f"{DATASET.current().fingerprint}|{MODELS.version()}|{role_map_key()}"
+
+def cached_json(view):
+    """Cache a JSON view's 200 responses per (endpoint, normalized params, data version).
+
+    Responses carry a strong ETag; a matching If-None-Match gets a 304. The
+    negotiated payload shape (records or columns) is part of the key.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        params = request.get_json(silent=True) if request.method == "POST" else request.args.to_dict()
+        if isinstance(params, dict):
+            params.pop("format", None)
+        key = (request.endpoint, normalize_params(params if isinstance(params, dict) else {}), wants_columns(request))
+        version = data_version()
+        entry = RESPONSES.get(version, key)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            entry = RESPONSES.put(version, key, response.get_data(), response.mimetype)
+        etag, body, mimetype = entry
+        if etag in request.if_none_match:
+            response = make_response("", 304)
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.cache_control.no_cache = True  # always revalidate; 304s are cheap
+        response.vary.add("Accept")
+        return response
+    return wrapper
+
+# ---------------- Instrumentation ----------------
+# Per-route latency histograms and stage timings, served on /metrics.
+if os.environ.get("PORTAL_PROFILE", "").lower() in ("1", "true", "yes"):
+    PROFILER.start()
+
+def route_label():
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    set_route(route_label())
+
+def record_request(status):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = route_label()
+        METRICS.observe("request_duration_seconds", time.perf_counter() - started,
+                        "Handler latency by route (streamed bodies: time to first byte).",
+                        route=route, method=request.method)
+        METRICS.inc("requests_total", 1, "Requests by route and status.",
+                    route=route, method=request.method, status=status)
+
+@app.after_request
+def finish_request_timer(response):
+    record_request(response.status_code)
+    return response
 
-    return df
+@app.teardown_request
+def clear_request_timer(exc):
+    record_request(500)  # only still pending if the handler raised
+    set_route(None)
+
+@METRICS.gauge
+def cache_and_model_gauges():
+    caches = [("responses", RESPONSES.stats()), ("predictions", PREDICTION_CACHE.stats())]
+    ds = DATASET.current()
+    if not ds.empty:
+        info = ds.derived("filters", build_filter_engine).contains.cache_info()
+        caches.append(("filter_masks", {"hits": info.hits, "misses": info.misses, "entries": info.currsize}))
+    for name, stats in caches:
+        lookups = stats["hits"] + stats["misses"]
+        yield "cache_hits", {"cache": name}, stats["hits"]
+        yield "cache_misses", {"cache": name}, stats["misses"]
+        yield "cache_hit_ratio", {"cache": name}, round(stats["hits"] / lookups, 4) if lookups else 0
+        yield "cache_entries", {"cache": name}, stats["entries"]
+    yield "model_info", {"version": MODELS.version()}, 1
+    yield "dataset_rows", {"version": (ds.fingerprint or "")[:12]}, len(ds)
+    yield "profiler_running", {}, int(PROFILER.running)
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus text format: latency histograms, stage timings, cache ratios, model version."""
+    return Response(METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/metrics/profile", methods=["GET", "POST"])
+def metrics_profile():
+    """Sampling profiler. POST {"enabled": true|false, "interval_ms": 5} toggles it;
+    GET returns the collapsed stacks sampled so far (?format=json for status only)."""
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        if payload.get("enabled"):
+            interval = payload.get("interval_ms")
+            PROFILER.start(interval=float(interval) / 1000 if interval else None,
+                           reset=payload.get("reset", True))
+        else:
+            PROFILER.stop()
+        return jsonify(PROFILER.status())
+    if request.args.get("format") == "json":
+        return jsonify(PROFILER.status())
+    return Response(PROFILER.collapsed(), mimetype="text/plain")
 
 # ---------------- ROUTES ----------------
 @app.route("/")
 def home():
-    print("🏠 Home Page Accessed")
+    log.debug("🏠 Home Page Accessed")
     return render_template("home.html")
 
 @app.route("/dashboard")
 def dashboard():
-    print("📊 Dashboard Page Accessed")
+    log.debug("📊 Dashboard Page Accessed")
     return render_template("dashboard.html")
 
 @app.route("/analytics")
 def analytics():
-    print("📈 Analytics Page Accessed")
-    df = load_df()
-    years = sorted(df["Year"].dropna().unique().tolist()) if not df.empty else []
-    sectors = sorted(df["Sector"].dropna().unique().tolist()) if not df.empty else []
-    locations = sorted(df["Location"].dropna().unique().tolist()) if not df.empty else []
-    return render_template("analytics.html", years=years, sectors=sectors, locations=locations)
+    log.debug("📈 Analytics Page Accessed")
+    return render_template("analytics.html", **get_filter_options())
 
 @app.route("/reports")
 def reports():
-    print("📑 Reports Page Accessed")
+    log.debug("📑 Reports Page Accessed")
     return render_template("reports.html")
 
 @app.route("/predictor")
 def predictor():
-    print("🤖 Predictor Page Accessed")
+    log.debug("🤖 Predictor Page Accessed")
     return render_template("predictor.html")
 
 # ---------------- DASHBOARD SUMMARY ----------------
 @app.route("/api/summary")
+@cached_json
 def api_summary():
-    df = load_df()
-    if df.empty:
+    if DATASET.current().empty:
         return jsonify({
             "summary": {
                 "total_records": 0,
@@ -184,30 +269,38 @@ def api_summary():
             "skills_data": []
         })
 
-    summary = {
-        "total_records": len(df),
-        "avg_salary": int(df["Avg_Salary"].mean()),
-        "top_sector": df["Sector"].value_counts().idxmax() if "Sector" in df.columns and not df["Sector"].empty else "-",
-        "top_state": df["Location"].value_counts().idxmax() if "Location" in df.columns and not df["Location"].empty else "-"
-    }
+    with stage("load"):
+        cube = get_cube()
+        skills = get_skills_index()
+        shape = shaper(wants_columns(request))
+
+    with stage("groupby"):
+        total, salary_sum = cube.total()
+        summary = {
+            "total_records": total,
+            "avg_salary": int(salary_sum / total),
+            "top_sector": cube.top_value("Sector"),
+            "top_state": cube.top_value("Location")
+        }
 
-    by_year = df.groupby("Year", as_index=False)["Avg_Salary"].mean().sort_values("Year").to_dict(orient="records")
-    by_state = df.groupby("Location", as_index=False)["Avg_Salary"].mean().sort_values("Avg_Salary", ascending=False).head(10).to_dict(orient="records")
-    by_company = df.groupby("Company_Name", as_index=False)["Avg_Salary"].mean().sort_values("Avg_Salary", ascending=False).head(10).to_dict(orient="records")
+        by_year = shape(cube.mean_columns("Year"))
+        by_state = shape(cube.top_mean_columns("Location", n=10))
+        by_company = shape(cube.top_mean_columns("Company_Name", n=10))
 
-    skills_series = df["Skills"].astype(str).str.replace(";", ",").str.split(",").explode().str.strip()
-    skills_data = skills_series.value_counts().head(8).rename_axis("Skill").reset_index(name="Count").to_dict(orient="records")
+        skills_data = shape(skills.top_columns(n=8))
 
-    return jsonify({
-        "summary": summary,
-        "by_year": by_year,
-        "by_state": by_state,
-        "by_company": by_company,
-        "skills_data": skills_data
-    })
+    with stage("serialize"):
+        return json_response({
+            "summary": summary,
+            "by_year": by_year,
+            "by_state": by_state,
+            "by_company": by_company,
+            "skills_data": skills_data
+        })
 
 # ---------------- ANALYTICS FILTER ----------------
 @app.route("/api/analytics_filter", methods=["POST"])
+@cached_json
 def api_analytics_filter():
     payload = request.get_json() or {}
 
@@ -215,82 +308,171 @@ def api_analytics_filter():
     sector_in = str(payload.get("sector", "")).strip().lower()
     location_in = str(payload.get("location", "")).strip().lower()
 
-    print("📦 Analytics Filter Payload →", payload)
+    log.debug("📦 Analytics Filter Payload → %s", payload)
 
-    df = load_df()
-    if df.empty:
+    if DATASET.current().empty:
         return jsonify({"error": "Dataset unavailable"}), 404
 
-    dff = df.copy()
-
-    # 1) YEAR — Partial + Fuzzy
-    if year_in:
-        all_years = df["Year"].astype(str).unique().tolist()
-        best_year = process.extractOne(year_in, all_years, scorer=fuzz.partial_ratio)
-        if best_year and best_year[1] >= 60:
-            year_match = best_year[0]
-            print(f"🎯 Matched Year → {year_match}")
-            dff = dff[dff["Year"].astype(str) == str(year_match)]
-        else:
-            print("⚠️ No year match → using full data")
-
-    # 2) SECTOR — Partial + Fuzzy
-    if sector_in:
-        sectors = df["Sector"].astype(str).str.lower().unique().tolist()
-        best_sector = process.extractOne(sector_in, sectors, scorer=fuzz.partial_ratio)
-        if best_sector and best_sector[1] >= 55:
-            sec_match = best_sector[0]
-            print(f"🎯 Matched Sector → {sec_match}")
-            dff = dff[dff["Sector"].astype(str).str.lower() == sec_match]
-        else:
-            print("⚠️ No sector match → using partial search")
-            dff = dff[dff["Sector"].astype(str).str.lower().str.contains(sector_in, na=False)]
-
-    # 3) LOCATION — Partial + Fuzzy
-    if location_in:
-        locations = df["Location"].astype(str).str.lower().unique().tolist()
-        best_location = process.extractOne(location_in, locations, scorer=fuzz.partial_ratio)
-        if best_location and best_location[1] >= 55:
-            loc_match = best_location[0]
-            print(f"🎯 Matched Location → {loc_match}")
-            dff = dff[dff["Location"].astype(str).str.lower() == loc_match]
-        else:
-            print("⚠️ No location fuzzy match → using partial search")
-            dff = dff[dff["Location"].astype(str).str.lower().str.contains(location_in, na=False)]
+    with stage("load"):
+        filters = get_filters()
+        cube = filters.cube
+        matchers = get_matchers()
+        skills = get_skills_index()
+
+    with stage("filter"):
+        masks = {}
+
+        # 1) YEAR — Partial + Fuzzy
+        if year_in:
+            best_year = matchers["Year"].match(year_in, 60)
+            if best_year:
+                year_match = best_year[0]
+                log.debug("🎯 Matched Year → %s", year_match)
+                masks["Year"] = filters.codes("Year", matchers["Year"].codes(year_match))
+            else:
+                log.debug("No year match → using full data")
+
+        # 2) SECTOR — Partial + Fuzzy
+        if sector_in:
+            best_sector = matchers["Sector"].match(sector_in, 55)
+            if best_sector:
+                sec_match = best_sector[0]
+                log.debug("🎯 Matched Sector → %s", sec_match)
+                masks["Sector"] = filters.codes("Sector", matchers["Sector"].codes(sec_match))
+            else:
+                log.debug("No sector match → using partial search")
+                masks["Sector"] = filters.codes("Sector", matchers["Sector"].codes(matchers["Sector"].contains(sector_in)))
+
+        # 3) LOCATION — Partial + Fuzzy
+        if location_in:
+            best_location = matchers["Location"].match(location_in, 55)
+            if best_location:
+                loc_match = best_location[0]
+                log.debug("🎯 Matched Location → %s", loc_match)
+                masks["Location"] = filters.codes("Location", matchers["Location"].codes(loc_match))
+            else:
+                log.debug("No location fuzzy match → using partial search")
+                masks["Location"] = filters.codes("Location", matchers["Location"].codes(matchers["Location"].contains(location_in)))
 
-    print(f"🔍 Filtered {len(dff)} rows out of {len(df)}")
+        cells = filters.cells(masks)
+        matched, _ = cube.total(cells)
+    log.debug("🔍 Filtered %d rows out of %d", matched, cube.n_rows)
 
     # fallback: return full dataset when empty (helps UX)
-    if dff.empty:
-        print("⚠️ No match → Returning full dataset instead")
-        dff = df.copy()
-
-    result = {
-        "by_sector": dff.groupby("Sector", as_index=False)["Avg_Salary"].mean().to_dict(orient="records"),
-        "by_skills": dff["Skills"].dropna().astype(str).str.replace(";", ",").str.split(",").explode().str.strip()
-                     .value_counts().head(10).rename_axis("Skill").reset_index(name="Count").to_dict(orient="records"),
-        "by_rating": dff.groupby("Rating", as_index=False)["Avg_Salary"].mean().to_dict(orient="records"),
-        "by_year": dff.groupby("Year", as_index=False)["Avg_Salary"].mean().to_dict(orient="records")
-    }
+    if matched == 0:
+        log.debug("No match → Returning full dataset instead")
+        masks, cells = {}, None
+
+    with stage("groupby"):
+        shape = shaper(wants_columns(request))
+        result = {
+            "by_sector": shape(cube.mean_columns("Sector", cells)),
+            "by_skills": shape(skills.top_columns(cell_skill_counts(cells), n=10)),
+            "by_rating": shape(cube.mean_columns("Rating", cells)),
+            "by_year": shape(cube.mean_columns("Year", cells))
+        }
+
+    with stage("serialize"):
+        return json_response(result)
+
+# ---------------- SALARY PERCENTILES ----------------
+PERCENTILE_GROUPS = {"year": "Year", "sector": "Sector", "location": "Location", "state": "Location"}
+
+@app.route("/api/salary_percentiles", methods=["GET", "POST"])
+@cached_json
+def api_salary_percentiles():
+    """p10/p25/p50/p75/p90 and a histogram of Avg_Salary for the filtered postings.
+
+    Params (JSON body or query): year, sector, location (substring filters, as in
+    reports), group_by (comma-separated year/sector/location) and bins.
+    """
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    try:
+        group_by = [PERCENTILE_GROUPS[name.strip().lower()] for name in str(params.get("group_by") or "").split(",")
+                    if name.strip()]
+        bins = max(1, min(int(params.get("bins") or HISTOGRAM_BINS), 200))
+    except (KeyError, ValueError):
+        return jsonify({"error": "group_by must be year, sector and/or location; bins an integer"}), 400
+
+    ds = DATASET.current()
+    if ds.empty:
+        return jsonify({"error": "No data"}), 404
+
+    with stage("load"):
+        filters = get_filters(ds)
+        sketches = get_salary_sketches(ds)
+
+    with stage("filter"):
+        masks = filters.report_masks(year=params.get("year"), sector=params.get("sector"),
+                                     location=params.get("location"))
+        cells = sketches.select(masks) if masks else None
 
-    return jsonify(result)
+    with stage("groupby"):
+        result = sketches.summary(sketches.merged(cells), bins)
+        result["relative_accuracy"] = sketches.relative_accuracy
+        if group_by:
+            result["groups"] = shaper(wants_columns(request))(
+                sketches.group_columns(filters.cube, list(dict.fromkeys(group_by)), cells))
+
+    with stage("serialize"):
+        return json_response(result)
 
 # ---------------- AUTOCOMPLETE + SUGGESTIONS ----------------
 @app.route("/api/autocomplete")
+@cached_json
 def api_autocomplete():
-    df = load_df()
-    if df.empty:
+    ds = DATASET.current()
+    if ds.empty:
         return jsonify({"sectors": [], "skills": [], "locations": []})
 
-    sectors = sorted(df["Sector"].dropna().astype(str).unique().tolist())
-    locations = sorted(df["Location"].dropna().astype(str).unique().tolist())
+    options = get_filter_options(ds)
+    sectors, locations = options["sectors"], options["locations"]
 
-    skills_series = df["Skills"].dropna().astype(str).str.replace(";", ",").str.split(",").explode().str.strip()
-    skills = skills_series[skills_series != ""].value_counts().index.tolist()
-    skills = skills[:200]
+    skills = [r["Skill"] for r in get_skills_index(ds).top(n=200)]
 
     return jsonify({"sectors": sectors, "skills": skills, "locations": locations})
 
+SUGGESTION_LIMIT = 10
+SUGGESTION_MAX_AGE = 300  # seconds browsers may reuse a suggestion response
+
+@app.route("/api/suggestions")
+def api_suggestions():
+    """Ranked suggestions for one field. Query params: q, field, limit."""
+    q = (request.args.get("q") or "").strip().lower()
+    field = FIELD_ALIASES.get((request.args.get("field") or "").strip().lower())
+    try:
+        limit = max(1, min(int(request.args.get("limit", SUGGESTION_LIMIT)), 50))
+    except ValueError:
+        limit = SUGGESTION_LIMIT
+    if field is None:
+        return jsonify({"error": "Unknown field"}), 400
+
+    ds = DATASET.current()
+    etag = hashlib.sha1(f"{ds.fingerprint}|{field}|{q}|{limit}".encode("utf-8")).hexdigest()[:24]
+    if etag in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        index = get_suggesters().get(field) if not ds.empty else None
+        response = jsonify(list(index.suggest(q, limit)) if index else [])
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = SUGGESTION_MAX_AGE
+    return response
+
+# ---------------- ROLE RECOMMENDATIONS ----------------
+# Keyword tables in config/role_map.json, compiled and weighted once per dataset
+# version and again whenever the file changes (checked with a stat per call)
+def get_recommender(ds=None):
+    return current_dataset(ds).derived(("recommender", role_map_key()), build_recommender)
+
+def parse_skills(skills_in):
+    """Split a comma/semicolon separated skills string into lowercase tokens."""
+    return [s.strip().lower() for s in skills_in.replace(";", ",").split(",") if s.strip()]
+
+def recommend_roles(job_title, sector_in, skills_list):
+    """Ranked role recommendations (max 6, de-duplicated)."""
+    return get_recommender().recommend(job_title, sector_in, skills_list)
+
 # ---------------- PREDICTOR (improved version) ----------------
 @app.route("/api/predict_salary", methods=["POST"])
 def api_predict_salary():
@@ -301,91 +483,45 @@ def api_predict_salary():
     location = (payload.get("location") or "").strip()
     skills_in = (payload.get("skills") or "").strip()
 
-    df = load_df()
+    df = load_df(["Avg_Salary"])
     if df.empty:
         return jsonify({"error": "No dataset available"}), 500
 
     if not job_title or not sector_in:
         return jsonify({"error": "Please provide job_title and sector"}), 400
 
-    # Prepare training data & prediction
+    # Score with the registry's model (loaded/fitted once per dataset + model version).
+    # Repeated profiles are answered from the cache for the same model.
+    skills_list = normalize_skills(parse_skills(skills_in))
+    rating = normalize_rating(rating)
+    key = prediction_key(job_title, sector_in, rating, skills_list)
     try:
-        train = df[["Avg_Salary", "Rating", "Sector"]].dropna()
-        if len(train) < 20:
-            base = int(df["Avg_Salary"].median() if "Avg_Salary" in df.columns else 50000)
-            pred = base + rating * 2000
-            confidence = 30
-        else:
-            le = LabelEncoder()
-            train["Sector_encoded"] = le.fit_transform(train["Sector"].astype(str))
-            X = train[["Rating", "Sector_encoded"]].values
-            y = train["Avg_Salary"].values
-            model = LinearRegression().fit(X, y)
-
-            if sector_in in le.classes_:
-                sector_encoded = int(np.where(le.classes_ == sector_in)[0][0])
-                sector_match = True
-            else:
-                lower_classes = [c.lower() for c in le.classes_]
-                if sector_in.lower() in "".join(lower_classes):
-                    idx = next((i for i, c in enumerate(lower_classes) if sector_in.lower() in c), 0)
-                    sector_encoded = idx
-                    sector_match = True
-                else:
-                    sector_encoded = 0
-                    sector_match = False
-
-            pred = model.predict([[rating, sector_encoded]])[0]
-
-            n = len(train)
-            size_factor = min(1.0, n / 1000)
-            residuals = y - model.predict(X)
-            resid_std = np.std(residuals) if len(residuals) > 1 else np.std(y) or 1
-            fit_quality = max(0.2, 1.0 - (resid_std / max(1.0, np.mean(y))))
-            confidence = int(20 + 60 * size_factor * fit_quality + (15 if sector_match else 0))
-            confidence = int(max(10, min(confidence, 98)))
+        with stage("load"):
+            model = MODELS.current()
+        # Recommendations follow the dataset and the role map, so appended postings or a role map edit also reset the cache
+        version = f"{DATASET.current().fingerprint}|{model.version}|{model.fingerprint}|{role_map_key()}"
+        cached = PREDICTION_CACHE.get(version, key)
+        if cached is None:
+            with stage("predict"):
+                sector_code, sector_match = model.match_sector(sector_in)
+                cached = PREDICTION_CACHE.put(version, key, (
+                    float(model.predict([rating], [sector_code], [len(skills_list)])[0]),
+                    model.confidence(sector_match),
+                    tuple(recommend_roles(job_title, sector_in, skills_list)),
+                ))
+        pred, confidence, recs = cached
     except Exception as e:
-        print("Predict model error:", e)
+        log.warning("Predict model error: %s", e)
         pred = int(df["Avg_Salary"].median() if "Avg_Salary" in df.columns else 50000) + rating * 1500
         confidence = 30
+        recs = recommend_roles(job_title, sector_in, skills_list)
 
     pred = float(pred)
     pred = max(10000.0, min(pred, 2_000_000.0))
     min_salary = int(pred * 0.9)
     max_salary = int(pred * 1.15)
 
-    # Recommendations
-    skills_list = [s.strip().lower() for s in skills_in.replace(";", ",").split(",") if s.strip()]
-    recs = []
-    role_map = {
-        "python": ["Data Engineer", "ML Engineer", "Data Scientist"],
-        "sql": ["BI Analyst", "Data Analyst", "Database Engineer"],
-        "tableau": ["BI Analyst", "Business Intelligence Developer"],
-        "ml": ["Machine Learning Engineer", "Data Scientist"],
-        "nlp": ["NLP Engineer", "ML Engineer"],
-        "spark": ["Big Data Engineer", "Data Engineer"],
-        "excel": ["Data Analyst", "Operations Analyst"],
-        "aws": ["Cloud Data Engineer", "ML Engineer"]
-    }
-    for sk in skills_list:
-        for k, roles in role_map.items():
-            if k in sk and roles:
-                recs.extend(roles)
-
-    jt = job_title.lower()
-    if "data scientist" in jt or "ml" in jt:
-        recs = recs + ["Data Scientist", "Machine Learning Engineer"]
-    if "analyst" in jt:
-        recs = recs + ["Data Analyst", "BI Analyst"]
-    if not recs:
-        if "data" in sector_in.lower() or "analytics" in sector_in.lower():
-            recs = ["Data Analyst", "Business Intelligence Analyst", "Data Scientist"]
-        else:
-            recs = ["Data Analyst", "Business Analyst"]
-
-    recs = list(dict.fromkeys(recs))[:6]
-
-    # ----- SAVE PREDICTION TO DB -----
+    # ----- SAVE PREDICTION TO DB (write-behind, off the request path) -----
     try:
         row = {
             "ts": datetime.utcnow().isoformat(sep=" ", timespec="seconds"),
@@ -398,142 +534,520 @@ def api_predict_salary():
             "min_salary": int(min_salary),
             "max_salary": int(max_salary),
             "confidence": int(confidence),
-            "recommendations": recs
+            "recommendations": list(recs)
         }
-        save_prediction_row(row)
+        with stage("db_write"):
+            PREDICTIONS.enqueue(row)
+    except Exception as e:
+        log.exception("Failed to save prediction: %s", e)
+
+    with stage("serialize"):
+        return jsonify({
+            "predicted_salary": int(round(pred)),
+            "min_salary": int(min_salary),
+            "max_salary": int(max_salary),
+            "confidence": int(confidence),
+            "recommendations": list(recs),
+            "sector_matched": sector_in
+        })
+
+@app.route("/api/cache_stats")
+def api_cache_stats():
+    """Hit/miss counters for the response and prediction caches."""
+    return jsonify({"responses": RESPONSES.stats(), "predictions": PREDICTION_CACHE.stats()})
+
+# ---------------- BATCH PREDICTOR ----------------
+# Rows are scored in chunks: one model call and one DB transaction per chunk, so
+# memory stays flat however many profiles are streamed in.
+BATCH_CHUNK_SIZE = 5000
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024  # CSV bodies past this are spooled to disk while checked
+INVALID_JSON = object()  # stands in for an NDJSON line that does not parse (lenient mode)
+
+def _checked_utf8(stream):
+    """Binary copy of `stream`, rewound, once it is known to decode as UTF-8.
+
+    Raises UnicodeDecodeError, so a bad body is refused before any output is sent.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for block in iter(lambda: stream.read(1 << 20), b""):
+        decoder.decode(block)
+        spool.write(block)
+    decoder.decode(b"", final=True)
+    spool.seek(0)
+    return spool
+
+def _iter_ndjson(lines, lenient):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            if not lenient:
+                raise
+            yield INVALID_JSON
+
+def _iter_batch_input(lenient=False):
+    """Row dicts from a JSON array, an NDJSON body or a CSV body/upload.
+
+    Upload and CSV bodies are checked to be UTF-8 here (UnicodeDecodeError),
+    before the returned iterator is consumed. A malformed NDJSON line raises
+    ValueError, or with `lenient` is yielded as INVALID_JSON and reported per row.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = io.TextIOWrapper(_checked_utf8(upload.stream), encoding="utf-8")
+        if (upload.filename or "").lower().endswith((".ndjson", ".jsonl")):
+            return _iter_ndjson(stream, lenient)
+        return csv.DictReader(stream)
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _iter_ndjson(request.stream, lenient)  # bytes lines; bad UTF-8 fails that line only
+    if request.mimetype == "text/csv":
+        return csv.DictReader(io.TextIOWrapper(_checked_utf8(request.stream), encoding="utf-8"))
+    payload = request.get_json(silent=True) or []
+    return iter(payload.get("rows", []) if isinstance(payload, dict) else payload)
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _normalize_profile(raw):
+    """Return (profile dict, error message) for one batch input row."""
+    if raw is INVALID_JSON:
+        return None, "Invalid JSON"
+    if not isinstance(raw, dict):
+        return None, "Row must be an object"
+    try:
+        rating = float(raw.get("rating") or 0)
+    except (TypeError, ValueError):
+        return None, "Invalid rating"
+    profile = {
+        "job_title": str(raw.get("job_title") or "").strip(),
+        "sector": str(raw.get("sector") or "").strip(),
+        "rating": rating,
+        "location": str(raw.get("location") or "").strip(),
+        "skills": str(raw.get("skills") or "").strip(),
+    }
+    if not profile["job_title"] or not profile["sector"]:
+        return None, "Please provide job_title and sector"
+    return profile, None
+
+def score_profiles(profiles, model, fallback_median):
+    """Vectorized scoring of normalized profiles; returns result dicts in input order."""
+    n = len(profiles)
+    # Same input normalization as the single predictor (and its result cache)
+    skills_lists = [normalize_skills(parse_skills(p["skills"])) for p in profiles]
+    ratings = np.fromiter((normalize_rating(p["rating"]) for p in profiles), dtype=float, count=n)
+    skill_counts = np.fromiter((len(s) for s in skills_lists), dtype=int, count=n)
+
+    # Sector matching is per distinct sector string, not per row
+    sector_lookup = {}
+    for p in profiles:
+        if p["sector"] not in sector_lookup:
+            sector_lookup[p["sector"]] = model.match_sector(p["sector"]) if model else (0, False)
+    codes = np.fromiter((sector_lookup[p["sector"]][0] for p in profiles), dtype=int, count=n)
+    matched = np.fromiter((sector_lookup[p["sector"]][1] for p in profiles), dtype=bool, count=n)
+
+    try:
+        preds = np.asarray(model.predict(ratings, codes, skill_counts), dtype=float)
+        confidence = model.confidence(matched)
     except Exception as e:
-        print("❌ Failed to save prediction:", e)
+        log.warning("Predict model error: %s", e)
+        preds = fallback_median + ratings * 1500
+        confidence = np.full(n, 30)
+
+    preds = np.clip(preds, 10000.0, 2_000_000.0)
+    predicted = np.rint(preds).astype(int)
+    mins = (preds * 0.9).astype(int)
+    maxs = (preds * 1.15).astype(int)
+
+    results = []
+    for i, p in enumerate(profiles):
+        results.append({
+            "predicted_salary": int(predicted[i]),
+            "min_salary": int(mins[i]),
+            "max_salary": int(maxs[i]),
+            "confidence": int(confidence[i]),
+            "recommendations": recommend_roles(p["job_title"], p["sector"], skills_lists[i]),
+            "sector_matched": p["sector"]
+        })
+    return results
 
-    return jsonify({
-        "predicted_salary": int(round(pred)),
-        "min_salary": int(min_salary),
-        "max_salary": int(max_salary),
-        "confidence": int(confidence),
-        "recommendations": recs,
-        "sector_matched": sector_in
-    })
+@app.route("/api/predict_salary/batch", methods=["POST"])
+def api_predict_salary_batch():
+    """Score many profiles. Body: JSON array ({"rows": [...]} also accepted), NDJSON,
+    CSV, or a multipart "file" upload. Streams back one NDJSON result per input row."""
+    df = load_df(["Avg_Salary"])
+    if df.empty:
+        return jsonify({"error": "No dataset available"}), 500
+    fallback_median = float(df["Avg_Salary"].median())
+    model = MODELS.current()
+    route = route_label()  # the body is generated after the request hooks have run
+    try:
+        rows = _iter_batch_input(lenient=True)
+    except UnicodeDecodeError as e:
+        return jsonify({"error": f"Body is not valid UTF-8: {e}"}), 400
+
+    def generate():
+        index = 0
+        for chunk in _chunks(rows, BATCH_CHUNK_SIZE):
+            parsed = [_normalize_profile(raw) for raw in chunk]
+            profiles = [p for p, err in parsed if p is not None]
+            with stage("predict", route):
+                scored = iter(score_profiles(profiles, model, fallback_median)) if profiles else iter(())
+
+            ts = datetime.utcnow().isoformat(sep=" ", timespec="seconds")
+            out, db_rows = [], []
+            for profile, err in parsed:
+                if err:
+                    out.append({"index": index, "error": err})
+                else:
+                    result = next(scored)
+                    db_rows.append(dict(profile, ts=ts, **result))
+                    out.append(dict(index=index, **result))
+                index += 1
+
+            if db_rows:
+                # One queue item → committed in a single transaction by the writer
+                with stage("db_write", route):
+                    PREDICTIONS.enqueue(db_rows)
+
+            with stage("serialize", route):
+                body = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in out)
+            yield body
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+# ---------------- INGESTION ----------------
+@app.route("/api/ingest", methods=["POST"])
+def api_ingest():
+    """Append new job postings (JSON array, NDJSON, CSV body or "file" upload).
+
+    Rows go to the append-only delta log; aggregates are updated for the new
+    rows only. Run `python ingest.py --compact` to fold them into the CSV.
+    """
+    try:
+        with stage("db_write"):
+            added = append_postings(_iter_batch_input(), delta_path=DELTA_PATH)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Could not parse postings: {e}"}), 400
+    if not added:
+        return jsonify({"error": "No postings in request"}), 400
+    with stage("load"):
+        ds = DATASET.current(wait=True)  # read-your-writes: wait for a reload in progress
+    return jsonify({"ingested": added, "total_records": len(ds), "version": (ds.fingerprint or "")[:12]})
 
 # ---------------- PREDICTION HISTORY endpoints ----------------
 @app.route("/api/prediction_history")
 def api_prediction_history():
-    """Return recent prediction history. Query params: limit, start, end, sector, location"""
+    """Return recent prediction history. Query params: limit, start, end, sector, location, cursor
+
+    Pass the response's next_cursor back as ?cursor= to fetch the following page.
+    """
     limit = int(request.args.get("limit", 200))
     start = request.args.get("start")  # ISO timestamp or date
     end = request.args.get("end")
     sector = request.args.get("sector")
     location = request.args.get("location")
-
-    rows = query_predictions(limit=limit, start=start, end=end, sector=sector, location=location)
-    return jsonify({"count": len(rows), "predictions": rows})
+    cursor = request.args.get("cursor")
+
+    with stage("db_read"):
+        rows, next_cursor = PREDICTIONS.page(limit=limit, start=start, end=end, sector=sector,
+                                             location=location, cursor=cursor)
+    with stage("serialize"):
+        predictions = rows
+        if wants_columns(request):
+            predictions = {k: [r[k] for r in rows] for k in (rows[0] if rows else PUBLIC_COLUMNS)}
+        return json_response({"count": len(rows), "predictions": predictions, "next_cursor": next_cursor})
+
+@app.route("/api/prediction_stats")
+def api_prediction_stats():
+    """Prediction usage per day (and sector or location). Query params: start, end, sector, location, group_by
+
+    group_by is a comma list of day, sector, location (default "day"). Read
+    from the per-day rollup tables only, so the cost grows with days, not predictions.
+    """
+    group_by = [name.strip().lower() for name in request.args.get("group_by", "day").split(",") if name.strip()]
+    filters = {k: request.args.get(k) for k in ("start", "end", "sector", "location")}
+    try:
+        with stage("db_read"):
+            groups = PREDICTIONS.stats(group_by, **filters)
+            totals = PREDICTIONS.stats((), **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with stage("serialize"):
+        shape = shaper(wants_columns(request))
+        totals = {k: v[0] for k, v in totals.items()} if totals["predictions"] else {}
+        return json_response({"group_by": group_by, "totals": totals,
+                              "count": len(groups["predictions"]), "stats": shape(groups)})
+
+def requested_columns(payload, available):
+    """Column projection from payload "columns" (list or comma string); None = all.
+
+    Raises ValueError naming any column that is not in `available`.
+    """
+    columns = payload.get("columns") or request.args.get("columns")
+    if not columns:
+        return None
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+    return list(columns)
+
+def csv_response(chunks, filename, payload):
+    """Stream CSV chunks as a download, gzip-encoded if asked for and accepted."""
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    wants_gzip = payload.get("gzip") or request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    if wants_gzip and request.accept_encodings["gzip"]:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(chunks), mimetype="text/csv", headers=headers)
 
 @app.route("/api/prediction_export", methods=["POST"])
 def api_prediction_export():
-    """Export prediction history to CSV. POST body may include filters: start,end,sector,location,limit"""
-    payload = request.get_json() or {}
+    """Stream prediction history as CSV.
+
+    POST body may include filters: start,end,sector,location,limit, plus
+    columns (projection) and gzip (compress the stream).
+    """
+    payload = request.get_json(silent=True) or {}
     limit = int(payload.get("limit", 10000))
-    start = payload.get("start")
-    end = payload.get("end")
-    sector = payload.get("sector")
-    location = payload.get("location")
+    try:
+        columns = requested_columns(payload, PUBLIC_COLUMNS) or PUBLIC_COLUMNS
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    rows = query_predictions(limit=limit, start=start, end=end, sector=sector, location=location)
+    rows = PREDICTIONS.iter_rows(columns, limit=limit, start=payload.get("start"), end=payload.get("end"),
+                                 sector=payload.get("sector"), location=payload.get("location"))
+    if "recommendations" in columns:
+        # stored as JSON; pipe-joined in the CSV for readability
+        rec = columns.index("recommendations")
+        rows = (r[:rec] + ("|".join(json.loads(r[rec] or "[]")),) + r[rec + 1:] for r in rows)
 
-    out = io.StringIO()
-    df = pd.DataFrame(rows)
-    if df.empty:
-        out.write("id,ts,job_title,sector,rating,location,skills,predicted_salary,min_salary,max_salary,confidence,recommendations\n")
-    else:
-        # convert recommendations list back to pipe-joined string for CSV readability
-        if "recommendations" in df.columns:
-            df["recommendations"] = df["recommendations"].apply(lambda r: "|".join(r) if isinstance(r, list) else r)
-        df.to_csv(out, index=False)
-    out.seek(0)
-    response = make_response(out.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=predictions_export.csv"
-    response.headers["Content-Type"] = "text/csv"
-    return response
+    return csv_response(iter_csv(columns, rows), "predictions_export.csv", payload)
 
 # ---------------- REPORT GENERATION (kept intact) ----------------
 @app.route("/api/report_generate", methods=["POST"])
+@cached_json
 def api_report_generate():
     payload = request.get_json() or {}
     year = str(payload.get("year", "")).strip()
     sector = str(payload.get("sector", "")).strip().lower()
     location = str(payload.get("location", "")).strip().lower()
-    print("📩 Report Filter Received:", payload)
+    log.debug("📩 Report Filter Received: %s", payload)
 
-    df = load_df()
-    if df.empty:
+    ds = DATASET.current()
+    if ds.empty:
         return jsonify({"error": "No data"}), 404
 
-    dff = df.copy()
-    if year:
-        dff = dff[dff["Year"].astype(str).str.contains(year, case=False, na=False)]
-    if sector:
-        dff = dff[dff["Sector"].astype(str).str.lower().str.contains(sector, na=False)]
-    if location:
-        dff = dff[dff["Location"].astype(str).str.lower().str.contains(location, na=False)]
+    with stage("load"):
+        filters = ds.derived("filters", build_filter_engine)
+        cube = filters.cube
+        skills = get_skills_index()
 
-    print(f"🔍 Filtered rows after filter: {len(dff)} / {len(df)}")
+    with stage("filter"):
+        masks = filters.report_masks(year=year, sector=sector, location=location)
+        cells = filters.cells(masks)
+        total, salary_sum = cube.total(cells)
+    log.debug("🔍 Filtered rows after filter: %d / %d", total, cube.n_rows)
 
-    if dff.empty:
+    if total == 0:
         return jsonify({
             "summary": {"total_records": 0, "avg_salary": 0},
             "charts": {"salary_by_sector": [], "skills_data": [], "salary_trend": [], "top_companies": []},
+            "distribution": {"count": 0, "by_sector": []},
             "table": []
         })
 
-    summary = {
-        "total_records": len(dff),
-        "avg_salary": int(dff["Avg_Salary"].mean()),
-        "top_sectors_count": dff["Sector"].value_counts().head(3).rename_axis("Sector").reset_index(name="Count").to_dict(orient="records"),
-        "top_locations": dff["Location"].value_counts().head(3).rename_axis("Location").reset_index(name="Count").to_dict(orient="records")
-    }
+    columnar = wants_columns(request)
+    shape = shaper(columnar)
+    with stage("groupby"):
+        summary = {
+            "total_records": total,
+            "avg_salary": int(salary_sum / total),
+            "top_sectors_count": shape(cube.counts_columns("Sector", cells, n=3)),
+            "top_locations": shape(cube.counts_columns("Location", cells, n=3))
+        }
 
-    charts = {
-        "salary_by_sector": dff.groupby("Sector", as_index=False)["Avg_Salary"].mean().to_dict(orient="records"),
-        "skills_data": dff["Skills"].dropna().astype(str).str.replace(";", ",").str.split(",").explode().str.strip()
-                        .value_counts().head(10).rename_axis("Skill").reset_index(name="Count").to_dict(orient="records"),
-        "salary_trend": dff.groupby("Year", as_index=False)["Avg_Salary"].mean().to_dict(orient="records"),
-        "top_companies": dff.groupby("Company_Name", as_index=False)["Avg_Salary"].mean()
-                        .sort_values("Avg_Salary", ascending=False).head(10).to_dict(orient="records")
-    }
+        charts = {
+            "salary_by_sector": shape(cube.mean_columns("Sector", cells)),
+            "skills_data": shape(skills.top_columns(cell_skill_counts(cells), n=10)),
+            "salary_trend": shape(cube.mean_columns("Year", cells)),
+            "top_companies": shape(cube.top_mean_columns("Company_Name", cells, n=10))
+        }
 
-    table = dff[["Job_Title", "Company_Name", "Sector", "Location", "Rating", "Avg_Salary"]].head(200).to_dict(orient="records")
+        # Salary percentiles and histogram, overall and per sector
+        sketches = get_salary_sketches(ds)
+        sketch_cells = sketches.select(masks) if masks else None
+        distribution = sketches.summary(sketches.merged(sketch_cells))
+        distribution["by_sector"] = shape(sketches.group_columns(cube, ["Sector"], sketch_cells))
+
+    # Only the first 200 matching rows are ever sliced out of the frame
+    with stage("table"):
+        table_cols = ["Job_Title", "Company_Name", "Sector", "Location", "Rating", "Avg_Salary"]
+        frame = ds.frame(table_cols).iloc[filters.positions(masks, limit=200)]
+        table = {c: frame[c].to_numpy() for c in frame.columns} if columnar else frame.to_dict(orient="records")
+
+    with stage("serialize"):
+        return json_response({"summary": summary, "charts": charts, "distribution": distribution, "table": table})
+
+# ---------------- REPORT TABLE ----------------
+REPORT_TABLE_COLUMNS = ["Job_Title", "Company_Name", "Sector", "Location", "Rating", "Avg_Salary", "Date"]
+REPORT_PAGE_SIZE = 50
+MAX_REPORT_PAGE_SIZE = 500
+
+@app.route("/api/report_table", methods=["GET", "POST"])
+@cached_json
+def api_report_table():
+    """One page of the filtered postings, sorted server-side.
+
+    Params (JSON body or query): year, sector, location (as in reports), sort
+    (avg_salary | rating | company_name | date), order (asc | desc), page (from 1)
+    and page_size (max 500).
+    """
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    sort = SORTABLE_COLUMNS.get(str(params.get("sort") or "avg_salary").strip().lower())
+    order = str(params.get("order") or "desc").strip().lower()
+    try:
+        page = max(1, int(params.get("page") or 1))
+        page_size = max(1, min(int(params.get("page_size") or REPORT_PAGE_SIZE), MAX_REPORT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "page and page_size must be integers"}), 400
+    if sort is None or order not in ("asc", "desc"):
+        return jsonify({"error": "sort must be one of avg_salary, rating, company_name, date; order asc or desc"}), 400
+
+    ds = DATASET.current()
+    if ds.empty:
+        return jsonify({"error": "No data"}), 404
+    if sort not in ds.columns:
+        return jsonify({"error": f"Dataset has no {sort} column"}), 400
+
+    with stage("load"):
+        filters = get_filters(ds)
+        index = get_sort_index(sort, ds)
 
-    return jsonify({"summary": summary, "charts": charts, "table": table})
+    with stage("filter"):
+        masks = filters.report_masks(year=params.get("year"), sector=params.get("sector"),
+                                     location=params.get("location"))
+        total, _ = filters.cube.total(filters.cells(masks))
+        keep = (lambda rows: filters.matches(masks, rows)) if masks else None
+        positions = index.page((page - 1) * page_size, page_size, order == "desc", keep)
+
+    with stage("table"):
+        frame = ds.frame([c for c in REPORT_TABLE_COLUMNS if c in ds.columns]).iloc[positions]
+        rows = ({c: frame[c].to_numpy() for c in frame.columns} if wants_columns(request)
+                else frame.to_dict(orient="records"))
+
+    with stage("serialize"):
+        return json_response({"sort": sort, "order": order, "page": page, "page_size": page_size,
+                              "total": total, "pages": -(-total // page_size), "rows": rows})
 
 # ---------------- EXPORT ----------------
 @app.route("/api/report_export", methods=["POST"])
 def api_report_export():
-    payload = request.get_json() or {}
+    """Stream the filtered dataset as CSV (optional columns projection and gzip)."""
+    payload = request.get_json(silent=True) or {}
     year = str(payload.get("year", "")).strip()
     sector = str(payload.get("sector", "")).strip().lower()
     location = str(payload.get("location", "")).strip().lower()
 
-    df = load_df()
-    if df.empty:
+    ds = DATASET.current()
+    if ds.empty:
         return jsonify({"error": "No data"}), 404
-
-    dff = df.copy()
-    if year:
-        dff = dff[dff["Year"].astype(str).str.contains(year, case=False, na=False)]
-    if sector:
-        dff = dff[dff["Sector"].astype(str).str.lower().str.contains(sector, na=False)]
-    if location:
-        dff = dff[dff["Location"].astype(str).str.lower().str.contains(location, na=False)]
-
-    if dff.empty:
+    try:
+        columns = requested_columns(payload, ds.columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filters = ds.derived("filters", build_filter_engine)
+    masks = filters.report_masks(year=year, sector=sector, location=location)
+    rows = filters.rows(masks)
+    if rows is not None and not rows.any():
         return jsonify({"error": "No records to export."}), 404
 
-    out = io.StringIO()
-    dff.to_csv(out, index=False)
-    out.seek(0)
-    response = make_response(out.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=report_export.csv"
-    response.headers["Content-Type"] = "text/csv"
-    return response
+    df = ds.frame(columns)
+    return csv_response(iter_frame_csv(df, rows), "report_export.csv", payload)
+
+# ---------------- WARM-UP + READINESS ----------------
+# A background thread rebuilds the indexes, model and default payloads whenever
+# the CSV, delta log, snapshot or published model changes, then swaps them in.
+NO_FILTER = {"year": "", "sector": "", "location": ""}  # what the pages send unfiltered
+WARM_REQUESTS = [
+    ("GET", "/api/summary", None),
+    ("GET", "/api/summary?format=columns", None),
+    ("GET", "/api/autocomplete", None),
+    ("POST", "/api/analytics_filter?format=columns", NO_FILTER),
+    ("POST", "/api/report_generate", NO_FILTER),
+    ("GET", "/api/salary_percentiles?group_by=sector&format=columns", None),
+    ("GET", "/api/report_table?sort=avg_salary&order=desc&page=1&page_size=25&format=columns", None),
+]
+
+def prepare_dataset(ds):
+    """Build every per-version structure for `ds` before it is published."""
+    if ds.empty:
+        return
+    get_cube(ds)
+    get_filters(ds)
+    get_skills_index(ds)
+    ds.derived("cell_skills", build_cell_skills)
+    get_matchers(ds)
+    get_suggesters(ds)
+    get_recommender(ds)
+    get_filter_options(ds)
+    get_salary_sketches(ds)
+    if "Avg_Salary" in ds.columns:
+        get_sort_index("Avg_Salary", ds)
+    model = MODELS.for_dataset(ds)
+    model.predict([3.5], [0])  # page in a memory-mapped forest
+
+def warm_up():
+    """Load and prepare the current dataset and model, then pre-render the default responses."""
+    set_route("warmup")
+    try:
+        with stage("prepare"):
+            MODELS.refresh(wait=True)
+            DATASET.reload(prepare=prepare_dataset)
+        with stage("render"):
+            for method, path, body in WARM_REQUESTS:
+                with app.test_request_context(path, method=method, json=body):
+                    app.view_functions[request.endpoint]()
+        return data_version()
+    finally:
+        set_route(None)
+
+WARMUP = WarmupWorker(warm_up, lambda: DATASET.changed() or MODELS.changed() or data_version() != WARMUP.version,
+                      interval=float(os.environ.get("PORTAL_WARMUP_INTERVAL", WARMUP_INTERVAL)))
+
+@METRICS.gauge
+def warmup_gauges():
+    yield "warmup_ready", {}, int(WARMUP.ready)
+    if WARMUP.duration is not None:
+        yield "warmup_duration_seconds", {}, round(WARMUP.duration, 4)
+
+@app.route("/readyz")
+def readyz():
+    """200 once the first warm-up finished (or warm-up is disabled), else 503."""
+    status = WARMUP.status()
+    ready = WARMUP.ready or not WARMUP.running
+    return jsonify(dict(status, ready=ready)), 200 if ready else 503
+
+if os.environ.get("PORTAL_WARMUP", "1").lower() not in ("0", "false", "no"):
+    # Requests keep the published version; only the worker loads new ones
+    DATASET.background = MODELS.background = lambda: WARMUP.running
+    WARMUP.start()
 
 if __name__ == "__main__":
-    print("🚀 Launching Data Analyst Insight Portal → http://127.0.0.1:5000")
+    log.info("🚀 Launching Data Analyst Insight Portal → http://127.0.0.1:5000")
     app.run(debug=True)
@@ -0,0 +1,282 @@
+# benchmark.py
+"""Endpoint benchmark at scaled dataset sizes.
+
+    python benchmark.py                                   # 10k, 100k and 1M rows
+    python benchmark.py --sizes 10000 100000 --requests 50
+    python benchmark.py --compare benchmark_results.old.json
+
+Every size runs in a fresh interpreter. A synthetic CSV is generated
+(generate_sample_data.generate) into a temp dir, the app is imported with
+$PORTAL_DATA_DIR and $PORTAL_MODEL_DIR pointing there, so the repo's data and
+model files are never touched, and every route is driven through Flask's
+test client. Per endpoint we record the first
+("cold") request, latency percentiles over the repeated requests, throughput
+and the peak RSS reached while the endpoint ran. The response and prediction
+caches are cleared before every request, so repeats measure the route, not a
+cache hit; routes served from those caches get a second "(cached)" row. Results go to a JSON file
+(with the git commit) so two runs can be compared with --compare.
+"""
+import os, sys, json, time, shutil, platform, argparse, tempfile, subprocess
+from datetime import datetime
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_OUT = os.path.join(BASE_DIR, "benchmark_results.json")
+
+PROFILE = {"job_title": "Data Analyst", "sector": "Research", "rating": 4.1, "location": "Pune, MH",
+           "skills": "Python, SQL"}
+
+# Route → request variants, cycled over the repeats. Mutating routes run last.
+REQUESTS = [
+    ("/", [("GET", "/", {})]),
+    ("/dashboard", [("GET", "/dashboard", {})]),
+    ("/analytics", [("GET", "/analytics", {})]),
+    ("/reports", [("GET", "/reports", {})]),
+    ("/predictor", [("GET", "/predictor", {})]),
+    ("/static/<path:filename>", [("GET", "/static/js/dashboard.js", {})]),
+    ("/api/summary", [("GET", "/api/summary", {})]),
+    ("/api/analytics_filter", [
+        ("POST", "/api/analytics_filter", {"json": {}}),
+        ("POST", "/api/analytics_filter", {"json": {"year": "2021", "sector": "bus", "location": "pune"}}),
+        ("POST", "/api/analytics_filter", {"json": {"sector": "Research"}}),
+    ]),
+    ("/api/salary_percentiles", [
+        ("GET", "/api/salary_percentiles?group_by=sector", {}),
+        ("POST", "/api/salary_percentiles", {"json": {"year": "2021", "location": "pune", "group_by": "sector,year"}}),
+    ]),
+    ("/api/autocomplete", [("GET", "/api/autocomplete", {})]),
+    ("/api/suggestions", [
+        ("GET", "/api/suggestions?q=da&field=job_title", {}),
+        ("GET", "/api/suggestions?q=py&field=skill", {}),
+        ("GET", "/api/suggestions?q=pu&field=location", {}),
+    ]),
+    ("/api/predict_salary", [
+        ("POST", "/api/predict_salary", {"json": PROFILE}),
+        ("POST", "/api/predict_salary", {"json": dict(PROFILE, sector="Analytics", skills="Spark;AWS;NLP")}),
+    ]),
+    ("/api/predict_salary/batch", [
+        ("POST", "/api/predict_salary/batch", {"json": [dict(PROFILE, rating=2.5 + (i % 24) / 10) for i in range(1000)]}),
+    ]),
+    ("/api/prediction_history", [("GET", "/api/prediction_history?limit=200", {})]),
+    ("/api/prediction_stats", [
+        ("GET", "/api/prediction_stats", {}),
+        ("GET", "/api/prediction_stats?group_by=day,sector&start=2024-01-01", {}),
+    ]),
+    ("/api/prediction_export", [("POST", "/api/prediction_export", {"json": {"limit": 5000}})]),
+    ("/api/report_generate", [
+        ("POST", "/api/report_generate", {"json": {}}),
+        ("POST", "/api/report_generate", {"json": {"year": "2021", "sector": "data", "location": ""}}),
+    ]),
+    ("/api/report_table", [
+        ("GET", "/api/report_table?page=1", {}),
+        ("POST", "/api/report_table", {"json": {"sector": "data", "sort": "date", "order": "asc", "page": 20}}),
+        ("POST", "/api/report_table", {"json": {"year": "2021", "location": "pune", "sort": "company", "page": 3}}),
+    ]),
+    ("/api/report_export", [("POST", "/api/report_export", {"json": {"year": "2021", "sector": "research"}})]),
+    ("/api/cache_stats", [("GET", "/api/cache_stats", {})]),
+    ("/metrics", [("GET", "/metrics", {})]),
+    ("/metrics/profile", [
+        ("POST", "/metrics/profile", {"json": {"enabled": True, "interval_ms": 5}}),
+        ("GET", "/metrics/profile", {}),
+        ("POST", "/metrics/profile", {"json": {"enabled": False}}),
+    ]),
+    ("/readyz", [("GET", "/readyz", {})]),
+    ("/api/ingest", [("POST", "/api/ingest", {"json": [dict(PROFILE, Job_Title="Data Analyst", Sector="Research",
+                                                            Skills="Python;SQL", Avg_Salary=80000, Date="2025-01-01")]})]),
+]
+
+# Served from ResponseCache / PredictionCache on repeats: these also get a "(cached)" row.
+# The plain row clears both caches before every request, so it shows how the route
+# itself scales with the dataset.
+CACHED_ROUTES = {"/api/summary", "/api/analytics_filter", "/api/salary_percentiles", "/api/autocomplete",
+                 "/api/report_generate", "/api/report_table", "/api/predict_salary"}
+
+
+# ---------------- Measurement helpers ----------------
+def _status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset VmHWM (Linux ≥ 4.0) so the next reading is this stage's peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb():
+    hwm = _status_kb("VmHWM")
+    if hwm is None:
+        import resource
+        hwm = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return hwm
+
+
+def summarize(latencies, wall):
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(len(ms) / wall, 2) if wall else None,
+    }
+
+
+def time_route(client, variants, n_requests, budget, before_each=None):
+    """Cold latency, percentiles, throughput and peak RSS for one route's request variants."""
+    reset_peak_rss()
+    statuses, latencies = {}, []
+    started = time.perf_counter()
+    for i in range(n_requests):
+        method, url, kwargs = variants[i % len(variants)]
+        if before_each is not None:
+            before_each()
+        t = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()  # drain streamed bodies
+        latencies.append(time.perf_counter() - t)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if time.perf_counter() - started > budget and len(latencies) >= 3:
+            break
+    wall = sum(latencies)  # request time only; cache clearing is not counted
+    stats = summarize(latencies[1:] or latencies, wall - latencies[0] if len(latencies) > 1 else wall)
+    return dict(cold_ms=round(latencies[0] * 1000, 3), **stats, peak_rss_kb=peak_rss_kb(),
+                statuses={str(k): v for k, v in statuses.items()})
+
+
+# ---------------- One dataset size (runs in a fresh interpreter) ----------------
+def run_size(n_rows, n_requests, budget, seed):
+    from generate_sample_data import generate
+    workdir = tempfile.mkdtemp(prefix=f"bench_{n_rows}_")
+    try:
+        csv_path = os.path.join(workdir, "data_analyst_jobs.csv")
+        t0 = time.perf_counter()
+        generate(n_rows, seed).to_csv(csv_path, index=False, encoding="utf-8")
+        result = {"rows": n_rows, "csv_bytes": os.path.getsize(csv_path),
+                  "generate_seconds": round(time.perf_counter() - t0, 3)}
+
+        os.environ.setdefault("PORTAL_WARMUP", "0")  # measure cold requests, not the background warm-up
+        # Set before the import: the app opens its CSV, prediction DB and model dir at import time
+        os.environ["PORTAL_DATA_DIR"] = workdir
+        os.environ["PORTAL_MODEL_DIR"] = os.path.join(workdir, "model")
+        import app as portal
+        reset_peak_rss()
+        t0 = time.perf_counter()
+        portal.DATASET.current()
+        result["load_seconds"] = round(time.perf_counter() - t0, 3)
+        result["load_peak_rss_kb"] = peak_rss_kb()
+
+        client = portal.app.test_client()
+        covered = {rule for rule, _ in REQUESTS}
+        result["uncovered_routes"] = sorted(r.rule for r in portal.app.url_map.iter_rules() if r.rule not in covered)
+
+        def clear_caches():
+            portal.RESPONSES.clear()
+            portal.PREDICTION_CACHE.clear()
+
+        endpoints = {}
+        for rule, variants in REQUESTS:
+            endpoints[rule] = time_route(client, variants, n_requests, budget, before_each=clear_caches)
+            if rule in CACHED_ROUTES:
+                endpoints[f"{rule} (cached)"] = time_route(client, variants, n_requests, budget)
+        portal.PROFILER.stop()  # in case the /metrics/profile cycle ended with it on
+        portal.PREDICTIONS.flush()
+        result["endpoints"] = endpoints
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ---------------- Driver ----------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Print p50 changes per size/endpoint against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["rows"]: r for r in json.load(f)["sizes"]}
+    for run in current["sizes"]:
+        old = baseline.get(run["rows"])
+        if not old:
+            continue
+        for rule, stats in run["endpoints"].items():
+            before = old["endpoints"].get(rule)
+            if before and before["p50_ms"]:
+                change = stats["p50_ms"] / before["p50_ms"] - 1
+                flag = "⚠️" if change > 0.2 else "  "
+                print(f"{flag} {run['rows']:>9,} {rule:<41} p50 {before['p50_ms']:>9.2f} → {stats['p50_ms']:>9.2f} ms ({change:+.0%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API route at scaled dataset sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--requests", type=int, default=30, help="requests per endpoint (upper bound)")
+    parser.add_argument("--budget", type=float, default=20.0, help="max seconds per endpoint")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--compare", help="earlier results file to compare p50 latencies with")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        result = run_size(args.worker, args.requests, args.budget, args.seed)
+        with open(args.worker_out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "requests_per_endpoint": args.requests,
+        "sizes": [],
+    }
+    for n_rows in args.sizes:
+        print(f"⏱️ Benchmarking {n_rows:,} rows...")
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            worker_out = tmp.name
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(n_rows),
+                            "--worker-out", worker_out, "--requests", str(args.requests),
+                            "--budget", str(args.budget), "--seed", str(args.seed)],
+                           cwd=BASE_DIR, check=True, stdout=subprocess.DEVNULL)
+            with open(worker_out, encoding="utf-8") as f:
+                run = json.load(f)
+        finally:
+            os.remove(worker_out)
+        report["sizes"].append(run)
+        for rule, stats in run["endpoints"].items():
+            print(f"   {rule:<41} cold {stats['cold_ms']:>9.2f} ms  p50 {stats['p50_ms']:>9.2f}  "
+                  f"p99 {stats['p99_ms']:>9.2f}  {stats['throughput_rps']:>8} req/s  {stats['peak_rss_kb'] // 1024} MB")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("📝 Benchmark results →", args.out)
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
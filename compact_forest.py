@@ -0,0 +1,206 @@
+# compact_forest.py
+"""Array-backed export of the published RandomForest pipeline.
+
+A fitted sklearn forest is hundreds of Python Tree objects; unpickling them
+costs every worker startup time and private memory. export_forest() flattens
+all trees into a few contiguous node arrays (int16 input columns, float32
+thresholds, int32 right children, float64 leaf values) plus a JSON manifest
+holding the one-hot vocabularies. CompactForest memory-maps those arrays, so workers
+share one copy through the page cache, and scores a batch by walking every
+tree level by level with NumPy gathers. One-hot columns are never built: a
+split on "Sector_Research" compares the row's Sector code with that
+category's code.
+
+    python compact_forest.py    # measure load time / RSS: joblib vs compact
+"""
+import os, sys, json, subprocess
+import numpy as np
+
+MANIFEST = "manifest.json"
+NODE_ARRAYS = ("col", "cat", "threshold", "right", "value", "roots")
+PREDICT_CHUNK_ROWS = 256
+
+
+# ---------------- Export ----------------
+def _onehot_blocks(encoder, columns):
+    """Per input column: {category: local one-hot index} and the unknown index (-1 = all zeros)."""
+    infrequent = getattr(encoder, "infrequent_categories_", None) or [None] * len(columns)
+    blocks = []
+    for categories, rare in zip(encoder.categories_, infrequent):
+        rare = set() if rare is None else {str(v) for v in rare}
+        vocab = {}
+        frequent = [str(v) for v in categories if str(v) not in rare]
+        for i, value in enumerate(frequent):
+            vocab[value] = i
+        rare_index = len(frequent) if rare else -1
+        for value in rare:
+            vocab[value] = rare_index
+        blocks.append({"vocab": vocab, "width": len(frequent) + (1 if rare else 0),
+                       "unknown": rare_index})
+    return blocks
+
+
+def _float32_floor(thresholds):
+    """Largest float32 <= each threshold.
+
+    sklearn compares float32 inputs against float64 thresholds; rounding down
+    keeps `x <= t` exact for every float32 x, even when a threshold falls
+    between two adjacent float32 values.
+    """
+    t32 = thresholds.astype(np.float32)
+    over = t32.astype(np.float64) > thresholds
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+def export_forest(pipeline, out_dir):
+    """Write the pipeline's encoder + forest as flat .npy node arrays under out_dir."""
+    transform = pipeline.named_steps["transform"]
+    rf = pipeline.named_steps["rf"]
+    inputs = list(transform.feature_names_in_)
+    _, encoder, cat_cols = next(t for t in transform.transformers_ if t[0] == "ohe")
+    num_cols = [inputs[i] if isinstance(i, (int, np.integer)) else i
+                for name, _, cols in transform.transformers_ if name == "remainder" for i in cols]
+
+    # Transformed feature j → (input column index, category code or -1 for numeric)
+    blocks = _onehot_blocks(encoder, cat_cols)
+    feat_col, feat_cat = [], []
+    for col, block in zip(cat_cols, blocks):
+        feat_col += [inputs.index(col)] * block["width"]
+        feat_cat += list(range(block["width"]))
+    for col in num_cols:
+        feat_col.append(inputs.index(col))
+        feat_cat.append(-1)
+
+    feat_col, feat_cat = np.asarray(feat_col), np.asarray(feat_cat)
+    trees = [est.tree_ for est in rf.estimators_]
+    for t in trees:
+        internal = np.flatnonzero(t.children_left >= 0)
+        if not np.array_equal(t.children_left[internal], internal + 1):
+            raise ValueError("compact export needs depth-first trees (left child = node + 1)")
+    offsets = np.zeros(len(trees) + 1, dtype=np.int64)
+    np.cumsum([t.node_count for t in trees], out=offsets[1:])
+    feature = np.concatenate([t.feature for t in trees])
+    leaf = feature < 0
+    feature[leaf] = len(feat_col) - 1  # any valid column; leaves never move (see below)
+    threshold = _float32_floor(np.concatenate([t.threshold for t in trees]))
+    threshold[leaf] = -np.inf
+    cat = feat_cat[feature]
+    cat[leaf] = -1
+    arrays = {
+        # Per node: input column, one-hot category (-1 = numeric split) and threshold.
+        # The left child is always node + 1; leaves fail every test and "go right"
+        # to themselves, so a row that reached its leaf stays there.
+        "col": feat_col[feature].astype(np.int16),
+        "cat": cat.astype(np.int32),
+        "threshold": threshold,
+        "right": np.concatenate([np.where(t.children_right < 0, np.arange(t.node_count), t.children_right) + o
+                                 for t, o in zip(trees, offsets)]).astype(np.int32),
+        "value": np.concatenate([t.value[:, 0, 0] for t in trees]).astype(np.float64),
+        "roots": offsets[:-1].astype(np.int32),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), arr)
+    manifest = {
+        "inputs": inputs,
+        "categorical": {col: block for col, block in zip(cat_cols, blocks)},
+        "n_trees": len(trees),
+        "max_depth": int(max(t.max_depth for t in trees)),
+        "n_nodes": int(offsets[-1]),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return out_dir
+
+
+# ---------------- Predict ----------------
+class CompactForest:
+    """Memory-mapped forest with a vectorized predict() (same answers as the pipeline)."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.path = path
+        self.inputs = manifest["inputs"]
+        self.categorical = manifest["categorical"]
+        self.n_trees = manifest["n_trees"]
+        self.max_depth = manifest["max_depth"]
+        for name in NODE_ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    def _encode(self, X):
+        """Input matrix: numeric columns as-is, categorical columns as one-hot codes."""
+        n = len(X[self.inputs[0]])
+        Z = np.empty((n, len(self.inputs)), dtype=np.float64)
+        for j, col in enumerate(self.inputs):
+            block = self.categorical.get(col)
+            values = np.asarray(X[col])
+            if block is None:
+                Z[:, j] = values.astype(np.float64)
+            else:
+                vocab, unknown = block["vocab"], block["unknown"]
+                if values.ndim == 0:
+                    values = np.full(n, values.item(), dtype=object)
+                Z[:, j] = [vocab.get(str(v), unknown) for v in values]
+        return Z
+
+    def predict(self, X):
+        """Mean leaf value over all trees; X is a DataFrame or dict of equal-length columns."""
+        Z = self._encode(X).astype(np.float32)  # sklearn also scores in float32
+        out = np.empty(len(Z))
+        for start in range(0, len(Z), PREDICT_CHUNK_ROWS):
+            z = Z[start:start + PREDICT_CHUNK_ROWS]
+            rows = np.arange(len(z))[:, None]
+            node = np.broadcast_to(self.roots, (len(z), self.n_trees)).copy()
+            for _ in range(self.max_depth):
+                x = z[rows, self.col[node]]
+                cat = self.cat[node]
+                go_left = np.where(cat >= 0, x != cat, x <= self.threshold[node])
+                node = np.where(go_left, node + 1, self.right[node])
+            out[start:start + len(z)] = self.value[node].mean(axis=1)
+        return out
+
+
+# ---------------- Measurement ----------------
+_LOAD_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+if sys.argv[1] == "joblib":
+    import joblib; m = joblib.load(sys.argv[2])
+else:
+    from compact_forest import CompactForest; m = CompactForest(sys.argv[2])
+import pandas as pd
+X = pd.DataFrame({"Rating": [4.0], "Size": ["Unknown"], "Company_Name": ["Unknown"],
+                  "Sector": ["Research"], "Skill_Count": [3]})
+m.predict(X)
+rss = [l for l in open("/proc/self/status") if l.startswith(("VmRSS", "RssAnon", "RssFile"))]
+print(time.perf_counter() - t0, *[int(l.split()[1]) for l in rss])
+"""
+
+
+def measure_load(kind, path):
+    """Cold-start (fresh interpreter) load + first prediction: seconds and RSS in KB."""
+    out = subprocess.run([sys.executable, "-c", _LOAD_PROBE, kind, path], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+    return {"seconds": float(out[0]), "rss_kb": int(out[1]), "rss_anon_kb": int(out[2]), "rss_file_kb": int(out[3])}
+
+
+def _dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+if __name__ == "__main__":
+    from model_registry import MODEL_DIR, META_FILE
+    with open(os.path.join(MODEL_DIR, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    pkl = os.path.join(MODEL_DIR, meta["artifact"])
+    compact = os.path.join(MODEL_DIR, meta["compact"]) if meta.get("compact") else None
+    report = {"version": meta["version"], "joblib": dict(measure_load("joblib", pkl), bytes=_dir_size(pkl))}
+    if compact:
+        report["compact"] = dict(measure_load("compact", compact), bytes=_dir_size(compact))
+    print(json.dumps(report, indent=2))
+    with open(os.path.join(MODEL_DIR, "load_benchmark.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,60 @@
+# csv_stream.py
+"""Chunked CSV generators for the export endpoints.
+
+Exports are produced as a stream of ~64 KB byte chunks instead of one
+in-memory string, so peak memory stays flat no matter how many rows are
+exported. Frames are written a slice of rows at a time with the same
+to_csv() formatting as before; cursor rows go through csv.writer.
+"""
+import csv, io, zlib
+import numpy as np
+
+CSV_CHUNK_BYTES = 64 * 1024
+FRAME_CHUNK_ROWS = 2000
+GZIP_LEVEL = 6
+
+
+def _drain(buf):
+    data = buf.getvalue().encode("utf-8")
+    buf.seek(0)
+    buf.truncate()
+    return data
+
+
+def iter_csv(header, rows):
+    """Encoded CSV chunks for a header and an iterable of row tuples."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= CSV_CHUNK_BYTES:
+            yield _drain(buf)
+    if buf.tell():
+        yield _drain(buf)
+
+
+def iter_frame_csv(df, rows=None, chunk_rows=FRAME_CHUNK_ROWS):
+    """Encoded CSV chunks for df (optionally only the rows of a boolean mask).
+
+    Only one slice of `chunk_rows` rows is materialized at a time.
+    """
+    positions = np.arange(len(df)) if rows is None else np.flatnonzero(rows)
+    buf = io.StringIO()
+    df.iloc[:0].to_csv(buf, index=False)
+    for start in range(0, len(positions), chunk_rows):
+        df.iloc[positions[start:start + chunk_rows]].to_csv(buf, index=False, header=False)
+        if buf.tell() >= CSV_CHUNK_BYTES:
+            yield _drain(buf)
+    if buf.tell():
+        yield _drain(buf)
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Gzip-compress a stream of byte chunks on the fly."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 → gzip container
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
@@ -0,0 +1,350 @@
+# datastore.py
+import os, io, json, logging, hashlib, threading
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+log = logging.getLogger(__name__)
+
+# Every handler shares the cached frame; copy-on-write guarantees that filtering,
+# slicing or assigning on a derived frame never writes back into the shared one.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+NUMERIC_COLUMNS = ["Avg_Salary", "Min_Salary", "Max_Salary", "Rating"]
+TEXT_COLUMNS = ["Skills", "Sector", "Location", "Company_Name"]
+DEFAULT_YEAR = 2023
+
+
+# ---------------- Normalization ----------------
+def read_csv_bytes(raw: bytes) -> pd.DataFrame:
+    """Parse CSV bytes, falling back to latin1 without re-reading the file."""
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin1")
+    return pd.read_csv(io.StringIO(text))
+
+
+def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the portal's cleaning rules: numeric coercion, text fill, derived Year."""
+    df.columns = [c.strip() for c in df.columns]
+
+    # Normalize numeric columns
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+
+    # Fill text fields
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna("Unknown")
+
+    # Derive year
+    if "Date" in df.columns:
+        df["Year"] = pd.to_datetime(df["Date"], errors="coerce").dt.year.fillna(DEFAULT_YEAR).astype(int)
+    elif "Year" not in df.columns:
+        df["Year"] = DEFAULT_YEAR
+
+    # Dictionary-encode text: small integer codes plus one copy of each distinct value
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("category")
+
+    return df
+
+
+def normalize_delta(records, base: pd.DataFrame) -> pd.DataFrame:
+    """Normalize appended postings like the CSV and align them to `base`'s columns and dtypes."""
+    raw = pd.DataFrame.from_records(records)
+    raw.columns = [str(c).strip() for c in raw.columns]
+    keep = [c for c in base.columns if not (c == "Year" and "Date" in base.columns)]
+    df = normalize_df(raw.reindex(columns=keep))
+    df = df.reindex(columns=base.columns)
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object).astype("category")
+        elif df[col].dtype != base[col].dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(base[col].dtype)
+    return df
+
+
+def concat_frames(frames) -> pd.DataFrame:
+    """Row-concatenate aligned frames, keeping categorical columns categorical."""
+    columns = {}
+    for col in frames[0].columns:
+        parts = [f[col] for f in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = pd.Series(union_categoricals(parts, ignore_order=True), name=col)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+# Derived values that can absorb appended rows instead of being rebuilt:
+# name → extend(previous_value, delta_frame, new_dataset)
+INCREMENTAL = {}
+
+
+def incremental(name):
+    """Register an extender for the Dataset.derived() value stored under `name`."""
+    def register(extend):
+        INCREMENTAL[name] = extend
+        return extend
+    return register
+
+
+# ---------------- Dataset version ----------------
+class Dataset:
+    """One loaded version of the dataset plus anything derived from it.
+
+    Backed either by a parsed frame or by a memory-mapped snapshot, plus any
+    postings appended since (see ingest.py). Frames handed out are shared by
+    all requests and must be treated as read-only.
+    """
+
+    def __init__(self, df=None, fingerprint=None, stat_key=None, snapshot=None):
+        self._df = df if df is not None or snapshot is not None else pd.DataFrame()
+        self.snapshot = snapshot
+        self.fingerprint = fingerprint
+        self.base_fingerprint = fingerprint  # the CSV/snapshot alone, without deltas
+        self.stat_key = stat_key
+        self.base = self
+        self.deltas = []
+        self.delta_offset = 0
+        self.delta_hash = None
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    @property
+    def columns(self):
+        return list(self.snapshot.columns) if self.snapshot is not None else list(self._df.columns)
+
+    def __len__(self):
+        base = self.snapshot.rows if self.snapshot is not None else len(self._df)
+        return base + sum(len(d) for d in self.deltas)
+
+    @property
+    def empty(self):
+        return len(self) == 0 or not self.columns
+
+    @property
+    def df(self):
+        return self.frame()
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """Return a frame holding only the requested columns (all when None)."""
+        key = None if columns is None else tuple(columns)
+        return self.derived(("frame", key), lambda ds: ds._build_frame(key))
+
+    def _build_frame(self, columns):
+        names = self.columns if columns is None else [c for c in columns if c in self.columns]
+        if self.snapshot is None:
+            base = self._df if columns is None else self._df[names]
+        else:
+            base = pd.DataFrame({c: self.snapshot.series(c) for c in names}, copy=False)
+        if not self.deltas:
+            return base
+        # Appended rows are stitched on lazily, only when a handler needs rows
+        return concat_frames([base] + [d[names] for d in self.deltas])
+
+    def extend(self, delta: pd.DataFrame, delta_hash, delta_offset):
+        """New version with `delta` rows appended.
+
+        Derived values with a registered extender are carried over and updated
+        for the new rows only; everything else is rebuilt on demand.
+        """
+        child = Dataset(self._df, delta_hash.hexdigest(), self.stat_key, self.snapshot)
+        child.base = self.base
+        child.base_fingerprint = self.base_fingerprint
+        child.deltas = self.deltas + [delta]
+        child.delta_offset = delta_offset
+        child.delta_hash = delta_hash
+        with self._lock:
+            carried = [(k, v) for k, v in self._derived.items() if k in INCREMENTAL]
+        for name, value in carried:
+            child._derived[name] = INCREMENTAL[name](value, delta, child)
+        return child
+
+    def derived(self, name, builder):
+        """Return builder(self), computed once for this dataset version."""
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = builder(self)
+            return self._derived[name]
+
+
+# ---------------- Store ----------------
+class DatasetStore:
+    """Process-wide cache of the jobs dataset.
+
+    The CSV is parsed and normalized once; later calls only stat the file. When
+    mtime or size change the content hash is recomputed and the data is reloaded
+    only if the bytes actually differ. If a compiled snapshot (see snapshot.py)
+    matches the CSV, columns are memory-mapped from it instead of parsed.
+    """
+
+    def __init__(self, path, snapshot_dir=None, delta_path=None):
+        self.path = path
+        self.snapshot_dir = snapshot_dir
+        self.delta_path = delta_path
+        self._dataset = None
+        self._base = None
+        self._key = None
+        self._lock = threading.Lock()
+        self.background = None  # callable: true while a worker reloads on change (see reload())
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        # A freshly compiled snapshot also counts as a new version
+        if self.snapshot_dir:
+            try:
+                cur = os.stat(os.path.join(self.snapshot_dir, "CURRENT"))
+                key += (cur.st_mtime_ns,)
+            except OSError:
+                key += (None,)
+        # Appended postings: the delta log only ever grows until compaction
+        if self.delta_path:
+            try:
+                key += (os.stat(self.delta_path).st_size,)
+            except OSError:
+                key += (0,)
+        return key
+
+    def _open_snapshot(self):
+        if not self.snapshot_dir:
+            return None
+        from snapshot import Snapshot
+        return Snapshot.open_current(self.snapshot_dir)
+
+    def _load(self, stat_key, previous):
+        base_key = stat_key[:-1] if stat_key is not None and self.delta_path else stat_key
+        base = self._base
+        if base is None or base.stat_key != base_key:
+            base = self._load_base(base_key, base)
+            self._base = base
+        if not self.delta_path or base.empty:
+            return base
+
+        # Continue from the previous version when it sits on the same base and
+        # the log was only appended to; otherwise replay the log from the start.
+        start = previous if previous is not None and previous.base is base else base
+        if stat_key[-1] < start.delta_offset:
+            start = base
+        return self._apply_delta(start, stat_key[-1])
+
+    def _apply_delta(self, ds, size):
+        if size <= ds.delta_offset:
+            return ds
+        with open(self.delta_path, "rb") as f:
+            f.seek(ds.delta_offset)
+            raw = f.read(size - ds.delta_offset)
+        raw = raw[:raw.rfind(b"\n") + 1]  # complete lines only
+        records = []
+        for line in raw.splitlines():
+            try:
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                record = None
+                log.warning("Skipping malformed delta line: %r", line[:80])
+            if isinstance(record, dict):
+                records.append(record)
+        if not records:
+            ds.delta_offset += len(raw)
+            return ds
+        delta = normalize_delta(records, ds.base.frame(None).iloc[:0])
+        # sha1(base fingerprint + log bytes), carried forward so any split of the
+        # log into appends yields the same version id
+        digest = ds.delta_hash.copy() if ds.delta_hash else hashlib.sha1(ds.base_fingerprint.encode("utf-8"))
+        digest.update(raw)
+        log.info("➕ Appended %d postings (version %s)", len(delta), digest.hexdigest()[:12])
+        return ds.extend(delta, digest, ds.delta_offset + len(raw))
+
+    def _load_base(self, stat_key, previous):
+        if stat_key is None:
+            log.warning("Data file not found: %s", self.path)
+            return Dataset(pd.DataFrame())
+
+        snap = self._open_snapshot()
+        if snap is not None and snap.source_stat_key == stat_key[:2]:
+            return self._from_snapshot(snap, stat_key, previous)
+
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        fingerprint = hashlib.sha1(raw).hexdigest()
+
+        if snap is not None and snap.source_fingerprint == fingerprint:
+            return self._from_snapshot(snap, stat_key, previous)
+
+        # Touched but unchanged: keep the cached frame and its derived state
+        if previous is not None and previous.fingerprint == fingerprint and previous.snapshot is None:
+            previous.stat_key = stat_key
+            return previous
+
+        if snap is not None:
+            log.warning("Snapshot is stale, parsing CSV (run: python snapshot.py)")
+        df = normalize_df(read_csv_bytes(raw))
+        log.info("📦 Dataset loaded: %d rows (version %s)", len(df), fingerprint[:12])
+        return Dataset(df, fingerprint, stat_key)
+
+    def _from_snapshot(self, snap, stat_key, previous):
+        if (previous is not None and previous.snapshot is not None
+                and previous.snapshot.version_dir == snap.version_dir):
+            previous.stat_key = stat_key
+            return previous
+        log.info("📦 Dataset mapped from snapshot: %d rows (version %s)", snap.rows, snap.source_fingerprint[:12])
+        return Dataset(fingerprint=snap.source_fingerprint, stat_key=stat_key, snapshot=snap)
+
+    def current(self, wait=False) -> Dataset:
+        """Return the current dataset version, reloading if the file changed.
+
+        While another thread is loading the next version, the previous one is
+        returned (unless `wait`), so readers never queue behind a reload. While
+        `background()` is true a worker publishes new versions through reload(),
+        so the published one is returned without loading anything here.
+        """
+        stat_key = self._stat_key()
+        ds = self._dataset
+        if ds is not None and self._key == stat_key:
+            return ds
+        if ds is not None and not wait and self.background is not None and self.background():
+            return ds
+        if not self._lock.acquire(blocking=wait or ds is None):
+            return ds
+        try:
+            return self._publish(stat_key)
+        finally:
+            self._lock.release()
+
+    def changed(self):
+        """True if the files on disk differ from the published version."""
+        return self._dataset is None or self._stat_key() != self._key
+
+    def reload(self, prepare=None) -> Dataset:
+        """Load the files' current version and run prepare(ds) on it before it is published."""
+        with self._lock:
+            return self._publish(self._stat_key(), prepare)
+
+    def _publish(self, stat_key, prepare=None):
+        ds = self._dataset
+        if ds is None or self._key != stat_key:
+            ds = self._load(stat_key, ds)
+            if prepare is not None:
+                prepare(ds)
+            self._dataset = ds
+            self._key = stat_key
+        elif prepare is not None:
+            prepare(ds)
+        return ds
+
+    def get(self, columns=None) -> pd.DataFrame:
+        """Return the current normalized (read-only) frame, optionally projected."""
+        return self.current().frame(columns)
@@ -0,0 +1,73 @@
+# filters.py
+"""Shared row filter engine for the analytics and report endpoints.
+
+Filters never touch the rows themselves: each predicate is evaluated once
+over a dimension's distinct values (lowercased up front, per dataset
+version) to give a category mask, and category masks are combined through
+the cube's integer codes into one boolean mask over cells or rows. Report
+generation and export build their masks here, so both see the same rows.
+"""
+from functools import lru_cache
+import numpy as np
+from aggregates import build_cube
+
+FILTER_CACHE_SIZE = 1024
+REPORT_FILTERS = (("year", "Year"), ("sector", "Sector"), ("location", "Location"))
+
+
+class FilterEngine:
+    """Category-mask filters over one AggregateCube."""
+
+    def __init__(self, cube):
+        self.cube = cube
+        self._lower = {dim: np.array([str(v).lower() for v in cube.categories(dim)], dtype=str)
+                       for dim in cube.dimensions}
+        self.contains = lru_cache(maxsize=FILTER_CACHE_SIZE)(self._contains)
+
+    # ---------------- Category masks ----------------
+    def _contains(self, dim, text):
+        """Category mask of values containing `text` (case-insensitive)."""
+        values = self._lower[dim]
+        mask = np.char.find(values, text.lower()) >= 0 if len(values) else np.zeros(0, dtype=bool)
+        mask.flags.writeable = False  # shared through the cache
+        return mask
+
+    def codes(self, dim, codes):
+        """Category mask with the given category codes set."""
+        return self.cube.code_mask(dim, codes)
+
+    def report_masks(self, **filters):
+        """Masks for the report filters (year/sector/location substrings); blanks are skipped."""
+        masks = {}
+        for key, dim in REPORT_FILTERS:
+            text = str(filters.get(key) or "").strip()
+            if text and dim in self._lower:
+                masks[dim] = self.contains(dim, text)
+        return masks
+
+    # ---------------- Combining ----------------
+    def cells(self, masks):
+        """Boolean mask over cube cells (None when unfiltered)."""
+        return self.cube.select(**masks) if masks else None
+
+    def rows(self, masks):
+        """Boolean mask over dataset rows (None when unfiltered)."""
+        return self.cube.row_mask(**masks) if masks else None
+
+    def matches(self, masks, rows):
+        """Boolean per entry of `rows` (row positions): does that row pass `masks`?"""
+        sel = np.ones(len(rows), dtype=bool)
+        for dim, mask in masks.items():
+            sel &= mask[self.cube.row_codes[dim][rows]]
+        return sel
+
+    def positions(self, masks, limit=None):
+        """Row positions matching `masks`, in dataset order, at most `limit` of them."""
+        if not masks:
+            return np.arange(self.cube.n_rows if limit is None else min(limit, self.cube.n_rows))
+        return np.flatnonzero(self.rows(masks))[:limit]
+
+
+def build_filter_engine(dataset) -> FilterEngine:
+    """Dataset.derived() builder: one engine per dataset version."""
+    return FilterEngine(dataset.derived("cube", build_cube))
@@ -1,54 +1,108 @@
 # generate_sample_data.py
-import csv, os, random
-from faker import Faker
-from datetime import datetime
-fake = Faker()
+"""Synthetic job postings for development and benchmarks.
 
-OUT = os.path.join("data","data_analyst_jobs.csv")
-os.makedirs("data", exist_ok=True)
+    python generate_sample_data.py                       # 2,500 rows → data/data_analyst_jobs.csv
+    python generate_sample_data.py --rows 1000000 --out /tmp/jobs_1m.csv --seed 7
 
+Columns are drawn with NumPy for all rows at once. Faker is only used for a
+small pool of job descriptions that rows sample from, so a million rows take
+seconds rather than minutes.
+"""
+import os, argparse
+import numpy as np
+import pandas as pd
+
+OUT = os.path.join("data", "data_analyst_jobs.csv")
+DESCRIPTION_POOL = 500
+
+titles = ["Data Analyst", "Senior Data Analyst", "Data Scientist", "BI Analyst", "Research Analyst"]
 companies = ["DataWorks","AnalyticaX","Insightify","TechPulse","FinSight","BioStats","RetailEdge","HealthSense"]
 locations = ["New York, NY","San Francisco, CA","Bengaluru, KA","Mumbai, MH","Delhi, DL","Hyderabad, TS","Pune, MH","Chennai, TN"]
 industries = ["Information Technology","Finance","Healthcare","Retail","Biotech","E-Commerce","Education","Consulting"]
 ownerships = ["Private", "Public", "Subsidiary", "Non-profit"]
 sectors = ["Analytics","Data Science","Business Intelligence","Research","Product"]
+sizes = ["1-50","51-200","201-1000","1001-5000","5000+"]
+revenues = ["<1M","1M-10M","10M-100M","100M-1B",">1B"]
 skills_pool = ["Python","SQL","Excel","Tableau","PowerBI","R","Spark","AWS","NLP","Deep Learning","Statistics","Git"]
 
-def random_skills():
-    return ";".join(random.sample(skills_pool, k=random.randint(2,6)))
-
-rows = []
-for i in range(2500):
-    title = random.choice(["Data Analyst","Senior Data Analyst","Data Scientist","BI Analyst","Research Analyst"])
-    salary_low = random.randint(30,100) * 1000
-    salary_high = salary_low + random.randint(5,60) * 1000
-    rating = random.choice(["", round(random.uniform(2.5, 4.8), 1)])  # ✅ fixed line
-    company = random.choice(companies)
-    location = random.choice(locations)
-    hq = random.choice(locations)
-    size = random.choice(["1-50","51-200","201-1000","1001-5000","5000+"])
-    industry = random.choice(industries)
-    sector = random.choice(sectors)
-    revenue = random.choice(["<1M","1M-10M","10M-100M","100M-1B",">1B"])
-    easy_apply = random.choice(["Yes","No"])
-    year = random.randint(2016,2025)
-    month = random.randint(1,12)
-    date = f"{year}-{month:02d}-{random.randint(1,28):02d}"
-    desc = fake.paragraph(nb_sentences=3)
-    skills = random_skills()
-    min_sal = salary_low
-    max_sal = salary_high
-    avg_sal = int((min_sal + max_sal)/2)
-    rows.append([
-        title, f"${min_sal//1000}K-${max_sal//1000}K", rating or "", company, location,
-        hq, size, ownerships, industry, sector, revenue, easy_apply, desc, skills,
-        min_sal, max_sal, avg_sal, date
-    ])
-
 header = ["Job_Title","Salary_Estimate","Rating","Company_Name","Location","Headquarters","Size","Type_of_Ownership","Industry","Sector","Revenue","Easy_Apply","Job_Description","Skills","Min_Salary","Max_Salary","Avg_Salary","Date"]
-with open(OUT, "w", newline='', encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(header)
-    writer.writerows(rows)
 
-print(f"Generated {len(rows)} rows -> {OUT}")
+
+def description_pool(n, seed=None):
+    try:
+        from faker import Faker
+    except ImportError:
+        return [f"Sample job description {i}." for i in range(n)]
+    fake = Faker()
+    Faker.seed(seed)
+    return [fake.paragraph(nb_sentences=3) for _ in range(n)]
+
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def random_skills(rng, n):
+    """2–6 distinct skills per row in random order, ';'-joined."""
+    order = np.argsort(rng.random((n, len(skills_pool))), axis=1)  # a random permutation per row
+    k = rng.integers(2, 7, n)
+    names = np.asarray(skills_pool, dtype=object)[order]
+    out = pd.Series(names[:, 0])
+    for j in range(1, 6):
+        out = out.where(k <= j, out + ";" + names[:, j])
+    return out
+
+
+def generate(n_rows=2500, seed=None):
+    """DataFrame of `n_rows` synthetic postings with the portal's CSV columns."""
+    rng = np.random.default_rng(seed)
+    low_k = rng.integers(30, 101, n_rows)
+    spread_k = rng.integers(5, 61, n_rows)
+    salary_low, salary_high = low_k * 1000, (low_k + spread_k) * 1000
+    rating = rng.integers(25, 49, n_rows)  # tenths: 2.5–4.8
+    date = rng.integers(0, 10 * 12 * 28, n_rows)  # (year, month, day) code
+    descriptions = np.asarray(description_pool(min(n_rows, DESCRIPTION_POOL), seed), dtype=object)
+
+    # Formatted strings come from small lookup tables instead of per-row formatting
+    estimates = np.asarray([[f"${lo}K-${lo + d}K" for d in range(61)] for lo in range(101)], dtype=object)
+    ratings = np.asarray([f"{t / 10:.1f}" for t in range(49)], dtype=object)
+    dates = np.asarray([f"{2016 + y}-{m:02d}-{d:02d}" for y in range(10) for m in range(1, 13) for d in range(1, 29)],
+                       dtype=object)
+
+    df = pd.DataFrame({
+        "Job_Title": _pick(rng, titles, n_rows),
+        "Salary_Estimate": estimates[low_k, spread_k],
+        "Rating": np.where(rng.random(n_rows) < 0.5, "", ratings[rating]),  # half the ratings missing
+        "Company_Name": _pick(rng, companies, n_rows),
+        "Location": _pick(rng, locations, n_rows),
+        "Headquarters": _pick(rng, locations, n_rows),
+        "Size": _pick(rng, sizes, n_rows),
+        "Type_of_Ownership": _pick(rng, ownerships, n_rows),
+        "Industry": _pick(rng, industries, n_rows),
+        "Sector": _pick(rng, sectors, n_rows),
+        "Revenue": _pick(rng, revenues, n_rows),
+        "Easy_Apply": _pick(rng, ["Yes", "No"], n_rows),
+        "Job_Description": descriptions[rng.integers(0, len(descriptions), n_rows)],
+        "Skills": random_skills(rng, n_rows),
+        "Min_Salary": salary_low,
+        "Max_Salary": salary_high,
+        "Avg_Salary": (salary_low + salary_high) // 2,
+        "Date": dates[date],
+    })
+    return df[header]
+
+
+def write_sample_data(path=OUT, n_rows=2500, seed=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    generate(n_rows, seed).to_csv(path, index=False, encoding="utf-8")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic job postings.")
+    parser.add_argument("--rows", type=int, default=2500)
+    parser.add_argument("--out", default=OUT)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    write_sample_data(args.out, args.rows, args.seed)
+    print(f"Generated {args.rows} rows -> {args.out}")
@@ -0,0 +1,117 @@
+# ingest.py
+"""Append-only ingestion of new job postings.
+
+    python ingest.py new_postings.csv     # append postings (.csv, .json or .ndjson)
+    python ingest.py --compact            # fold the delta log into the CSV
+
+Postings are appended as NDJSON lines to a delta log next to the CSV. The
+running app (datastore.DatasetStore) reads only the bytes added since its
+current version and extends its aggregates and skill counts for those rows.
+Compaction rewrites the CSV once, starts an empty log and, if a snapshot is
+in use, recompiles it.
+"""
+import os, io, sys, csv, json, logging, threading
+from snapshot import compile_snapshot
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "data", "data_analyst_jobs.csv")
+DELTA_PATH = os.path.join(BASE_DIR, "data", "postings.delta.ndjson")
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "data", "snapshot")
+
+_append_lock = threading.Lock()
+
+
+# ---------------- Append ----------------
+def append_postings(records, delta_path=DELTA_PATH):
+    """Append posting dicts to the delta log in one fsync'd write; returns how many."""
+    lines = [json.dumps({str(k).strip(): v for k, v in r.items()}, ensure_ascii=False, default=str)
+             for r in records if isinstance(r, dict) and r]
+    if not lines:
+        return 0
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    with _append_lock, open(delta_path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(lines)
+
+
+def load_postings(path):
+    """Read postings from a .csv, .json (array) or .ndjson/.jsonl file."""
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".ndjson", ".jsonl")):
+            return [json.loads(line) for line in f if line.strip()]
+        if path.lower().endswith(".json"):
+            data = json.load(f)
+            return data.get("rows", []) if isinstance(data, dict) else data
+        return list(csv.DictReader(f))
+
+
+# ---------------- Compact ----------------
+def compact(csv_path=DATA_PATH, delta_path=DELTA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Fold the delta log into the CSV and start a fresh log; returns rows folded.
+
+    Lines that do not parse to an object are logged and dropped; the old log is
+    removed only once the CSV holding the good ones has been replaced.
+    """
+    pending = f"{delta_path}.compacting"
+    if not os.path.exists(pending):  # left over if a previous compaction was interrupted
+        if not os.path.exists(delta_path):
+            return 0
+        os.replace(delta_path, pending)  # appends from here on go to a fresh log
+
+    records = []
+    with open(pending, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            # Torn or malformed lines are skipped, as the app does when it reads the log
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                records.append(record)
+            else:
+                log.warning("Skipping malformed delta line: %r", line[:80])
+    with open(csv_path, "rb") as f:
+        raw = f.read()
+    try:
+        raw.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        encoding = "latin1"
+    header = next(csv.reader(io.StringIO(raw.decode(encoding).split("\n", 1)[0])))
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for r in records:
+        writer.writerow([r.get(h.strip(), "") for h in header])
+    if raw and not raw.endswith(b"\n"):
+        raw += b"\n"
+
+    tmp = f"{csv_path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.write(out.getvalue().encode(encoding, errors="replace"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, csv_path)
+    os.remove(pending)
+
+    if snapshot_dir and os.path.exists(os.path.join(snapshot_dir, "CURRENT")):
+        compile_snapshot(csv_path, snapshot_dir)
+    return len(records)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if len(sys.argv) > 1 and sys.argv[1] == "--compact":
+        print(f"🗜️ Compacted {compact()} postings into {DATA_PATH}")
+    elif len(sys.argv) > 1:
+        n = sum(append_postings(load_postings(p)) for p in sys.argv[1:])
+        print(f"➕ Appended {n} postings → {DELTA_PATH}")
+    else:
+        print("usage: python ingest.py <postings.csv|.json|.ndjson> ... | --compact")
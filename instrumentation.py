@@ -0,0 +1,215 @@
+# instrumentation.py
+"""Request metrics, stage timers, a sampling profiler and buffered logging.
+
+- METRICS holds Prometheus-style histograms: request latency per route and
+  stage timings inside handlers (load, filter, groupby, serialize, db_read,
+  db_write, ...). Gauges are read from callbacks at scrape time. render()
+  returns the text exposition format served on /metrics.
+- stage("filter") times a block and records it under the current route.
+- PROFILER samples every thread's stack at a fixed interval while enabled
+  and aggregates collapsed stacks ("a;b;c count", flamegraph input).
+- configure_logging() sends log records through a queue; a listener thread
+  does the actual writes, so handlers never block on stdout.
+"""
+import os, sys, time, queue, atexit, logging, threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_MAX_DEPTH = 64
+
+
+# ---------------- Logging ----------------
+_listener = None
+
+
+def configure_logging(level=None, stream=None):
+    """Route the root logger through a queue; level defaults to $LOG_LEVEL or INFO."""
+    global _listener
+    if _listener is not None:
+        return
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    _listener.start()
+    atexit.register(_listener.stop)  # drain the queue on shutdown
+
+
+# ---------------- Metrics ----------------
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram (non-cumulative counts; cumulated on render)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: > largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Labelled histograms and counters plus scrape-time gauges."""
+
+    def __init__(self, prefix="portal"):
+        self.prefix = prefix
+        self._histograms = {}  # name -> {labels tuple: Histogram}
+        self._counters = {}  # name -> Counter(labels tuple)
+        self._help = {}
+        self._gauges = []  # callbacks returning [(name, labels dict, value)]
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, help_text="", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name, amount=1, help_text="", **labels):
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._counters.setdefault(name, Counter())[tuple(sorted(labels.items()))] += amount
+
+    def gauge(self, callback):
+        """Register callback() → iterable of (name, labels dict, value), read on every scrape."""
+        self._gauges.append(callback)
+        return callback
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                lines += [f"# HELP {p}_{name} {self._help.get(name, '')}", f"# TYPE {p}_{name} histogram"]
+                for key, hist in series.items():
+                    running = 0
+                    for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                        running += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{p}_{name}_bucket{_labels(key + (('le', le),))} {running}")
+                    lines.append(f"{p}_{name}_sum{_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{p}_{name}_count{_labels(key)} {hist.count}")
+            for name, series in self._counters.items():
+                lines += [f"# HELP {p}_{name} {self._help.get(name, '')}", f"# TYPE {p}_{name} counter"]
+                lines += [f"{p}_{name}{_labels(key)} {value}" for key, value in series.items()]
+        seen = set()
+        for callback in self._gauges:
+            try:
+                samples = list(callback())
+            except Exception as e:  # a broken gauge must not break the scrape
+                logging.getLogger(__name__).warning("Gauge %s failed: %s", getattr(callback, "__name__", callback), e)
+                continue
+            for name, labels, value in samples:
+                if name not in seen:
+                    lines.append(f"# TYPE {p}_{name} gauge")
+                    seen.add(name)
+                lines.append(f"{p}_{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+_current = threading.local()
+
+
+def set_route(route):
+    """Label later stage() timings on this thread with `route` (None clears it)."""
+    _current.route = route
+
+
+@contextmanager
+def stage(name, route=None):
+    """Time a block as one handler stage of `route` (default: the current request's route)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        route = route or getattr(_current, "route", None) or "-"
+        METRICS.observe("stage_duration_seconds", time.perf_counter() - t0,
+                        "Time spent in a handler stage.", route=route, stage=name)
+
+
+# ---------------- Sampling profiler ----------------
+class SamplingProfiler:
+    """Samples all threads' stacks every `interval` seconds while running."""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None, reset=True):
+        with self._lock:
+            if self.running:
+                return False
+            if interval:
+                self.interval = float(interval)
+            if reset:
+                self.samples = Counter()
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self._thread.join()
+            return True
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks, most sampled first (input for flamegraph tools)."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def status(self):
+        return {"running": self.running, "interval_ms": self.interval * 1000,
+                "samples": sum(self.samples.values()), "stacks": len(self.samples),
+                "started_at": self.started_at}
+
+
+PROFILER = SamplingProfiler()
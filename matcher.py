@@ -0,0 +1,89 @@
+# matcher.py
+"""Fuzzy category matching for the analytics filters.
+
+Each filterable column gets a FuzzyMatcher built once per dataset version:
+the distinct values are normalized up front, scored with fuzzywuzzy's
+partial_ratio rebuilt on RapidFuzz's C edit operations, and query results
+are memoized. A match resolves to category codes, so applying the
+filter is an integer lookup instead of re-lowercasing the column.
+"""
+from functools import lru_cache
+import numpy as np
+from rapidfuzz import fuzz, utils
+from rapidfuzz.distance import Levenshtein
+
+MATCH_CACHE_SIZE = 2048
+
+
+def partial_ratio(s1, s2):
+    """fuzzywuzzy's partial_ratio: best ratio over windows aligned on matching blocks.
+
+    RapidFuzz's own partial_ratio searches every alignment, which scores some
+    short queries higher and changes which candidate wins, so the block
+    heuristic is kept to preserve the filter's existing matches.
+    """
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
+    shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
+    best = 0.0
+    for src, dest, _ in Levenshtein.opcodes(shorter, longer).as_matching_blocks():
+        start = max(dest - src, 0)
+        r = fuzz.ratio(shorter, longer[start:start + len(shorter)]) / 100
+        if r > .995:
+            return 100
+        best = max(best, r)
+    return int(round(100 * best))
+
+
+class FuzzyMatcher:
+    """Normalized candidate vocabulary for one column plus an LRU of query → codes."""
+
+    def __init__(self, values):
+        # values are the column's categories in code order
+        self.candidates = []
+        self._codes = {}
+        for code, value in enumerate(values):
+            key = str(value).lower()
+            if key not in self._codes:
+                self._codes[key] = []
+                self.candidates.append(key)
+            self._codes[key].append(code)
+        self._codes = {k: np.asarray(v, dtype=np.intp) for k, v in self._codes.items()}
+        # Same preprocessing fuzzywuzzy applied (lowercase, punctuation → space), done once
+        self._processed = [utils.default_process(c) for c in self.candidates]
+        self.match = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+        self.contains = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._contains)
+
+    def _match(self, query, cutoff):
+        """Best (candidate, score) with a rounded partial_ratio >= cutoff, else None."""
+        q = utils.default_process(query)
+        if not q:
+            return None
+        # Like fuzzywuzzy's extractOne: the first candidate with the top score wins
+        index, score = 0, -1
+        for i, candidate in enumerate(self._processed):
+            s = partial_ratio(q, candidate)
+            if s > score:
+                index, score = i, s
+        if score < cutoff:
+            return None
+        return self.candidates[index], score
+
+    def _contains(self, query):
+        """Candidates containing `query` as a substring (the no-match fallback)."""
+        return tuple(c for c in self.candidates if query in c)
+
+    def codes(self, candidates):
+        """Category codes of one candidate or a sequence of candidates."""
+        if isinstance(candidates, str):
+            return self._codes[candidates]
+        if not candidates:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate([self._codes[c] for c in candidates])
+
+
+def build_matchers(cube, dims=("Year", "Sector", "Location")):
+    """One matcher per filterable cube dimension."""
+    return {dim: FuzzyMatcher(cube.categories(dim)) for dim in dims if dim in cube.dimensions}
@@ -0,0 +1,277 @@
+# model_registry.py
+"""Salary model registry.
+
+train_model.py publishes a fitted pipeline together with the tables the
+predictor needs (sector classes, residual std, training size) via
+publish_model(). The app keeps one loaded model in memory, keyed by the
+fingerprint of the dataset it was trained on, and swaps it atomically when a
+new version is published. If no artifact matches the current dataset, a
+baseline LinearRegression is fitted once per dataset version instead.
+Appended postings (ingest.py) do not retire either model; they are picked
+up when the delta log is compacted into the CSV and the model retrained.
+"""
+import os, json, shutil, logging, threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import joblib
+from datastore import incremental
+from compact_forest import CompactForest, export_forest
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+META_FILE = "salary_model.json"
+MIN_TRAIN_ROWS = 20
+PIPELINE_MIN_ROWS = 256  # batches this large score faster through sklearn than the compact forest
+
+
+# ---------------- Forest scoring ----------------
+class ForestScorer:
+    """Compact forest for small batches; the joblib pipeline for batches of PIPELINE_MIN_ROWS or more.
+
+    The NumPy forest loads fast and answers single rows sooner, but sklearn's
+    compiled tree walk is several times faster on large batches. The pickle is
+    memory-mapped on the first large batch, so workers that never see one
+    never load it.
+    """
+
+    def __init__(self, compact, pipeline_path):
+        self.compact = compact
+        self.pipeline_path = pipeline_path
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def pipeline(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    try:
+                        self._pipeline = joblib.load(self.pipeline_path, mmap_mode="r")
+                    except ValueError:  # compressed pickles (published before) cannot be mapped
+                        self._pipeline = joblib.load(self.pipeline_path)
+        return self._pipeline
+
+    def predict(self, X):
+        if len(X) < PIPELINE_MIN_ROWS:
+            return self.compact.predict(X)
+        return self.pipeline().predict(X)
+
+
+# ---------------- Model wrapper ----------------
+class SalaryModel:
+    """A fitted salary model plus the precomputed tables used for confidence."""
+
+    def __init__(self, kind, estimator, classes, resid_std, y_mean, n_train,
+                 median_salary, fingerprint=None, version=None):
+        self.kind = kind  # "pipeline" (published), "linear" (baseline) or "median"
+        self.estimator = estimator
+        self.classes = np.asarray(classes, dtype=object)
+        self.lower_classes = [str(c).lower() for c in self.classes]
+        self._lower_index = {}
+        for i, c in enumerate(self.lower_classes):
+            self._lower_index.setdefault(c, i)
+        self.resid_std = float(resid_std)
+        self.y_mean = float(y_mean)
+        self.n_train = int(n_train)
+        self.median_salary = float(median_salary)
+        self.fingerprint = fingerprint
+        self.version = version or kind
+
+        # Confidence only depends on training size and fit, except for the sector bonus
+        size_factor = min(1.0, self.n_train / 1000)
+        fit_quality = max(0.2, 1.0 - (self.resid_std / max(1.0, self.y_mean)))
+        self.base_confidence = 20 + 60 * size_factor * fit_quality
+
+    def match_sector(self, sector_in):
+        """Return (class index, matched) using case-insensitive exact, then substring match."""
+        s = sector_in.lower()
+        if s in self._lower_index:
+            return self._lower_index[s], True
+        idx = next((i for i, c in enumerate(self.lower_classes) if s in c), None)
+        if idx is not None:
+            return idx, True
+        return 0, False
+
+    def predict(self, ratings, sector_codes, skill_counts=None):
+        """Score many rows at once; all arguments are equal-length 1-D arrays."""
+        ratings = np.asarray(ratings, dtype=float)
+        if self.kind == "median":
+            return self.median_salary + ratings * 2000
+        sector_codes = np.asarray(sector_codes, dtype=int)
+        if self.kind == "linear":
+            return self.estimator.predict(np.column_stack([ratings, sector_codes]))
+        if skill_counts is None:
+            skill_counts = np.zeros(len(ratings), dtype=int)
+        X = pd.DataFrame({
+            "Rating": ratings,
+            "Size": "Unknown",
+            "Company_Name": "Unknown",
+            "Sector": self.classes[sector_codes] if len(self.classes) else "Unknown",
+            "Skill_Count": np.asarray(skill_counts, dtype=int),
+        })
+        return self.estimator.predict(X)
+
+    def confidence(self, matched):
+        """Confidence score (%) for a prediction; `matched` may be a bool or bool array."""
+        if self.kind == "median":
+            return np.full(np.shape(matched), 30) if np.ndim(matched) else 30
+        conf = (self.base_confidence + np.where(matched, 15, 0)).astype(int)
+        conf = np.clip(conf, 10, 98)
+        return conf if np.ndim(matched) else int(conf)
+
+
+def fit_baseline_model(dataset) -> SalaryModel:
+    """Fit the Rating + encoded Sector LinearRegression for one dataset version."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import LabelEncoder
+
+    needed = ["Avg_Salary", "Rating", "Sector"]
+    df = dataset.frame(needed)
+    median = df["Avg_Salary"].median() if "Avg_Salary" in df.columns else 50000
+    train = df.dropna() if all(c in df.columns for c in needed) else df.iloc[0:0]
+    if len(train) < MIN_TRAIN_ROWS:
+        return SalaryModel("median", None, [], 0, 0, len(train), median, dataset.fingerprint)
+
+    le = LabelEncoder()
+    X = np.column_stack([train["Rating"].to_numpy(dtype=float),
+                         le.fit_transform(train["Sector"].astype(str))])
+    y = train["Avg_Salary"].to_numpy(dtype=float)
+    model = LinearRegression().fit(X, y)
+    residuals = y - model.predict(X)
+    resid_std = np.std(residuals) if len(residuals) > 1 else np.std(y) or 1
+    return SalaryModel("linear", model, le.classes_, resid_std, np.mean(y), len(train),
+                       median, dataset.fingerprint, version=f"linear-{(dataset.fingerprint or '')[:12]}")
+
+
+@incremental("salary_model")
+def keep_baseline_model(model, delta, dataset):
+    """Appended rows keep the baseline fitted on the base dataset until compaction."""
+    return model
+
+
+# ---------------- Publish (used by train_model.py) ----------------
+def publish_model(estimator, meta: dict, model_dir=MODEL_DIR):
+    """Write a versioned artifact, then atomically point the metadata file at it."""
+    os.makedirs(model_dir, exist_ok=True)
+    version = meta.get("version") or datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    artifact = f"salary_model-{version}.pkl"
+    tmp = os.path.join(model_dir, f".{artifact}.tmp")
+    joblib.dump(estimator, tmp)  # uncompressed, so the app can memory-map it for large batches
+    os.replace(tmp, os.path.join(model_dir, artifact))
+
+    # Flat, memory-mappable forest for fast, shared loading in every worker
+    compact = None
+    if "rf" in getattr(estimator, "named_steps", {}):
+        compact = f"salary_model-{version}.forest"
+        tmp = os.path.join(model_dir, f".{compact}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            export_forest(estimator, tmp)
+            shutil.rmtree(os.path.join(model_dir, compact), ignore_errors=True)
+            os.replace(tmp, os.path.join(model_dir, compact))
+        except ValueError as e:
+            log.warning("Compact export skipped, workers will load the pickle: %s", e)
+            shutil.rmtree(tmp, ignore_errors=True)
+            compact = None
+
+    meta = dict(meta, version=version, artifact=artifact, compact=compact,
+                published_at=datetime.utcnow().isoformat(timespec="seconds"))
+    tmp = os.path.join(model_dir, f".{META_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(model_dir, META_FILE))
+
+    # Keep the previous artifacts around for workers still swapping over
+    for suffix in (".pkl", ".forest"):
+        artifacts = sorted(p for p in os.listdir(model_dir)
+                           if p.startswith("salary_model-") and p.endswith(suffix))
+        for old in artifacts[:-2]:
+            path = os.path.join(model_dir, old)
+            try:
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+            except OSError:
+                pass
+    return os.path.join(model_dir, artifact)
+
+
+# ---------------- Registry ----------------
+class ModelRegistry:
+    """Holds the active salary model and hot-swaps it when a new one is published."""
+
+    def __init__(self, dataset_store, model_dir=MODEL_DIR):
+        self.store = dataset_store
+        self.model_dir = model_dir
+        self._published = None
+        self._meta_key = None
+        self._lock = threading.Lock()
+        self.background = None  # callable: true while a worker calls refresh(wait=True) on change
+
+    def _meta_stat(self):
+        try:
+            st = os.stat(os.path.join(self.model_dir, META_FILE))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def changed(self):
+        """True if the published metadata differs from the loaded one."""
+        return self._meta_stat() != self._meta_key
+
+    def refresh(self, wait=False):
+        """Load the published artifact if its metadata changed since the last check.
+
+        While another thread is loading it, the previously loaded model is
+        returned (unless `wait`), as it is while `background()` is true.
+        """
+        key = self._meta_stat()
+        if key == self._meta_key:
+            return self._published
+        if not wait and self.background is not None and self.background():
+            return self._published
+        if not self._lock.acquire(blocking=wait or self._published is None):
+            return self._published
+        try:
+            if key == self._meta_key:
+                return self._published
+            model = None
+            if key is not None:
+                try:
+                    with open(os.path.join(self.model_dir, META_FILE), encoding="utf-8") as f:
+                        meta = json.load(f)
+                    if meta.get("compact"):
+                        estimator = ForestScorer(CompactForest(os.path.join(self.model_dir, meta["compact"])),
+                                                 os.path.join(self.model_dir, meta["artifact"]))
+                    else:
+                        estimator = joblib.load(os.path.join(self.model_dir, meta["artifact"]))
+                    model = SalaryModel("pipeline", estimator, meta["classes"], meta["resid_std"],
+                                        meta["y_mean"], meta["n_train"], meta["median_salary"],
+                                        meta.get("dataset_fingerprint"), meta["version"])
+                    log.info("🧠 Salary model loaded: %s", model.version)
+                except Exception as e:
+                    log.error("Failed to load published model: %s", e)
+                    model = self._published
+            self._published = model
+            self._meta_key = key
+            return model
+        finally:
+            self._lock.release()
+
+    def version(self):
+        """Version tag of the model current() would serve, without fitting anything."""
+        published = self.refresh()
+        if published is not None and published.fingerprint == self.store.current().base_fingerprint:
+            return published.version
+        return "baseline"  # fitted deterministically from the dataset version
+
+    def current(self) -> SalaryModel:
+        """Return the published model if it was trained on the current dataset, else the baseline."""
+        return self.for_dataset(self.store.current())
+
+    def for_dataset(self, ds) -> SalaryModel:
+        """The model current() serves while `ds` is the current dataset version."""
+        published = self.refresh()
+        if published is not None and published.fingerprint == ds.base_fingerprint:
+            return published
+        return ds.derived("salary_model", fit_baseline_model)
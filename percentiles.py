@@ -0,0 +1,173 @@
+# percentiles.py
+"""Mergeable salary quantile sketches for percentile analytics.
+
+Salaries are counted in logarithmic buckets (the DDSketch scheme): bucket k
+holds values in (γ^(k-1), γ^k] with γ = (1 + α) / (1 - α), and reporting a
+bucket as 2γ^k / (γ + 1) keeps every quantile within a relative error α of
+the exact one. Two sketches with the same γ merge by adding their counts.
+
+One sketch is kept per Year × Sector × Location cell, as a dense
+(cell × bucket) count matrix built once per dataset version. A filter picks
+cells with the same category masks the aggregate cube uses, and its
+percentiles and histogram come from the selected cells' counts summed into
+one sketch, so a query touches cells × buckets counts, never the postings. Memory depends on the number of
+distinct cells and the salary range, not on the row count. Appended
+postings are added into the counts without a rebuild.
+"""
+import math
+import numpy as np
+from datastore import incremental
+from aggregates import build_cube, MEASURE
+
+SKETCH_DIMENSIONS = ["Year", "Sector", "Location"]
+RELATIVE_ACCURACY = 0.01
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 20
+MIN_VALUE, MAX_VALUE = 1.0, 1e9  # salaries are clipped to this range before bucketing
+
+
+class SalarySketches:
+    """Log-bucket salary counts per Year × Sector × Location cell."""
+
+    def __init__(self, cube, salary, relative_accuracy=RELATIVE_ACCURACY):
+        self.dimensions = [d for d in SKETCH_DIMENSIONS if d in cube.dimensions]
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        valid = ~np.isnan(salary)
+        keys = self._keys(salary[valid])
+        self.offset = int(keys.min()) if len(keys) else 0
+        width = int(keys.max()) - self.offset + 1 if len(keys) else 1
+        if self.dimensions and len(keys):
+            shape = [len(cube.categories(d)) for d in self.dimensions]
+            flat = np.ravel_multi_index([cube.row_codes[d][valid] for d in self.dimensions], shape)
+            flat_cells, row_cell = np.unique(flat, return_inverse=True)
+            cells = np.column_stack(np.unravel_index(flat_cells, shape)).astype(np.int32)
+            row_cell = row_cell.reshape(-1)
+        else:
+            cells = np.zeros((1 if len(keys) else 0, len(self.dimensions)), dtype=np.int32)
+            row_cell = np.zeros(len(keys), dtype=np.intp)
+        self.cell_codes = {d: cells[:, i] for i, d in enumerate(self.dimensions)}
+        self.n_cells = len(cells)
+        flat = np.bincount(row_cell * width + (keys - self.offset), minlength=self.n_cells * width)
+        self.counts = flat.reshape(self.n_cells, width).astype(np.int64)
+        self._cells = {key: i for i, key in enumerate(map(tuple, cells.tolist()))}
+
+    def _keys(self, values):
+        values = np.clip(np.asarray(values, dtype=float), MIN_VALUE, MAX_VALUE)
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def bucket_values(self):
+        """Representative salary of every bucket column."""
+        keys = np.arange(self.offset, self.offset + self.counts.shape[1])
+        return 2 * np.power(self.gamma, keys.astype(float)) / (self.gamma + 1)
+
+    # ---------------- Appending ----------------
+    def extended(self, cube, salary) -> "SalarySketches":
+        """New sketches with the last len(salary) rows of `cube` added."""
+        new = SalarySketches.__new__(SalarySketches)
+        new.__dict__.update(self.__dict__)
+        start = cube.n_rows - len(salary)
+        valid = ~np.isnan(salary)
+        keys = self._keys(salary[valid])
+        if not len(keys):
+            return new
+
+        lo = min(self.offset, int(keys.min()))
+        hi = max(self.offset + self.counts.shape[1] - 1, int(keys.max()))
+        codes = zip(*(cube.row_codes[d][start:][valid].tolist() for d in self.dimensions))
+        new._cells = dict(self._cells)
+        row_cell = np.empty(len(keys), dtype=np.intp)
+        for i, key in enumerate(codes):
+            row_cell[i] = new._cells.setdefault(key, len(new._cells))
+        added = len(new._cells) - self.n_cells
+
+        counts = np.zeros((self.n_cells + added, hi - lo + 1), dtype=np.int64)
+        counts[:self.n_cells, self.offset - lo:self.offset - lo + self.counts.shape[1]] = self.counts
+        np.add.at(counts, (row_cell, keys - lo), 1)
+        if added:
+            extra = np.array(list(new._cells)[self.n_cells:], dtype=np.int32).reshape(-1, len(self.dimensions))
+            new.cell_codes = {d: np.concatenate([self.cell_codes[d], extra[:, i]])
+                              for i, d in enumerate(self.dimensions)}
+        new.counts, new.offset, new.n_cells = counts, lo, len(new._cells)
+        return new
+
+    # ---------------- Queries ----------------
+    def select(self, masks=None):
+        """Boolean mask over sketch cells for category masks keyed by dimension (None = all)."""
+        sel = np.ones(self.n_cells, dtype=bool)
+        for dim, mask in (masks or {}).items():
+            if mask is None:
+                continue
+            if dim not in self.cell_codes:
+                raise ValueError(f"No percentile sketches for {dim}")
+            sel &= mask[self.cell_codes[dim]]
+        return sel
+
+    def merged(self, cells=None):
+        """Bucket counts of the selected cells merged into one sketch."""
+        return self.counts.sum(axis=0) if cells is None else self.counts[cells].sum(axis=0)
+
+    def grouped(self, dims, cells=None):
+        """(codes per dim, merged bucket counts per group) for the distinct `dims` combinations."""
+        sel = np.ones(self.n_cells, dtype=bool) if cells is None else cells
+        keys = np.column_stack([self.cell_codes[d][sel] for d in dims])
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        out = np.zeros((len(groups), self.counts.shape[1]), dtype=np.int64)
+        np.add.at(out, inverse.reshape(-1), self.counts[sel])
+        return {d: groups[:, i] for i, d in enumerate(dims)}, out
+
+    def quantiles(self, counts, percentiles=PERCENTILES):
+        """Percentile estimates for each row of `counts` (NaN where a row is empty)."""
+        counts = np.atleast_2d(counts)
+        cum = np.cumsum(counts, axis=1)
+        n = cum[:, -1]
+        ranks = np.asarray(percentiles, dtype=float)[None, :] / 100 * np.maximum(n - 1, 0)[:, None]
+        index = (cum[:, None, :] <= np.floor(ranks)[:, :, None]).sum(axis=2)
+        values = self.bucket_values()[np.minimum(index, counts.shape[1] - 1)]
+        return np.where(n[:, None] > 0, values, np.nan)
+
+    def histogram(self, counts, bins=HISTOGRAM_BINS):
+        """Equal-width histogram of one merged sketch: {"edges": [...], "counts": [...]}."""
+        present = counts > 0
+        if not present.any():
+            return {"edges": [], "counts": []}
+        values = self.bucket_values()[present]
+        hist, edges = np.histogram(values, bins=bins, range=(values.min(), values.max()), weights=counts[present])
+        return {"edges": np.round(edges, 2), "counts": hist.astype(np.int64)}
+
+    def summary(self, counts, bins=HISTOGRAM_BINS):
+        """Count, percentiles and histogram of one merged sketch."""
+        values = self.quantiles(counts)[0]
+        result = {"count": int(counts.sum())}
+        result.update({f"p{p}": (round(float(v), 2) if not np.isnan(v) else None) for p, v in zip(PERCENTILES, values)})
+        result["histogram"] = self.histogram(counts, bins)
+        return result
+
+    def group_columns(self, cube, dims, cells=None):
+        """{dim: values, ..., count: [...], p10: [...], ...} per group, largest groups first."""
+        codes, counts = self.grouped(dims, cells)
+        n = counts.sum(axis=1)
+        order = np.argsort(-n, kind="stable")
+        values = np.round(self.quantiles(counts[order]), 2) if len(order) else np.zeros((0, len(PERCENTILES)))
+        columns = {d: cube.categories(d)[codes[d][order]] for d in dims}
+        columns["count"] = n[order]
+        columns.update({f"p{p}": values[:, i] for i, p in enumerate(PERCENTILES)})
+        return columns
+
+
+def build_salary_sketches(dataset) -> SalarySketches:
+    """Dataset.derived() builder: one set of sketches per dataset version."""
+    cube = dataset.derived("cube", build_cube)
+    df = dataset.frame([MEASURE])
+    salary = df[MEASURE].to_numpy(dtype=float) if MEASURE in df.columns else np.zeros(cube.n_rows)
+    return SalarySketches(cube, salary)
+
+
+@incremental("salary_sketches")
+def extend_salary_sketches(sketches, delta, dataset):
+    # Carried after "cube", so its row codes already include the delta rows
+    cube = dataset.derived("cube", build_cube)
+    salary = delta[MEASURE].to_numpy(dtype=float) if MEASURE in delta.columns else np.full(len(delta), np.nan)
+    return sketches.extended(cube, salary)
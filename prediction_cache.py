@@ -0,0 +1,89 @@
+# prediction_cache.py
+"""Memoized /api/predict_salary results.
+
+The predictor page resubmits the same profiles over and over. Results are
+keyed on the normalized inputs that actually change the answer: lowercased
+job title and sector, the sorted de-duplicated skills and the rating rounded
+to the model's resolution (ratings are entered and stored in 0.1 steps, so
+forest splits fall between those values). The same normalization is applied
+before scoring, so a cached answer is exactly what a fresh one would be.
+
+Entries expire after `ttl` seconds, the least recently used are evicted past
+`max_entries`, and the whole cache is dropped when the served model changes.
+"""
+import time, threading
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL = 15 * 60  # seconds
+RATING_DECIMALS = 1
+
+
+def normalize_rating(rating):
+    return round(float(rating), RATING_DECIMALS)
+
+
+def normalize_skills(skills_list):
+    """Sorted, de-duplicated skill tokens (order and repeats don't change a prediction)."""
+    return sorted(set(skills_list))
+
+
+def prediction_key(job_title, sector, rating, skills_list):
+    return (job_title.strip().lower(), sector.strip().lower(), normalize_rating(rating),
+            tuple(normalize_skills(skills_list)))
+
+
+class PredictionCache:
+    """TTL + LRU bounded results for one model version, with hit/miss counters."""
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._version = None
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        """Cached result for key under `version`, or None if missing or expired."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version, key, result):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (self.clock() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "expired": self.expired, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,520 @@
+# predictions_db.py
+"""SQLite storage for salary predictions.
+
+Connections are opened in WAL mode, so history reads never block prediction
+inserts, and kept in a bounded pool: each read or write checks one out and
+returns it, so requests reuse open connections (and their page caches)
+whatever thread serves them. The pool is filled on first use and emptied in
+forked children, so pre-forked workers never share a connection. Inserts go through a write-behind queue: a
+background writer group-commits queued rows in batches, so request threads
+never wait on an fsync.
+
+Per-day rollups by sector and by location (count, sum, min and max of
+predicted_salary and confidence) are kept up to date by insert triggers in
+the same transaction, so usage statistics read one row per day and group
+instead of every prediction. History is append-only, so the rollups are
+never decremented.
+"""
+import os, json, time, queue, logging, sqlite3, threading, atexit, calendar, contextlib
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 500        # max rows per group commit
+WRITE_LINGER_SECONDS = 0.02   # how long the writer waits to fill a batch
+POOL_SIZE = 8                 # max open connections per store
+POOL_TIMEOUT_SECONDS = 5.0    # wait for a free connection before giving up
+
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",   # durable at checkpoints; safe with WAL
+    "PRAGMA cache_size=-8000",     # 8 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+INSERT_PREDICTION_SQL = """
+    INSERT INTO predictions (
+        ts, job_title, sector, rating, location, skills,
+        predicted_salary, min_salary, max_salary, confidence, recommendations,
+        ts_epoch, sector_norm, location_norm
+    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+# Columns returned to API clients (internal index columns are left out)
+PUBLIC_COLUMNS = [
+    "id", "ts", "job_title", "sector", "rating", "location", "skills",
+    "predicted_salary", "min_salary", "max_salary", "confidence", "recommendations",
+]
+
+
+def to_epoch(value):
+    """UTC epoch seconds for an ISO date/timestamp string, or None if unparseable."""
+    try:
+        return calendar.timegm(datetime.fromisoformat(str(value).strip()).utctimetuple())
+    except ValueError:
+        return None
+
+
+def _norm(value):
+    return (value or "").strip().lower()
+
+
+def _prediction_params(row: dict):
+    return (
+        row.get("ts"),
+        row.get("job_title"),
+        row.get("sector"),
+        row.get("rating"),
+        row.get("location"),
+        row.get("skills"),
+        int(row.get("predicted_salary")),
+        int(row.get("min_salary")),
+        int(row.get("max_salary")),
+        int(row.get("confidence")),
+        json.dumps(row.get("recommendations", []), ensure_ascii=False),
+        to_epoch(row.get("ts")) or 0,
+        _norm(row.get("sector")),
+        _norm(row.get("location")),
+    )
+
+
+# ---------------- Schema migrations ----------------
+# Each step runs once, tracked by PRAGMA user_version.
+def _migrate_epoch_and_norm_columns(conn):
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(predictions)")}
+    for name, decl in (("ts_epoch", "INTEGER"), ("sector_norm", "TEXT"), ("location_norm", "TEXT")):
+        if name not in existing:
+            conn.execute(f"ALTER TABLE predictions ADD COLUMN {name} {decl}")
+    conn.execute("""
+        UPDATE predictions SET
+            ts_epoch = coalesce(CAST(strftime('%s', ts) AS INTEGER), 0),
+            sector_norm = lower(trim(coalesce(sector, ''))),
+            location_norm = lower(trim(coalesce(location, '')))
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_ts_epoch ON predictions(ts_epoch DESC, id DESC)")
+
+
+def _migrate_fts(conn):
+    # Trigram FTS5 index answers LIKE '%x%' on sector/location without a table scan
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS predictions_fts USING fts5(
+            sector_norm, location_norm,
+            content='predictions', content_rowid='id', tokenize='trigram'
+        )
+    """)
+    # One execute() per statement: executescript() would COMMIT the migration's transaction
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS predictions_fts_ai AFTER INSERT ON predictions BEGIN
+            INSERT INTO predictions_fts(rowid, sector_norm, location_norm)
+            VALUES (new.id, new.sector_norm, new.location_norm);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS predictions_fts_ad AFTER DELETE ON predictions BEGIN
+            INSERT INTO predictions_fts(predictions_fts, rowid, sector_norm, location_norm)
+            VALUES ('delete', old.id, old.sector_norm, old.location_norm);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS predictions_fts_au AFTER UPDATE ON predictions BEGIN
+            INSERT INTO predictions_fts(predictions_fts, rowid, sector_norm, location_norm)
+            VALUES ('delete', old.id, old.sector_norm, old.location_norm);
+            INSERT INTO predictions_fts(rowid, sector_norm, location_norm)
+            VALUES (new.id, new.sector_norm, new.location_norm);
+        END
+    """)
+    conn.execute("INSERT INTO predictions_fts(predictions_fts) VALUES ('rebuild')")
+
+
+ROLLUP_DIMENSIONS = {"sector": "prediction_daily_sector", "location": "prediction_daily_location"}
+ROLLUP_MEASURES = {"predicted_salary": "salary", "confidence": "confidence"}
+
+
+def _migrate_rollups(conn):
+    for dim, table in ROLLUP_DIMENSIONS.items():
+        measures = [f"{p}_{agg}" for p in ROLLUP_MEASURES.values() for agg in ("sum", "min", "max")]
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                day TEXT NOT NULL,
+                {dim}_norm TEXT NOT NULL,
+                {dim} TEXT,
+                n INTEGER NOT NULL,
+                {", ".join(f"{m} INTEGER" for m in measures)},
+                PRIMARY KEY (day, {dim}_norm)
+            ) WITHOUT ROWID
+        """)
+        # Backfill from the existing history, then keep up to date on every insert
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT date(ts_epoch, 'unixepoch'), {dim}_norm, max(trim(coalesce({dim}, ''))), count(*),
+                   {", ".join(f"{agg}({col})" for col in ROLLUP_MEASURES for agg in ("sum", "min", "max"))}
+            FROM predictions GROUP BY 1, 2
+        """)
+        updates = ", ".join(
+            f"{p}_sum = {p}_sum + excluded.{p}_sum, {p}_min = min({p}_min, excluded.{p}_min), "
+            f"{p}_max = max({p}_max, excluded.{p}_max)" for p in ROLLUP_MEASURES.values())
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON predictions BEGIN
+                INSERT INTO {table} VALUES (
+                    date(new.ts_epoch, 'unixepoch'), new.{dim}_norm, trim(coalesce(new.{dim}, '')), 1,
+                    {", ".join(f"new.{col}, new.{col}, new.{col}" for col in ROLLUP_MEASURES)}
+                )
+                ON CONFLICT (day, {dim}_norm) DO UPDATE SET
+                    {dim} = excluded.{dim}, n = n + 1, {updates};
+            END
+        """)
+
+
+MIGRATIONS = [_migrate_epoch_and_norm_columns, _migrate_fts, _migrate_rollups]
+# Steps whose failure (e.g. no FTS5 trigram tokenizer in this SQLite build) is skipped
+# rather than holding back the steps after them; reads fall back to LIKE scans. The
+# rollups only need the columns of step 1, so they are created either way.
+OPTIONAL_MIGRATIONS = {_migrate_fts}
+
+
+def encode_cursor(ts_epoch, row_id):
+    return f"{ts_epoch}:{row_id}"
+
+
+def decode_cursor(cursor):
+    """(ts_epoch, id) from a cursor string, or None if malformed."""
+    try:
+        ts_epoch, row_id = str(cursor).split(":", 1)
+        return int(ts_epoch), int(row_id)
+    except ValueError:
+        return None
+
+
+def to_day(value):
+    """UTC 'YYYY-MM-DD' for an ISO date/timestamp string, or the string itself if unparseable."""
+    epoch = to_epoch(value)
+    return time.strftime("%Y-%m-%d", time.gmtime(epoch)) if epoch is not None else str(value).strip()
+
+
+class PredictionStore:
+    """Predictions table access: pooled connections + write-behind group commit."""
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()  # most recently used first: its pages are warmest
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.has_fts = False
+        self.has_rollups = False
+        self._inherited = None
+        self.init_db()
+        atexit.register(self.flush)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    # ---------------- Connections ----------------
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)  # used by one thread at a time
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            grow = self._opened < self.pool_size
+            if grow:
+                self._opened += 1
+        if grow:
+            try:
+                return self._open()
+            except Exception:
+                with self._pool_lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Predictions DB connection pool exhausted") from None
+
+    def _after_fork(self):
+        """In a forked child: start with an empty pool, queue and writer.
+
+        Connections inherited from the parent must not be used across fork,
+        not even closed (closing can checkpoint the parent's WAL), so they are
+        only kept referenced.
+        """
+        self._inherited = self._idle
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Check a pooled connection out for the duration of the block."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def init_db(self):
+        """Create predictions DB & table if missing and switch it to WAL."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Not pooled: the pool fills on first use, so a parent that imports the app
+        # and then forks workers (gunicorn --preload) holds no open connection
+        conn = self._open()
+        try:
+            self._create(conn)
+        finally:
+            conn.close()
+
+    def _create(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")  # persistent for the DB file
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT,
+                job_title TEXT,
+                sector TEXT,
+                rating REAL,
+                location TEXT,
+                skills TEXT,
+                predicted_salary INTEGER,
+                min_salary INTEGER,
+                max_salary INTEGER,
+                confidence INTEGER,
+                recommendations TEXT
+            )
+        """)
+        conn.commit()
+        self._migrate(conn)
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                conn.execute("BEGIN")
+                migration(conn)
+                conn.execute(f"PRAGMA user_version={step}")
+                conn.execute("COMMIT")
+            except BaseException as e:
+                # Leave the DB at its last good user_version whatever went wrong
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not isinstance(e, sqlite3.Error):
+                    raise
+                if migration not in OPTIONAL_MIGRATIONS:
+                    log.warning("Predictions DB migration %d failed, later steps held back: %s", step, e)
+                    break
+                log.warning("Predictions DB migration %d skipped: %s", step, e)
+                conn.execute(f"PRAGMA user_version={step}")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.has_fts = "predictions_fts" in tables
+        self.has_rollups = version >= 3 and all(t in tables for t in ROLLUP_DIMENSIONS.values())
+        if not self.has_rollups:
+            log.warning("Prediction rollups missing; prediction stats will scan the predictions table")
+
+    # ---------------- Writes ----------------
+    def save_rows(self, rows):
+        """Insert prediction dicts synchronously in a single transaction."""
+        params = [_prediction_params(r) for r in rows]
+        with self.connection() as conn, conn:
+            conn.executemany(INSERT_PREDICTION_SQL, params)
+
+    def enqueue(self, rows):
+        """Queue prediction dicts (or one dict) for the background writer."""
+        if isinstance(rows, dict):
+            rows = [rows]
+        self._ensure_writer()
+        self._queue.put(list(rows))
+
+    def flush(self):
+        """Block until every queued row has been committed."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="prediction-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batches = [self._queue.get()]
+            pending = len(batches[0])
+            # Linger briefly so bursts of requests share one commit
+            while pending < WRITE_BATCH_SIZE:
+                try:
+                    batch = self._queue.get(timeout=WRITE_LINGER_SECONDS)
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                pending += len(batch)
+            try:
+                self.save_rows([row for batch in batches for row in batch])
+            except Exception as e:
+                log.exception("Failed to save predictions: %s", e)
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    # ---------------- Reads ----------------
+    def _where(self, start=None, end=None, sector=None, location=None):
+        """SQL filter clauses + params shared by page() and iter_rows()."""
+        clauses, params = [], []
+
+        for value, op in ((start, ">="), (end, "<=")):
+            if not value:
+                continue
+            epoch = to_epoch(value)
+            if epoch is not None:
+                clauses.append(f"ts_epoch {op} ?")
+                params.append(epoch)
+            else:
+                clauses.append(f"ts {op} ?")
+                params.append(value)
+
+        text_filters = [(col, f"%{_norm(v)}%") for col, v in
+                        (("sector_norm", sector), ("location_norm", location)) if v]
+        if text_filters and self.has_fts:
+            where = " AND ".join(f"{col} LIKE ?" for col, _ in text_filters)
+            clauses.append(f"id IN (SELECT rowid FROM predictions_fts WHERE {where})")
+            params.extend(p for _, p in text_filters)
+        else:
+            for col, pattern in text_filters:
+                clauses.append(f"{col} LIKE ?")
+                params.append(pattern)
+        return clauses, params
+
+    def page(self, limit=200, start=None, end=None, sector=None, location=None, cursor=None):
+        """Return (rows, next_cursor), newest first, using keyset pagination.
+
+        `cursor` is the next_cursor of the previous page; every page is an index
+        range scan of `limit` rows no matter how deep it is.
+        """
+        clauses, params = self._where(start, end, sector, location)
+        after = decode_cursor(cursor) if cursor else None
+        if after:
+            clauses.append("(ts_epoch, id) < (?, ?)")
+            params.extend(after)
+
+        sql = f"SELECT {', '.join(PUBLIC_COLUMNS)}, ts_epoch FROM predictions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts_epoch DESC, id DESC LIMIT ?"
+        params.append(int(limit))
+
+        with self.connection() as conn:
+            cur = conn.execute(sql, params)
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in cur.fetchall()]
+        next_cursor = None
+        if rows and len(rows) == int(limit):
+            next_cursor = encode_cursor(rows[-1]["ts_epoch"], rows[-1]["id"])
+        # parse recommendations JSON string back to list
+        for r in rows:
+            del r["ts_epoch"]
+            try:
+                r["recommendations"] = json.loads(r["recommendations"]) if r.get("recommendations") else []
+            except Exception:
+                r["recommendations"] = []
+        return rows, next_cursor
+
+    def query(self, limit=200, start=None, end=None, sector=None, location=None):
+        """Return list of prediction rows as dicts with optional filters."""
+        return self.page(limit, start, end, sector, location)[0]
+
+    def iter_rows(self, columns=None, limit=None, start=None, end=None, sector=None, location=None,
+                  batch_size=1000):
+        """Yield raw row tuples (newest first) straight off a cursor, `batch_size` at a time."""
+        columns = columns or PUBLIC_COLUMNS
+        clauses, params = self._where(start, end, sector, location)
+        sql = f"SELECT {', '.join(columns)} FROM predictions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts_epoch DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self.connection() as conn:  # held until the stream is consumed or closed
+            cur = conn.execute(sql, params)
+            try:
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cur.close()
+
+    # ---------------- Rollups ----------------
+    def _rollup_source(self, dim):
+        """Rollup table for `dim`, or an equivalent per-row view of predictions if it is missing."""
+        if self.has_rollups:
+            return ROLLUP_DIMENSIONS[dim]
+        measures = ", ".join(f"{col} AS {name}_{agg}" for col, name in ROLLUP_MEASURES.items()
+                             for agg in ("sum", "min", "max"))
+        return (f"(SELECT date(ts_epoch, 'unixepoch') AS day, {dim}_norm, trim(coalesce({dim}, '')) AS {dim}, "
+                f"1 AS n, {measures} FROM predictions)")
+
+    def stats(self, group_by=("day",), start=None, end=None, sector=None, location=None):
+        """Prediction counts and salary/confidence avg, min and max per group, read from the daily rollups.
+
+        `group_by` holds "day" and at most one of "sector"/"location"; the days
+        `start`..`end` are inclusive. The rollups are kept per day × sector and
+        per day × location, so a filter or grouping may use sector or location,
+        not both (ValueError). Returns {column: [values]}.
+        """
+        group_by = list(dict.fromkeys(group_by or ()))
+        unknown = [g for g in group_by if g != "day" and g not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown group_by: {', '.join(unknown)}")
+        dims = {g for g in group_by if g != "day"} | {d for d, v in (("sector", sector), ("location", location)) if v}
+        if len(dims) > 1:
+            raise ValueError("Prediction stats can use sector or location, not both")
+        dim = dims.pop() if dims else "sector"
+
+        clauses, params = [], []
+        for value, op in ((start, ">="), (end, "<=")):
+            if value:
+                clauses.append(f"day {op} ?")
+                params.append(to_day(value))
+        text = sector if dim == "sector" else location
+        if text:
+            clauses.append(f"{dim}_norm LIKE ?")
+            params.append(f"%{_norm(text)}%")
+
+        keys = ["day" if g == "day" else f"{g}_norm" for g in group_by]
+        select = ["day" if g == "day" else f"max({g}) AS {g}" for g in group_by]
+        select += ["sum(n)"] + [f"{agg}({name}_{agg})" for name in ROLLUP_MEASURES.values()
+                                for agg in ("sum", "min", "max")]
+        sql = f"SELECT {', '.join(select)} FROM {self._rollup_source(dim)}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if keys:
+            sql += f" GROUP BY {', '.join(keys)}"
+            sql += " ORDER BY day" if "day" in group_by else " ORDER BY sum(n) DESC"
+        with self.connection() as conn:
+            rows = [r for r in conn.execute(sql, params).fetchall() if r[len(group_by)]]
+
+        columns = {g: [r[i] for r in rows] for i, g in enumerate(group_by)}
+        count = len(group_by)  # position of sum(n); each measure's sum, min, max follow
+        columns["predictions"] = [r[count] for r in rows]
+        for i, col in enumerate(ROLLUP_MEASURES):
+            at = count + 1 + 3 * i
+            columns[f"avg_{col}"] = [round(r[at] / r[count], 2) for r in rows]
+            columns[f"min_{col}"] = [r[at + 1] for r in rows]
+            columns[f"max_{col}"] = [r[at + 2] for r in rows]
+        return columns
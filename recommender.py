@@ -0,0 +1,137 @@
+# recommender.py
+"""Role recommendations for the salary predictor.
+
+The skill → role and title → role keyword tables live in config/role_map.json.
+Each table is compiled once into a single regex shaped like a trie of its
+keywords, so finding every keyword in a request's skills (or job title) is
+one scan whose cost grows with the input length, not with the table size.
+
+Roles are ranked by weight. A skill keyword gives each of its roles
+1 + the share of postings listing that skill whose Job_Title is the role
+(co-occurrence in the current dataset); title keywords give 1. Ties keep
+the order the roles were first suggested in.
+"""
+import os, re, json
+import numpy as np
+import pandas as pd
+from skills_index import build_skills_index
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROLE_MAP_PATH = os.path.join(BASE_DIR, "config", "role_map.json")
+MAX_RECOMMENDATIONS = 6
+
+
+def role_map_key(path=ROLE_MAP_PATH):
+    """(mtime_ns, size) of the role map file, or None if it is missing; changes on every edit."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_role_map(path=ROLE_MAP_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------------- Keyword matching ----------------
+def _trie_pattern(words):
+    """Regex matching the longest of `words` at a position, one trie branch per character."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        group = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{group})?" if "" in node else group  # greedy: longer keywords first
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """Finds every keyword occurring as a substring of a text in one regex scan."""
+
+    def __init__(self, keywords):
+        self.keywords = sorted({str(k).lower() for k in keywords if k})
+        # A lookahead match gives the longest keyword starting at each position;
+        # the shorter ones starting there are exactly its keyword prefixes.
+        self._prefixes = {k: [p for p in self.keywords if k.startswith(p)] for k in self.keywords}
+        self._pattern = re.compile(f"(?=({_trie_pattern(self.keywords)}))") if self.keywords else None
+
+    def find(self, text):
+        """Distinct keywords in `text` (lowercase), in order of first occurrence."""
+        if self._pattern is None or not text:
+            return []
+        found = {}
+        for m in self._pattern.finditer(text):
+            for keyword in self._prefixes.get(m.group(1), ()):
+                found.setdefault(keyword)
+        return list(found)
+
+
+# ---------------- Recommender ----------------
+class RoleRecommender:
+    """Compiled role map plus per-role weights for one dataset version."""
+
+    def __init__(self, role_map, title_share=None):
+        """`title_share(keyword)` → {lowercase job title: share of that skill's postings}."""
+        self.skills = KeywordMatcher(role_map.get("skills", {}))
+        self.titles = KeywordMatcher(role_map.get("titles", {}))
+        self.skill_roles = {}
+        for keyword, roles in role_map.get("skills", {}).items():
+            share = title_share(keyword.lower()) if title_share else {}
+            self.skill_roles[keyword.lower()] = [(r, 1.0 + share.get(r.lower(), 0.0)) for r in roles]
+        self.title_roles = {k.lower(): [(r, 1.0) for r in roles] for k, roles in role_map.get("titles", {}).items()}
+        self.fallback = [([k.lower() for k in rule.get("keywords", [])], rule.get("roles", []))
+                         for rule in role_map.get("sector_fallback", [])]
+
+    def recommend(self, job_title, sector, skills_list, limit=MAX_RECOMMENDATIONS):
+        """Ranked, de-duplicated roles for lowercase skill tokens plus a job title and sector."""
+        scores = {}
+        matches = [(self.skill_roles, self.skills.find("\n".join(skills_list))),
+                   (self.title_roles, self.titles.find(job_title.lower()))]
+        for table, keywords in matches:
+            for keyword in keywords:
+                for role, weight in table[keyword]:
+                    scores[role] = scores.get(role, 0.0) + weight
+        if scores:
+            return [role for role, _ in sorted(scores.items(), key=lambda kv: -kv[1])][:limit]
+
+        sector = sector.lower()
+        for keywords, roles in self.fallback:
+            if not keywords or any(k in sector for k in keywords):
+                return list(dict.fromkeys(roles))[:limit]
+        return []
+
+
+def build_recommender(dataset) -> RoleRecommender:
+    """Dataset.derived() builder: role map (re-read per dataset version and role map edit) + co-occurrence weights."""
+    role_map = load_role_map()
+    df = dataset.frame(["Job_Title"])
+    if "Job_Title" not in df.columns or not len(df):
+        return RoleRecommender(role_map)
+
+    skills = dataset.derived("skills", build_skills_index)
+    title_codes, titles = pd.factorize(df["Job_Title"].astype(str).str.strip().str.lower())
+    vocab = KeywordMatcher(role_map.get("skills", {}))
+    columns = {}
+    for j, token in enumerate(skills.vocab.tolist()):
+        for keyword in vocab.find(str(token).lower()):
+            columns.setdefault(keyword, []).append(j)
+
+    def title_share(keyword):
+        cols = columns.get(keyword)
+        if not cols:
+            return {}
+        rows = np.asarray(skills.matrix[:, cols].sum(axis=1)).ravel() > 0
+        counts = np.bincount(title_codes[rows], minlength=len(titles))
+        return dict(zip(titles.tolist(), (counts / max(1, rows.sum())).tolist()))
+
+    return RoleRecommender(role_map, title_share)
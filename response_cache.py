@@ -0,0 +1,83 @@
+# response_cache.py
+"""Serialized-response cache for the read-only API endpoints.
+
+Entries are the exact JSON bytes a view produced, keyed by endpoint and
+normalized request parameters, plus a strong ETag (hash of the bytes).
+The whole cache belongs to one data version (dataset fingerprint + model
+version): the first lookup under a new version drops every entry. Within
+a version, least recently used entries are evicted once the total body
+size passes `max_bytes`.
+"""
+import json, hashlib, threading
+from collections import OrderedDict
+
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+
+
+def normalize_params(params):
+    """Canonical string for request params: sorted keys, trimmed lowercase strings."""
+    clean = {str(k): (v.strip().lower() if isinstance(v, str) else v) for k, v in (params or {}).items()}
+    return json.dumps(clean, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def make_etag(body: bytes):
+    return hashlib.sha1(body).hexdigest()
+
+
+class ResponseCache:
+    """Byte-bounded LRU of (etag, body, mimetype) entries for one data version."""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self.size = 0
+            self._version = version
+
+    def get(self, version, key):
+        """Cached entry for key under `version`, or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, version, key, body: bytes, mimetype="application/json"):
+        """Store a response body and return its (etag, body, mimetype) entry."""
+        entry = (make_etag(body), body, mimetype)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,58 @@
+# serialize.py
+"""JSON encoding for the API and the opt-in column-oriented payload shape.
+
+Chart series and tables are built as columns ({"Year": [...], "Avg_Salary":
+[...]}) straight from NumPy arrays. Clients that ask for it get them as-is
+(?format=columns, or Accept: application/vnd.portal.columns+json); everyone
+else gets the usual list of records. Bodies are encoded with orjson, which
+writes NumPy arrays natively, and fall back to the stdlib encoder when orjson
+is not installed.
+"""
+import json
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+COLUMNS_MIMETYPE = "application/vnd.portal.columns+json"
+
+
+def wants_columns(request):
+    """True if the client opted into column-oriented payloads."""
+    if request.args.get("format", "").lower() in ("columns", "columnar"):
+        return True
+    return request.accept_mimetypes[COLUMNS_MIMETYPE] > request.accept_mimetypes["application/json"]
+
+
+def to_records(columns):
+    """{col: array} → [{col: value}, ...] with plain Python values."""
+    names = list(columns)
+    values = [v.tolist() if isinstance(v, np.ndarray) else list(v) for v in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def shaper(columnar):
+    """Function turning a {col: array} series into the negotiated shape."""
+    return (lambda columns: columns) if columnar else to_records
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):  # object / string arrays orjson can't write directly
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(payload, status=200):
+    """Encoded JSON Response (keys in insertion order, no sorting pass)."""
+    return Response(dumps(payload), status=status, mimetype="application/json")
@@ -0,0 +1,178 @@
+# skills_index.py
+"""Pre-tokenized skills index.
+
+The Skills column ("Python;SQL;Excel") is tokenized once per dataset version
+into an interned vocabulary and a sparse job × skill count matrix. Skill
+counts for any row subset become a masked column sum, and "jobs requiring
+X and Y" becomes an intersection of per-skill row sets. Appended postings
+are tokenized on their own and stacked under the existing matrix.
+"""
+import copy
+from functools import cached_property
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from datastore import incremental
+from aggregates import build_cube
+
+
+def tokenize_skills(value):
+    """Split one Skills cell the same way the portal always has (';' or ',')."""
+    return [t.strip() for t in str(value).replace(";", ",").split(",") if t.strip()]
+
+
+class SkillsIndex:
+    """Interned skill vocabulary plus CSR (rows) / CSC (skills) incidence matrices."""
+
+    def __init__(self, skills: pd.Series):
+        # Tokenize each distinct cell once; codes follow first appearance, so the
+        # vocabulary is in the same order an explode() over all rows would see it.
+        codes, uniques = pd.factorize(skills, sort=False, use_na_sentinel=False)
+        self.vocab_index = {}
+        cell_tokens = []
+        for value in uniques:
+            ids = []
+            for token in tokenize_skills(value):
+                ids.append(self.vocab_index.setdefault(token, len(self.vocab_index)))
+            cell_tokens.append(np.asarray(ids, dtype=np.int32))
+        self.vocab = np.empty(len(self.vocab_index), dtype=object)
+        self.vocab[:] = list(self.vocab_index)
+
+        # Expand per-cell token lists to per-row CSR arrays without a Python row loop
+        n_rows = len(codes)
+        lengths = np.fromiter((len(t) for t in cell_tokens), dtype=np.int64, count=len(cell_tokens))
+        flat = np.concatenate(cell_tokens) if cell_tokens else np.zeros(0, dtype=np.int32)
+        cell_start = np.zeros(len(cell_tokens), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=cell_start[1:])
+        row_lengths = lengths[codes] if n_rows else np.zeros(0, dtype=np.int64)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(row_lengths, out=indptr[1:])
+        offsets = np.repeat(cell_start[codes] - indptr[:-1], row_lengths) if n_rows else np.zeros(0, dtype=np.int64)
+        indices = flat[offsets + np.arange(indptr[-1])]
+        data = np.ones(len(indices), dtype=np.int32)
+        self.matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, len(self.vocab)))
+        self.matrix.sum_duplicates()
+        self.totals = np.asarray(self.matrix.sum(axis=0)).ravel().astype(np.int64)
+
+    @property
+    def n_rows(self):
+        return self.matrix.shape[0]
+
+    @cached_property
+    def by_skill(self):
+        """CSC copy of the matrix for per-skill row lookups (built on first use)."""
+        return self.matrix.tocsc()
+
+    # ---------------- Appending ----------------
+    def extended(self, skills: pd.Series) -> "SkillsIndex":
+        """New index with rows for `skills` appended; only the new cells are tokenized."""
+        new = copy.copy(self)
+        new.__dict__.pop("by_skill", None)
+        new.vocab_index = dict(self.vocab_index)
+        indptr = [0]
+        indices = []
+        for value in skills.astype(object).tolist():
+            indices.extend(new.vocab_index.setdefault(t, len(new.vocab_index)) for t in tokenize_skills(value))
+            indptr.append(len(indices))
+        n_vocab = len(new.vocab_index)
+        delta = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), np.asarray(indices, dtype=np.int32),
+                                   np.asarray(indptr, dtype=np.int64)), shape=(len(skills), n_vocab))
+        delta.sum_duplicates()
+
+        new.vocab = np.empty(n_vocab, dtype=object)
+        new.vocab[:] = list(new.vocab_index)
+        old = self.matrix
+        new.matrix = sparse.csr_matrix(
+            (np.concatenate([old.data, delta.data]), np.concatenate([old.indices, delta.indices]),
+             np.concatenate([old.indptr, delta.indptr[1:] + old.indptr[-1]])),
+            shape=(old.shape[0] + delta.shape[0], n_vocab))
+        new.totals = np.zeros(n_vocab, dtype=np.int64)
+        new.totals[:len(self.totals)] = self.totals
+        new.totals += np.asarray(delta.sum(axis=0)).ravel().astype(np.int64)
+        return new
+
+    # ---------------- Counting ----------------
+    def counts(self, rows=None):
+        """Per-skill counts over all rows, or over a boolean row mask."""
+        if rows is None:
+            return self.totals
+        return masked_sum(self.matrix, rows)
+
+    def group_counts(self, group_codes, n_groups, start=0):
+        """Sparse (group × skill) counts, e.g. per aggregate-cube cell.
+
+        `group_codes` labels rows start..n_rows-1 (all rows by default).
+        """
+        rows = self.matrix[start:] if start else self.matrix
+        n = rows.shape[0]
+        onehot = sparse.csr_matrix(
+            (np.ones(n, dtype=np.int32), (group_codes, np.arange(n))),
+            shape=(n_groups, n))
+        return (onehot @ rows).tocsr()
+
+    def top_columns(self, counts=None, n=10, label="Skill", count_label="Count"):
+        """{label: skills, count_label: counts} of the n most frequent skills."""
+        counts = self.totals if counts is None else counts
+        order = np.argsort(-counts, kind="stable")
+        order = order[counts[order] > 0][:n]
+        return {label: self.vocab[order], count_label: counts[order]}
+
+    def top(self, counts=None, n=10, label="Skill", count_label="Count"):
+        """Records of the n most frequent skills, like explode().value_counts().head(n)."""
+        columns = self.top_columns(counts, n, label, count_label)
+        return [{label: s, count_label: c} for s, c in
+                zip(columns[label].tolist(), columns[count_label].tolist())]
+
+    # ---------------- Row lookup ----------------
+    def rows_with(self, skill):
+        """Sorted row indices of jobs listing `skill` (empty if unknown)."""
+        j = self.vocab_index.get(skill)
+        if j is None or j >= len(self.vocab):
+            return np.zeros(0, dtype=np.int32)
+        return self.by_skill.indices[self.by_skill.indptr[j]:self.by_skill.indptr[j + 1]]
+
+    def rows_with_all(self, skills):
+        """Boolean row mask of jobs listing every skill in `skills`."""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for skill in skills:
+            hit = np.zeros(self.n_rows, dtype=bool)
+            hit[self.rows_with(skill)] = True
+            mask &= hit
+        return mask
+
+
+def masked_sum(matrix, mask):
+    """Column sums of a sparse matrix over the rows selected by a boolean mask."""
+    return np.asarray(matrix.T @ mask.astype(np.int32)).ravel().astype(np.int64)
+
+
+def build_skills_index(dataset) -> SkillsIndex:
+    """Dataset.derived() builder: one index per dataset version."""
+    df = dataset.frame(["Skills"])
+    return SkillsIndex(df["Skills"] if "Skills" in df.columns else pd.Series([], dtype=object))
+
+
+def build_cell_skills(dataset):
+    """Dataset.derived() builder: sparse (cube cell × skill) counts."""
+    cube = dataset.derived("cube", build_cube)
+    skills = dataset.derived("skills", build_skills_index)
+    return skills.group_counts(cube.row_cell, cube.n_cells)
+
+
+@incremental("skills")
+def extend_skills_index(index, delta, dataset):
+    skills = delta["Skills"] if "Skills" in delta.columns else pd.Series([""] * len(delta), dtype=object)
+    return index.extended(skills)
+
+
+@incremental("cell_skills")
+def extend_cell_skills(per_cell, delta, dataset):
+    # Carried after "cube" and "skills", so both already include the delta rows
+    cube = dataset.derived("cube", build_cube)
+    skills = dataset.derived("skills", build_skills_index)
+    start = skills.n_rows - len(delta)
+    padded = sparse.csr_matrix(
+        (per_cell.data, per_cell.indices,
+         np.concatenate([per_cell.indptr, np.full(cube.n_cells - per_cell.shape[0], per_cell.indptr[-1])])),
+        shape=(cube.n_cells, len(skills.vocab)))
+    return (padded + skills.group_counts(cube.row_cell[start:], cube.n_cells, start)).tocsr()
@@ -0,0 +1,131 @@
+# snapshot.py
+"""Columnar, memory-mappable snapshot of the jobs dataset.
+
+Compile once after the CSV changes:
+
+    python snapshot.py
+
+Every column is stored as its own .npy file. Text columns are dictionary
+encoded (integer codes + a JSON list of distinct values), so workers that
+memory-map the same snapshot share its pages through the OS page cache.
+"""
+import os, sys, json, shutil, hashlib
+import numpy as np
+import pandas as pd
+from datastore import read_csv_bytes, normalize_df
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "data", "data_analyst_jobs.csv")
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "data", "snapshot")
+SNAPSHOT_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+
+
+# ---------------- Compile ----------------
+def _write_json_atomic(path, obj):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def compile_snapshot(csv_path=DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Parse + normalize the CSV once and publish it as the current snapshot."""
+    st = os.stat(csv_path)
+    with open(csv_path, "rb") as f:
+        raw = f.read()
+    fingerprint = hashlib.sha1(raw).hexdigest()
+    df = normalize_df(read_csv_bytes(raw))
+
+    version = fingerprint[:16]
+    version_dir = os.path.join(snapshot_dir, version)
+    tmp_dir = f"{version_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        s = df[name]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp_dir, f"{i}.codes.npy"), s.cat.codes.to_numpy())
+            with open(os.path.join(tmp_dir, f"{i}.dict.json"), "w", encoding="utf-8") as f:
+                json.dump([str(c) for c in s.cat.categories], f, ensure_ascii=False)
+            columns.append({"name": name, "kind": "category", "file": str(i)})
+        else:
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), s.to_numpy())
+            columns.append({"name": name, "kind": "numeric", "file": str(i)})
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": len(df),
+        "columns": columns,
+        "source_fingerprint": fingerprint,
+        "source_stat": [st.st_mtime_ns, st.st_size],
+    }
+    _write_json_atomic(os.path.join(tmp_dir, "manifest.json"), manifest)
+
+    if os.path.isdir(version_dir):
+        shutil.rmtree(version_dir)
+    os.rename(tmp_dir, version_dir)
+    # Readers follow CURRENT, so the switch to the new version is atomic
+    _write_json_atomic(os.path.join(snapshot_dir, CURRENT_FILE), {"version": version})
+
+    # Old versions may still be mapped by running workers; unlinking is safe on POSIX
+    for entry in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, entry)
+        if entry not in (version, CURRENT_FILE) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return version_dir
+
+
+# ---------------- Load ----------------
+class Snapshot:
+    """Read-only view over one compiled snapshot; columns are mapped on first use."""
+
+    def __init__(self, version_dir, manifest):
+        self.version_dir = version_dir
+        self.rows = manifest["rows"]
+        self.source_fingerprint = manifest["source_fingerprint"]
+        self.source_stat_key = tuple(manifest["source_stat"])
+        self._specs = {c["name"]: c for c in manifest["columns"]}
+        self.columns = [c["name"] for c in manifest["columns"]]
+        self._series = {}
+
+    @classmethod
+    def open_current(cls, snapshot_dir=SNAPSHOT_DIR):
+        """Open the snapshot CURRENT points to, or return None if there is none."""
+        try:
+            with open(os.path.join(snapshot_dir, CURRENT_FILE), encoding="utf-8") as f:
+                version = json.load(f)["version"]
+            version_dir = os.path.join(snapshot_dir, version)
+            with open(os.path.join(version_dir, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            return None
+        return cls(version_dir, manifest)
+
+    def series(self, name) -> pd.Series:
+        """Return one column backed by the memory-mapped file (no copy)."""
+        s = self._series.get(name)
+        if s is not None:
+            return s
+        spec = self._specs[name]
+        base = os.path.join(self.version_dir, spec["file"])
+        if spec["kind"] == "category":
+            codes = np.load(base + ".codes.npy", mmap_mode="r")
+            with open(base + ".dict.json", encoding="utf-8") as f:
+                categories = json.load(f)
+            values = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            values = np.load(base + ".npy", mmap_mode="r")
+        s = pd.Series(values, name=name, copy=False)
+        self._series[name] = s
+        return s
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    out = compile_snapshot(csv_path)
+    print(f"💾 Snapshot compiled → {out}")
@@ -0,0 +1,110 @@
+# sort_index.py
+"""Precomputed sort orders for the paginated report table.
+
+A SortIndex holds, for one sortable column, the stable ascending and
+descending row permutations (ties keep dataset order, missing values go
+last). Both are computed once per dataset version. Postings appended later
+are merged in with a binary search, with no full re-sort.
+
+A page of a filtered, sorted result walks the permutation in growing
+chunks and tests the filter on those rows only, stopping once the page is
+filled. Page 1 of any filter therefore touches about page_size / selectivity
+rows, not the whole dataset.
+"""
+import numpy as np
+import pandas as pd
+from datastore import incremental
+
+# Request names → dataset column
+SORTABLE_COLUMNS = {
+    "avg_salary": "Avg_Salary", "salary": "Avg_Salary",
+    "rating": "Rating",
+    "company_name": "Company_Name", "company": "Company_Name",
+    "date": "Date",
+}
+FIRST_CHUNK = 4096  # rows tested in the first scan step; doubles every step
+
+
+def sort_keys(series: pd.Series, vocab=None):
+    """(float64 key per row, vocabulary): numbers as-is, dates as days, text as its rank in
+    the sorted vocabulary (extended with the series' values). NaN marks a missing value."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        keys, vocab = sort_keys(pd.Series(series.cat.categories.astype(object), name=series.name), vocab)
+        return np.where(codes >= 0, keys[np.maximum(codes, 0)] if len(keys) else np.nan, np.nan), vocab
+    if series.name == "Date":
+        days = pd.to_datetime(series.astype(str), errors="coerce").to_numpy().astype("datetime64[D]")
+        return np.where(np.isnat(days), np.nan, days.astype(np.int64).astype(float)), None
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float), None
+    text = series.astype(str).to_numpy(dtype=object)
+    vocab = np.unique(text) if vocab is None else np.union1d(vocab, text)
+    return np.searchsorted(vocab, text).astype(float), vocab
+
+
+class SortIndex:
+    """Ascending and descending row permutations of one column."""
+
+    def __init__(self, keys, vocab=None):
+        self.keys = np.asarray(keys, dtype=float)
+        self.vocab = vocab  # sorted distinct values when keys are text ranks
+        self.asc = np.argsort(self.keys, kind="stable").astype(np.int32)
+        self.desc = np.argsort(-self.keys, kind="stable").astype(np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def extended(self, series: pd.Series) -> "SortIndex":
+        """New index with `series` appended as rows len(self).., merged into both orders in O(n)."""
+        delta_keys, vocab = sort_keys(series, self.vocab)
+        new = SortIndex.__new__(SortIndex)
+        keys = self.keys
+        if vocab is not None and len(vocab) != len(self.vocab):
+            # New text values: re-rank old keys. The mapping is monotonic, so both orders stay valid.
+            ranks = np.searchsorted(vocab, self.vocab).astype(float)
+            present = ~np.isnan(keys)
+            keys = keys.copy()
+            keys[present] = ranks[keys[present].astype(np.intp)]
+        new.keys, new.vocab = np.concatenate([keys, delta_keys]), vocab
+        rows = np.arange(len(keys), len(new.keys), dtype=np.int32)
+        for name, sign in (("asc", 1), ("desc", -1)):
+            order = getattr(self, name)
+            added = np.argsort(sign * delta_keys, kind="stable")
+            # side="right": appended rows follow existing rows with an equal key
+            at = np.searchsorted(sign * keys[order], sign * delta_keys[added], side="right")
+            setattr(new, name, np.insert(order, at, rows[added]))
+        return new
+
+    def page(self, offset, limit, descending=False, keep=None):
+        """Row positions [offset, offset + limit) of the order, counting only rows where keep(rows) holds."""
+        order = self.desc if descending else self.asc
+        if keep is None:
+            return order[offset:offset + limit]
+        found, seen, start, step = [], 0, 0, FIRST_CHUNK
+        while start < len(order) and seen < offset + limit:
+            chunk = order[start:start + step]
+            hits = chunk[keep(chunk)]
+            if seen + len(hits) > offset:
+                found.append(hits[max(0, offset - seen):])
+            seen += len(hits)
+            start += step
+            step *= 2
+        return np.concatenate(found)[:limit] if found else order[:0]
+
+
+def sort_index_builder(column):
+    """Dataset.derived() builder for the SortIndex of `column`."""
+    def build(dataset):
+        return SortIndex(*sort_keys(dataset.frame([column])[column]))
+    return build
+
+
+def _extender(column):
+    def extend(index, delta, dataset):
+        series = delta[column] if column in delta.columns else pd.Series([np.nan] * len(delta), name=column)
+        return index.extended(series)
+    return extend
+
+
+for _column in set(SORTABLE_COLUMNS.values()):
+    incremental(("sort_index", _column))(_extender(_column))
@@ -30,7 +30,7 @@ function attachAutocomplete(inputId, fieldType) {
             return;
         }
 
-        const res = await fetch(`/api/suggestions?q=${query}&field=${fieldType}`);
+        const res = await fetch(`/api/suggestions?q=${encodeURIComponent(query)}&field=${fieldType}`);
         const list = await res.json();
 
         box.innerHTML = "";
@@ -1,5 +1,9 @@
 console.log("📊 Restored Dashboard JS Loaded");
 
+/* Column-oriented payloads: each series is { <label>: [...], Avg_Salary: [...] } */
+const SUMMARY_URL = "/api/summary?format=columns";
+const col = (series, name) => (series && series[name]) || [];
+
 /* Load everything on page load */
 document.addEventListener("DOMContentLoaded", () => {
     loadKPIs();
@@ -11,7 +15,7 @@ document.addEventListener("DOMContentLoaded", () => {
 ------------------------------------------- */
 async function loadKPIs() {
     try {
-        const r = await fetch("/api/summary");
+        const r = await fetch(SUMMARY_URL);
         const j = await r.json();
         const s = j.summary;
 
@@ -30,7 +34,7 @@ async function loadKPIs() {
 ------------------------------------------- */
 async function loadGraphs() {
     try {
-        const r = await fetch("/api/summary");
+        const r = await fetch(SUMMARY_URL);
         const j = await r.json();
 
         const byYear = j.by_year;
@@ -40,8 +44,8 @@ async function loadGraphs() {
 
         /* ---- Salary Trend (Line Chart) ---- */
         Plotly.newPlot("chart_salary_trend", [{
-            x: byYear.map(x => x.Year),
-            y: byYear.map(x => x.Avg_Salary),
+            x: col(byYear, "Year"),
+            y: col(byYear, "Avg_Salary"),
             mode: "lines+markers",
             line: { width: 3, color: "#4db8ff" },
             marker: { size: 8 }
@@ -54,8 +58,8 @@ async function loadGraphs() {
 
         /* ---- Top States ---- */
         Plotly.newPlot("chart_top_states", [{
-            x: byState.map(x => x.Location),
-            y: byState.map(x => x.Avg_Salary),
+            x: col(byState, "Location"),
+            y: col(byState, "Avg_Salary"),
             type: "bar",
             marker: { color: "#33ccff" }
         }], {
@@ -67,8 +71,8 @@ async function loadGraphs() {
 
         /* ---- Top Companies ---- */
         Plotly.newPlot("chart_companies", [{
-            x: byCompany.map(x => x.Company_Name),
-            y: byCompany.map(x => x.Avg_Salary),
+            x: col(byCompany, "Company_Name"),
+            y: col(byCompany, "Avg_Salary"),
             type: "bar",
             marker: { color: "#a680ff" }
         }], {
@@ -81,8 +85,8 @@ async function loadGraphs() {
         /* ---- Skill Radar ---- */
         Plotly.newPlot("chart_skill_radar", [{
             type: "scatterpolar",
-            r: skills.map(s => s.Count),
-            theta: skills.map(s => s.Skill),
+            r: col(skills, "Count"),
+            theta: col(skills, "Skill"),
             fill: "toself",
             marker: { color: "#00ffcc" }
         }], {
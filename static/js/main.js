@@ -15,7 +15,7 @@ document.addEventListener("DOMContentLoaded", () => {
       const q = input.value.trim();
       if (!q) return (box.style.display = "none");
 
-      const res = await fetch(`/api/suggestions?q=${q}&field=${field}`);
+      const res = await fetch(`/api/suggestions?q=${encodeURIComponent(q)}&field=${field}`);
       const suggestions = await res.json();
 
       if (!suggestions.length) {
@@ -66,7 +66,7 @@ document.addEventListener("DOMContentLoaded", () => {
     document.body.style.cursor = "wait";
 
     try {
-      const res = await fetch("/api/analytics_filter", {
+      const res = await fetch("/api/analytics_filter?format=columns", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify(payload)
@@ -80,19 +80,20 @@ document.addEventListener("DOMContentLoaded", () => {
         return;
       }
 
+      // Column-oriented series: { Sector: [...], Avg_Salary: [...] }
+      const safe = (series, key) => (series && series[key]) || [];
+
       // ================= Summary Box ===============
       const summaryCard = document.getElementById("summaryCard");
       const summaryText = document.getElementById("summaryText");
 
       summaryCard.style.display = "block";
       summaryText.innerHTML = `
-        <strong>Matched Sectors:</strong> ${data.by_sector.length} |
-        <strong>Top Skill:</strong> ${data.by_skills?.[0]?.Skill || "N/A"} |
-        <strong>Years Found:</strong> ${data.by_year.length}
+        <strong>Matched Sectors:</strong> ${safe(data.by_sector, "Sector").length} |
+        <strong>Top Skill:</strong> ${safe(data.by_skills, "Skill")[0] || "N/A"} |
+        <strong>Years Found:</strong> ${safe(data.by_year, "Year").length}
       `;
 
-      const safe = (arr, key) => (arr?.length ? arr.map(x => x[key]) : []);
-
       // ============= Charts =============
       Plotly.react("chart_sector", [{
         x: safe(data.by_sector, "Sector"),
@@ -13,12 +13,19 @@ document.addEventListener("DOMContentLoaded", () => {
 
     async function loadHistory() {
         try {
-            const res = await fetch("/api/prediction_history?limit=5000");
+            // Column-oriented: data.predictions = { ts: [...], job_title: [...], ... }
+            const res = await fetch("/api/prediction_history?limit=5000&format=columns");
             const data = await res.json();
+            const p = data.predictions;
 
             let rows = "";
 
-            data.predictions.forEach(r => {
+            for (let i = 0; i < data.count; i++) {
+                const r = {
+                    ts: p.ts[i], job_title: p.job_title[i], sector: p.sector[i], location: p.location[i],
+                    rating: p.rating[i], predicted_salary: p.predicted_salary[i], min_salary: p.min_salary[i],
+                    max_salary: p.max_salary[i], confidence: p.confidence[i], recommendations: p.recommendations[i]
+                };
                 rows += `
                 <tr>
                     <td>${r.ts}</td>
@@ -31,7 +38,7 @@ document.addEventListener("DOMContentLoaded", () => {
                     <td>${r.confidence}%</td>
                     <td>${(r.recommendations || []).join(", ")}</td>
                 </tr>`;
-            });
+            }
 
             tableBody.innerHTML = rows;
         } catch (err) {
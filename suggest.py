@@ -0,0 +1,99 @@
+# suggest.py
+"""In-memory suggestion indexes for /api/suggestions.
+
+One SuggestionIndex per field is built once per dataset version. Prefix
+lookups bisect a sorted array of word-start keys (so "york" finds
+"New York, NY"); when the prefix yields too few hits, a trigram index adds
+typo-tolerant matches. Results are ranked by how often the value occurs in
+the dataset and capped at k.
+"""
+from bisect import bisect_left
+from functools import lru_cache
+import numpy as np
+
+SUGGEST_CACHE_SIZE = 4096
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+# Request field names (as sent by the front-end) → index name
+FIELD_ALIASES = {
+    "year": "year",
+    "sector": "sector",
+    "location": "location", "state": "location",
+    "skill": "skill", "skills": "skill",
+    "company": "company", "company_name": "company",
+    "job_title": "job_title", "title": "job_title", "job": "job_title",
+}
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """Frequency-ranked prefix + trigram index over one field's distinct values."""
+
+    def __init__(self, values, counts):
+        # Term ids are ranks: 0 is the most frequent value
+        order = sorted(range(len(values)), key=lambda i: (-counts[i], str(values[i])))
+        self.terms = [str(values[i]) for i in order]
+        self.counts = [int(counts[i]) for i in order]
+
+        keys = []
+        grams = {}
+        for tid, term in enumerate(self.terms):
+            low = term.lower()
+            # Every word start is a prefix entry point
+            starts = [0] + [i + 1 for i, ch in enumerate(low[:-1]) if not ch.isalnum() and low[i + 1].isalnum()]
+            keys.extend((low[s:], tid) for s in starts)
+            for g in trigrams(low):
+                grams.setdefault(g, []).append(tid)
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._key_terms = np.asarray([t for _, t in keys], dtype=np.int32)
+        self._grams = {g: np.asarray(ids, dtype=np.int32) for g, ids in grams.items()}
+        self.suggest = lru_cache(maxsize=SUGGEST_CACHE_SIZE)(self._suggest)
+
+    def _prefix(self, q):
+        lo = bisect_left(self._keys, q)
+        hi = bisect_left(self._keys, q + "\uffff", lo)
+        return np.unique(self._key_terms[lo:hi])  # sorted term ids == rank order
+
+    def _fuzzy(self, q, exclude, k):
+        q_grams = trigrams(q)
+        hits = [self._grams[g] for g in q_grams if g in self._grams]
+        if not hits:
+            return []
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        score = shared / len(q_grams)
+        keep = (score >= MIN_TRIGRAM_SIMILARITY) & ~np.isin(ids, exclude)
+        ids, score = ids[keep], score[keep]
+        # Best similarity first; ties keep rank (frequency) order
+        order = np.lexsort((ids, -score))[:k]
+        return ids[order].tolist()
+
+    def _suggest(self, q, k=10):
+        """Top-k values for query q (already lowercased and stripped)."""
+        if not q:
+            return tuple(self.terms[:k])
+        ids = self._prefix(q)[:k].tolist()
+        if len(ids) < k and len(q) >= 3:
+            ids += self._fuzzy(q, ids, k - len(ids))
+        return tuple(self.terms[i] for i in ids)
+
+
+def build_suggesters(dataset, cube, skills):
+    """Indexes for every suggestible field of one dataset version."""
+    indexes = {}
+    for name, dim in (("year", "Year"), ("sector", "Sector"),
+                      ("location", "Location"), ("company", "Company_Name")):
+        if dim in cube.dimensions:
+            rows = cube.counts_by(dim)
+            indexes[name] = SuggestionIndex([r[dim] for r in rows], [r["Count"] for r in rows])
+    indexes["skill"] = SuggestionIndex(list(skills.vocab), list(skills.totals))
+    titles = dataset.frame(["Job_Title"])
+    if "Job_Title" in titles.columns:
+        vc = titles["Job_Title"].value_counts()
+        vc = vc[vc > 0]
+        indexes["job_title"] = SuggestionIndex(vc.index.tolist(), vc.tolist())
+    return indexes
@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_sample_data import generate  # noqa: E402
+
+
+@pytest.fixture
+def sample_frame():
+    """Small generated jobs table (same columns as data/data_analyst_jobs.csv)."""
+    return generate(600, seed=7)
+
+
+@pytest.fixture
+def jobs_csv(tmp_path, sample_frame):
+    path = tmp_path / "data_analyst_jobs.csv"
+    sample_frame.to_csv(path, index=False, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def portal(tmp_path_factory):
+    """The app module, pointed at a generated dataset in a temp dir."""
+    workdir = tmp_path_factory.mktemp("portal")
+    generate(800, seed=11).to_csv(workdir / "data_analyst_jobs.csv", index=False, encoding="utf-8")
+    os.environ["PORTAL_WARMUP"] = "0"
+    # Read at import time: the app opens its CSV, prediction DB and model dir then
+    os.environ["PORTAL_DATA_DIR"] = str(workdir)
+    os.environ["PORTAL_MODEL_DIR"] = str(workdir / "model")
+    import app
+    yield app
+    app.PREDICTIONS.flush()
@@ -0,0 +1,40 @@
+# tests/test_api.py
+import json
+
+
+def test_cached_view_revalidates_with_etag(portal):
+    client = portal.app.test_client()
+    first = client.post("/api/analytics_filter", json={"sector": "Research"})
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.post("/api/analytics_filter", json={"sector": "  research "},
+                        headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.get_data() == b""
+
+    other = client.post("/api/analytics_filter", json={"sector": "Product"},
+                        headers={"If-None-Match": first.headers["ETag"]})
+    assert other.status_code == 200 and other.headers["ETag"] != first.headers["ETag"]
+
+
+def test_batch_reports_bad_ndjson_rows_inline(portal):
+    client = portal.app.test_client()
+    body = "\n".join([
+        json.dumps({"job_title": "Data Analyst", "sector": "Research", "rating": 4.1, "skills": "SQL, Python"}),
+        "{not json",
+        json.dumps({"job_title": "Data Analyst"}),
+        "",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"job_title": "BI Developer", "sector": "Analytics", "rating": "high"}),
+        json.dumps({"job_title": "BI Developer", "sector": "Analytics"}),
+    ]).encode("utf-8") + b"\n\xff\xfe\n"
+    response = client.post("/api/predict_salary/batch", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r["index"] for r in rows] == list(range(7))
+    assert [r.get("error") for r in rows] == [
+        None, "Invalid JSON", "Please provide job_title and sector", "Row must be an object",
+        "Invalid rating", None, "Invalid JSON"]
+    assert rows[0]["min_salary"] <= rows[0]["predicted_salary"] <= rows[0]["max_salary"]
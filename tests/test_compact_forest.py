@@ -0,0 +1,27 @@
+# tests/test_compact_forest.py
+"""The exported array forest must score exactly like the sklearn pipeline."""
+import numpy as np
+import pandas as pd
+import pytest
+from compact_forest import CompactForest, export_forest
+from train_model import build_pipeline, load_training_data
+
+
+@pytest.fixture(params=[None, 5], ids=["all-categories", "infrequent"])
+def fitted(request, jobs_csv):
+    X, y, _, _ = load_training_data(jobs_csv)
+    pipeline = build_pipeline(n_jobs=1, n_estimators=15, max_depth=None, min_samples_split=2)
+    pipeline.set_params(transform__ohe__min_frequency=request.param)
+    pipeline.fit(X, y)
+    return pipeline, X
+
+
+def test_compact_forest_matches_pipeline(tmp_path, fitted):
+    pipeline, X = fitted
+    forest = CompactForest(export_forest(pipeline, str(tmp_path / "forest")))
+
+    unseen = pd.DataFrame({"Rating": [0.0, 4.25, 5.0], "Size": ["Unknown", "10000+", "1 to 50"],
+                           "Company_Name": ["Nobody Inc", X["Company_Name"].iloc[0], "Nobody Inc"],
+                           "Sector": ["Quantum", "Quantum", X["Sector"].iloc[0]], "Skill_Count": [0, 3, 12]})
+    for frame in (X, unseen, X.iloc[:1]):
+        np.testing.assert_allclose(forest.predict(frame), pipeline.predict(frame), rtol=1e-12)
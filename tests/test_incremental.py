@@ -0,0 +1,94 @@
+# tests/test_incremental.py
+"""Derived values extended for appended postings must equal a full rebuild."""
+import json
+import numpy as np
+import pytest
+from datastore import Dataset, DatasetStore
+from aggregates import build_cube
+from generate_sample_data import generate
+from ingest import append_postings
+from percentiles import build_salary_sketches
+from sort_index import SORTABLE_COLUMNS, sort_index_builder
+
+SORT_COLUMNS = sorted(set(SORTABLE_COLUMNS.values()))
+
+
+def postings(n, seed):
+    """Posting dicts as a client would send them, with a few never-seen categories."""
+    records = json.loads(generate(n, seed).to_json(orient="records"))
+    records[0].update(Sector="Quantum Computing", Company_Name="Zeta Labs", Location="Oslo, NO")
+    records[1].update(Avg_Salary=None, Rating="n/a", Date="not a date")
+    return records
+
+
+def not_carried(ds):
+    pytest.fail("derived value was rebuilt instead of extended")
+
+
+def build_all(ds):
+    ds.derived("cube", build_cube)
+    ds.derived("salary_sketches", build_salary_sketches)
+    for col in SORT_COLUMNS:
+        ds.derived(("sort_index", col), sort_index_builder(col))
+
+
+def cube_cells(cube):
+    labels = zip(*(cube.categories(d)[cube.cell_codes[d]].tolist() for d in cube.dimensions))
+    return {key: (s, c) for key, s, c in zip(labels, cube.sum.tolist(), cube.count.tolist())}
+
+
+def sketch_cells(sketches, cube):
+    labels = zip(*(cube.categories(d)[sketches.cell_codes[d]].tolist() for d in sketches.dimensions))
+    return {key: {sketches.offset + int(j): int(row[j]) for j in np.flatnonzero(row)}
+            for key, row in zip(labels, sketches.counts)}
+
+
+@pytest.fixture
+def store(tmp_path, jobs_csv):
+    return DatasetStore(jobs_csv, delta_path=str(tmp_path / "postings.delta.ndjson"))
+
+
+def test_extended_state_equals_rebuild(store):
+    build_all(store.current())
+    append_postings(postings(40, seed=1), store.delta_path)
+    store.current()
+    append_postings(postings(25, seed=2), store.delta_path)
+    ds = store.current()
+    assert len(ds.deltas) == 2
+
+    rebuilt = Dataset(ds.frame())
+    build_all(rebuilt)
+
+    cube, ref_cube = ds.derived("cube", not_carried), rebuilt.derived("cube", build_cube)
+    assert cube.n_rows == ref_cube.n_rows == len(ds)
+    got, want = cube_cells(cube), cube_cells(ref_cube)
+    assert got.keys() == want.keys()
+    for key, (total, count) in want.items():
+        assert got[key][1] == count
+        assert got[key][0] == pytest.approx(total)
+
+    assert (sketch_cells(ds.derived("salary_sketches", not_carried), cube)
+            == sketch_cells(rebuilt.derived("salary_sketches", build_salary_sketches), ref_cube))
+
+    for col in SORT_COLUMNS:
+        index = ds.derived(("sort_index", col), not_carried)
+        ref = rebuilt.derived(("sort_index", col), sort_index_builder(col))
+        np.testing.assert_array_equal(index.keys, ref.keys)
+        np.testing.assert_array_equal(index.asc, ref.asc)
+        np.testing.assert_array_equal(index.desc, ref.desc)
+
+
+def test_append_split_does_not_change_version(tmp_path, jobs_csv):
+    records = postings(30, seed=3)
+    one = DatasetStore(jobs_csv, delta_path=str(tmp_path / "one.ndjson"))
+    two = DatasetStore(jobs_csv, delta_path=str(tmp_path / "two.ndjson"))
+    one.current()
+    two.current()
+
+    append_postings(records, one.delta_path)
+    append_postings(records[:10], two.delta_path)
+    two.current()
+    append_postings(records[10:], two.delta_path)
+
+    assert one.current().fingerprint == two.current().fingerprint
+    assert len(one.current()) == len(two.current())
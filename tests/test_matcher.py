@@ -0,0 +1,29 @@
+# tests/test_matcher.py
+"""FuzzyMatcher must pick what fuzzywuzzy's extractOne(..., scorer=partial_ratio) picked."""
+import pytest
+from matcher import FuzzyMatcher
+
+YEARS = [str(y) for y in range(2016, 2026)]
+SECTORS = ["analytics", "product", "data science", "business intelligence", "research"]
+LOCATIONS = ["mumbai, mh", "pune, mh", "bangalore, ka", "new delhi, dl", "hyderabad, ts", "chennai, tn"]
+QUERIES = ["1999", "2021", "21", "202", "19", "ca", "pune", "bengal", "data", "anal", "resrch",
+           "busines intel", "prod", "x", "qqqq", "new york", "mumbai, mh", "delhi", "zz", "-", "2o2o"]
+
+
+@pytest.mark.parametrize("choices, cutoff", [(YEARS, 60), (SECTORS, 55), (LOCATIONS, 55)])
+def test_matches_fuzzywuzzy(choices, cutoff):
+    fuzzywuzzy = pytest.importorskip("fuzzywuzzy.process")
+    from fuzzywuzzy import fuzz
+    matcher = FuzzyMatcher(choices)
+    for query in QUERIES:
+        best = fuzzywuzzy.extractOne(query, choices, scorer=fuzz.partial_ratio)
+        expected = best if best and best[1] >= cutoff else None
+        assert matcher.match(query, cutoff) == expected, query
+
+
+def test_pinned_matches():
+    assert FuzzyMatcher(YEARS).match("1999", 60) is None
+    assert FuzzyMatcher(YEARS).match("2o21", 60) == ("2021", 75)
+    assert FuzzyMatcher(SECTORS).match("ca", 55) is None
+    assert FuzzyMatcher(SECTORS).match("resrch", 55) == ("research", 67)
+    assert FuzzyMatcher(LOCATIONS).contains("mh") == ("mumbai, mh", "pune, mh")
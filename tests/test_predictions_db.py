@@ -0,0 +1,130 @@
+# tests/test_predictions_db.py
+import sqlite3
+import pytest
+import predictions_db
+from predictions_db import MIGRATIONS, PredictionStore, to_epoch
+
+# predictions table as created before user_version was tracked
+BASELINE_SCHEMA = """
+    CREATE TABLE predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TEXT,
+        job_title TEXT,
+        sector TEXT,
+        rating REAL,
+        location TEXT,
+        skills TEXT,
+        predicted_salary INTEGER,
+        min_salary INTEGER,
+        max_salary INTEGER,
+        confidence INTEGER,
+        recommendations TEXT
+    )
+"""
+SECTORS = ["Analytics", "Research", " data science ", "Analytics"]
+LOCATIONS = ["Mumbai, MH", "Pune, MH", "Delhi, DL"]
+
+
+def prediction(i, day=None):
+    salary = 60000 + 1000 * i
+    return {"ts": f"2025-11-{day or 10 + i % 5:02d} {i % 24:02d}:00:00", "job_title": "Analyst",
+            "sector": SECTORS[i % len(SECTORS)], "rating": 4.0, "location": LOCATIONS[i % len(LOCATIONS)],
+            "skills": "SQL", "predicted_salary": salary, "min_salary": int(salary * 0.9),
+            "max_salary": int(salary * 1.15), "confidence": 50 + i % 40, "recommendations": ["BI Analyst"]}
+
+
+def baseline_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany("""
+        INSERT INTO predictions (
+            ts, job_title, sector, rating, location, skills,
+            predicted_salary, min_salary, max_salary, confidence, recommendations
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    """, [(r["ts"], r["job_title"], r["sector"], r["rating"], r["location"], r["skills"], r["predicted_salary"],
+           r["min_salary"], r["max_salary"], r["confidence"], '["BI Analyst"]') for r in rows])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def user_version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_migrates_baseline_schema(tmp_path):
+    old = [prediction(i) for i in range(20)]
+    store = PredictionStore(baseline_db(tmp_path / "predictions.db", old))
+    assert user_version(store.path) == len(MIGRATIONS)
+    assert store.has_rollups
+
+    with store.connection() as conn:
+        backfilled = conn.execute("SELECT ts, ts_epoch, sector_norm FROM predictions ORDER BY id").fetchall()
+    assert [(ts, epoch) for ts, epoch, _ in backfilled] == [(r["ts"], to_epoch(r["ts"])) for r in old]
+    assert [norm for _, _, norm in backfilled] == [r["sector"].strip().lower() for r in old]
+
+    # New rows reach the rollups through the insert triggers
+    store.save_rows([prediction(i) for i in range(20, 30)])
+    stats = store.stats(group_by=("sector",))
+    assert sum(stats["predictions"]) == 30
+    assert dict(zip(stats["sector"], stats["predictions"]))["data science"] == 7
+
+    rolled = {g: store.stats(group_by=g, sector="a") for g in (("day",), ("day", "sector"))}
+    store.has_rollups = False  # same answers from a scan of the predictions table
+    assert {g: store.stats(group_by=g, sector="a") for g in rolled} == rolled
+
+    rows, _ = store.page(limit=100, sector="SCIENCE", location="pune")
+    assert rows and all(r["sector"] == " data science " and r["location"] == "Pune, MH" for r in rows)
+
+
+def test_failed_migration_is_rolled_back(tmp_path, monkeypatch):
+    path = baseline_db(tmp_path / "predictions.db", [prediction(i) for i in range(3)])
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (x)")
+        conn.execute("INSERT INTO predictions (id) VALUES (1)")  # IntegrityError
+
+    monkeypatch.setattr(predictions_db, "MIGRATIONS", MIGRATIONS[:1] + [broken] + MIGRATIONS[2:])
+    store = PredictionStore(path)
+    assert user_version(path) == 1
+    assert not store.has_rollups
+    with store.connection() as conn:
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchall()
+    assert sum(store.stats()["predictions"]) == 3
+
+    monkeypatch.setattr(predictions_db, "MIGRATIONS", MIGRATIONS)
+    PredictionStore(path)
+    assert user_version(path) == len(MIGRATIONS)
+
+
+def test_cursor_pages_cover_history_once(tmp_path):
+    store = PredictionStore(str(tmp_path / "predictions.db"))
+    # Few distinct timestamps, so pages split ties on the same ts_epoch
+    store.save_rows([prediction(i, day=1 + i % 3) for i in range(57)])
+    with store.connection() as conn:
+        expected = [r[0] for r in conn.execute("SELECT id FROM predictions ORDER BY ts_epoch DESC, id DESC")]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = store.page(limit=10, cursor=cursor)
+        seen += [r["id"] for r in rows]
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == 6
+
+    filtered, cursor = [], None
+    while True:
+        rows, cursor = store.page(limit=4, location="mh", cursor=cursor)
+        filtered += rows
+        if cursor is None:
+            break
+    assert [r["id"] for r in filtered] == [r["id"] for r in store.page(limit=100, location="mh")[0]]
+    assert all(r["location"].endswith("MH") for r in filtered)
+
+    assert store.page(limit=10, cursor="not-a-cursor")[0] == store.page(limit=10)[0]
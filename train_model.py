@@ -1,99 +1,280 @@
 # train_model.py
-import os, json
+"""Train and publish the salary model.
+
+    python train_model.py                  # fixed hyperparameters (fast)
+    python train_model.py --search         # k-fold CV hyperparameter search on all cores
+    python train_model.py --add-trees 100  # warm-start: grow the published forest
+
+The search runs candidates in parallel worker processes (joblib) and caches
+the fitted ColumnTransformer with Pipeline(memory=...), so the one-hot
+encoding is computed once per fold instead of once per candidate. The final
+forest is grown with warm_start until extra trees stop improving its
+out-of-bag score, so the held-out test split is only used for the reported
+metrics. A search run also writes model/training_report.json comparing the
+fixed configuration's training time and score with the tuned result.
+"""
+import os, sys, json, time, shutil, hashlib, argparse, tempfile
 import pandas as pd
+import numpy as np
+import joblib
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, KFold, GridSearchCV
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-import joblib
+from sklearn.metrics import r2_score, mean_absolute_error
+from model_registry import publish_model, MODEL_DIR, META_FILE
 
-# -------------------------------
-# 1. Ensure model folder exists
-# -------------------------------
-os.makedirs("model", exist_ok=True)
+DATA_PATH = "data/data_analyst_jobs.csv"
+REPORT_PATH = os.path.join(MODEL_DIR, "training_report.json")
+CAT_COLS = ['Size', 'Company_Name', 'Sector']
+NUM_COLS = ['Rating', 'Skill_Count']
 
-# -------------------------------
-# 2. Load and clean dataset
-# -------------------------------
-df = pd.read_csv("data/data_analyst_jobs.csv", encoding="utf-8")
+# The configuration this script always trained with
+FIXED_PARAMS = {"n_estimators": 150, "max_depth": 12, "min_samples_split": 4}
 
-# Handle missing / incorrect data types
-df['Avg_Salary'] = pd.to_numeric(df['Avg_Salary'], errors='coerce').fillna(0)
-df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(df['Rating'].median())
-df['Size'] = df['Size'].fillna("Unknown")
-df['Company_Name'] = df['Company_Name'].fillna("Unknown")
-df['Sector'] = df['Sector'].fillna("Unknown")
-df['Skills'] = df['Skills'].fillna("")
+# Searched with a fixed forest size; the winner is then grown with warm_start
+SEARCH_TREES = 100
+PARAM_GRID = {
+    "transform__ohe__min_frequency": [None, 5],  # fold rare companies into one column
+    "rf__max_depth": [8, 12, None],
+    "rf__min_samples_split": [2, 4, 8],
+    "rf__max_features": [1.0, 0.5],
+}
+GROW_STEP = 50
+MAX_TREES = 500
+GROW_TOLERANCE = 0.001  # stop adding trees when out-of-bag R² improves less than this
 
-# Create a new feature: Skill Count
-df['Skill_Count'] = df['Skills'].apply(lambda s: len(str(s).split(';')) if s else 0)
 
 # -------------------------------
-# 3. Define features and target
+# 1. Load and clean dataset
 # -------------------------------
-X = df[['Rating', 'Size', 'Company_Name', 'Sector', 'Skill_Count']]
-y = df['Avg_Salary']
+def load_training_data(path=DATA_PATH):
+    """Return (X, y, df, fingerprint) for the CSV at `path`."""
+    with open(path, "rb") as f:
+        # The app only uses a published model when this matches its loaded dataset
+        fingerprint = hashlib.sha1(f.read()).hexdigest()
+    df = pd.read_csv(path, encoding="utf-8")
 
-# -------------------------------
-# 4. Encode categorical features
-# -------------------------------
-cols_cat = ['Size', 'Company_Name', 'Sector']
+    # Handle missing / incorrect data types
+    df['Avg_Salary'] = pd.to_numeric(df['Avg_Salary'], errors='coerce').fillna(0)
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(df['Rating'].median())
+    df['Size'] = df['Size'].fillna("Unknown")
+    df['Company_Name'] = df['Company_Name'].fillna("Unknown")
+    df['Sector'] = df['Sector'].fillna("Unknown")
+    df['Skills'] = df['Skills'].fillna("")
 
-transformer = ColumnTransformer(
-    transformers=[
-        ('ohe', OneHotEncoder(handle_unknown='ignore'), cols_cat)
-    ],
-    remainder='passthrough'  # keep numeric columns (Rating, Skill_Count)
-)
+    # Create a new feature: Skill Count
+    df['Skill_Count'] = df['Skills'].apply(lambda s: len(str(s).split(';')) if s else 0)
+
+    return df[['Rating', 'Size', 'Company_Name', 'Sector', 'Skill_Count']], df['Avg_Salary'], df, fingerprint
 
-# -------------------------------
-# 5. Build pipeline (preprocess + model)
-# -------------------------------
-pipeline = Pipeline([
-    ('transform', transformer),
-    ('rf', RandomForestRegressor(
-        n_estimators=150,
-        random_state=42,
-        n_jobs=-1,
-        max_depth=12,
-        min_samples_split=4
-    ))
-])
 
 # -------------------------------
-# 6. Train-Test Split
+# 2. Pipeline (preprocess + model)
 # -------------------------------
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
+def build_pipeline(memory=None, n_jobs=-1, **rf_params):
+    transformer = ColumnTransformer(
+        transformers=[
+            ('ohe', OneHotEncoder(handle_unknown='infrequent_if_exist'), CAT_COLS)
+        ],
+        remainder='passthrough'  # keep numeric columns (Rating, Skill_Count)
+    )
+    params = dict(FIXED_PARAMS, **rf_params)
+    return Pipeline([
+        ('transform', transformer),
+        ('rf', RandomForestRegressor(random_state=42, n_jobs=n_jobs, **params))
+    ], memory=memory)
+
+
+def feature_names(pipeline):
+    try:
+        ohe = pipeline.named_steps['transform'].named_transformers_['ohe']
+        return list(ohe.get_feature_names_out(CAT_COLS)) + NUM_COLS
+    except Exception as e:
+        print("⚠️ Could not extract feature names:", e)
+        return list(NUM_COLS)
+
+
+def evaluate(pipeline, X_test, y_test):
+    """Held-out R², MAE and residual std (the app's confidence uses the latter)."""
+    pred = pipeline.predict(X_test)
+    return {"r2": float(r2_score(y_test, pred)), "mae": float(mean_absolute_error(y_test, pred)),
+            "resid_std": float(np.std(y_test.to_numpy() - pred))}
+
 
 # -------------------------------
-# 7. Train the model
+# 3. Hyperparameter search
 # -------------------------------
-print("🚀 Training model, please wait...")
-pipeline.fit(X_train, y_train)
-print("✅ Model training completed successfully.")
+def search(X_train, y_train, folds=5, n_jobs=-1):
+    """k-fold CV grid search; returns (best params, cv summary)."""
+    cache_dir = tempfile.mkdtemp(prefix="salary_pipeline_cache_")
+    try:
+        # Trees run single-threaded inside each worker: parallelism is across candidates
+        pipeline = build_pipeline(memory=joblib.Memory(cache_dir, verbose=0), n_jobs=1,
+                                  n_estimators=SEARCH_TREES)
+        grid = GridSearchCV(pipeline, PARAM_GRID, scoring="r2", n_jobs=n_jobs,
+                            cv=KFold(folds, shuffle=True, random_state=42))
+        grid.fit(X_train, y_train)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    i = grid.best_index_
+    return grid.best_params_, {
+        "folds": folds,
+        "candidates": len(grid.cv_results_["params"]),
+        "cv_r2_mean": float(grid.cv_results_["mean_test_score"][i]),
+        "cv_r2_std": float(grid.cv_results_["std_test_score"][i]),
+    }
+
+
+def split_params(params):
+    """GridSearchCV-style params → (transformer params, forest params)."""
+    transform = {k: v for k, v in params.items() if k.startswith("transform__")}
+    rf = {k[len("rf__"):]: v for k, v in params.items() if k.startswith("rf__")}
+    return transform, rf
+
 
 # -------------------------------
-# 8. Save model and metadata
+# 4. Warm-start tree growth
 # -------------------------------
-joblib.dump(pipeline, "model/salary_model.pkl")
+def grow_forest(pipeline, X_train, y_train, step=GROW_STEP, max_trees=MAX_TREES, tol=GROW_TOLERANCE):
+    """Add `step` trees at a time (warm_start) while out-of-bag R² keeps improving.
 
-# Extract one-hot feature names (optional)
-try:
-    ohe = pipeline.named_steps['transform'].named_transformers_['ohe']
-    feature_names = list(ohe.get_feature_names_out(cols_cat)) + ['Rating', 'Skill_Count']
-except Exception as e:
-    print("⚠️ Could not extract feature names:", e)
-    feature_names = ['Rating', 'Skill_Count']
+    Each tree is scored on the training rows it did not see, so the test split
+    is left for the final evaluate(). A step that falls short of `tol` is
+    dropped again. The forest must have been fitted with oob_score=True.
+    """
+    rf = pipeline.named_steps['rf']
+    rf.set_params(warm_start=True)
+    Xt_train = pipeline.named_steps['transform'].transform(X_train)
+    best = rf.oob_score_
+    while rf.n_estimators + step <= max_trees:
+        rf.set_params(n_estimators=rf.n_estimators + step)
+        rf.fit(Xt_train, y_train)  # only the new trees are fitted
+        score = rf.oob_score_
+        print(f"🌲 {rf.n_estimators} trees → OOB R² {score:.4f}")
+        if score - best < tol:
+            del rf.estimators_[-step:]  # keep the best forest found
+            rf.set_params(n_estimators=len(rf.estimators_))
+            break
+        best = score
+    rf.set_params(warm_start=False)
+    return pipeline
 
-with open("model/feature_columns.json", "w") as f:
-    json.dump(feature_names, f)
 
-print("💾 Model saved as → model/salary_model.pkl")
-print("📋 Feature columns saved → model/feature_columns.json")
+def load_published(fingerprint):
+    """The published pipeline if it was trained on this dataset version, else None."""
+    try:
+        with open(os.path.join(MODEL_DIR, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dataset_fingerprint") != fingerprint:
+            return None
+        return joblib.load(os.path.join(MODEL_DIR, meta["artifact"])), meta
+    except (OSError, ValueError, KeyError):
+        return None
+
 
 # -------------------------------
-# 9. Optional: Evaluate accuracy
+# 5. Publish to the app's model registry
 # -------------------------------
-r2 = pipeline.score(X_test, y_test)
-print(f"📊 Model R² Score: {r2:.3f}")
+def publish(pipeline, y, df, fingerprint, metrics, params, extra=None):
+    names = feature_names(pipeline)
+    with open(os.path.join(MODEL_DIR, "feature_columns.json"), "w") as f:
+        json.dump(names, f)
+
+    # Residual std and sector classes are precomputed here so the app can score
+    # and derive confidence without touching the dataset per request. The residuals
+    # are on the held-out split: on training rows a forest's are close to zero.
+    meta = {
+        "dataset_fingerprint": fingerprint,
+        "classes": sorted(df["Sector"].astype(str).unique().tolist()),
+        "resid_std": metrics["resid_std"],
+        "y_mean": float(y.mean()),
+        "n_train": int(len(df)),
+        "median_salary": float(y.median()),
+        "feature_columns": names,
+        "r2": metrics["r2"],
+        "metrics": metrics,
+        "params": params,
+    }
+    meta.update(extra or {})
+    artifact = publish_model(pipeline, meta)
+    print("💾 Model published →", artifact)
+    print("📋 Feature columns saved → model/feature_columns.json")
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and publish the salary model.")
+    parser.add_argument("--search", action="store_true", help="k-fold CV hyperparameter search")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="worker processes (-1 = all cores)")
+    parser.add_argument("--add-trees", type=int, default=0, help="warm-start: grow the published forest")
+    args = parser.parse_args(argv)
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    X, y, df, fingerprint = load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
+
+    if args.add_trees:
+        published = load_published(fingerprint)
+        if published is None:
+            print("❌ No published model for this dataset; train one first.")
+            return 1
+        pipeline, meta = published
+        rf = pipeline.named_steps['rf']
+        t0 = time.perf_counter()
+        rf.set_params(warm_start=True, n_estimators=rf.n_estimators + args.add_trees)
+        rf.fit(pipeline.named_steps['transform'].transform(X_train), y_train)
+        rf.set_params(warm_start=False)
+        metrics = dict(evaluate(pipeline, X_test, y_test), train_seconds=time.perf_counter() - t0)
+        print(f"🌲 Grew forest to {rf.n_estimators} trees in {metrics['train_seconds']:.1f}s, R² {metrics['r2']:.3f}")
+        publish(pipeline, y, df, fingerprint, metrics, dict(meta.get("params") or {}, n_estimators=rf.n_estimators))
+        return 0
+
+    print("🚀 Training model, please wait...")
+    t0 = time.perf_counter()
+    fixed = build_pipeline().fit(X_train, y_train)
+    fixed_seconds = time.perf_counter() - t0
+    fixed_metrics = dict(evaluate(fixed, X_test, y_test), train_seconds=fixed_seconds)
+    print(f"📊 Fixed configuration: R² {fixed_metrics['r2']:.3f} in {fixed_seconds:.1f}s")
+
+    if not args.search:
+        print("✅ Model training completed successfully.")
+        publish(fixed, y, df, fingerprint, fixed_metrics, FIXED_PARAMS)
+        return 0
+
+    t0 = time.perf_counter()
+    best, cv = search(X_train, y_train, folds=args.folds, n_jobs=args.jobs)
+    search_seconds = time.perf_counter() - t0
+    print(f"🔎 Searched {cv['candidates']} candidates × {args.folds} folds in {search_seconds:.1f}s → {best}")
+
+    t0 = time.perf_counter()
+    transform_params, rf_params = split_params(best)
+    tuned = build_pipeline(n_estimators=SEARCH_TREES, oob_score=True, **rf_params)
+    tuned.set_params(**transform_params)
+    tuned.fit(X_train, y_train)
+    grow_forest(tuned, X_train, y_train)
+    tuned_seconds = time.perf_counter() - t0
+    tuned_metrics = dict(evaluate(tuned, X_test, y_test), train_seconds=tuned_seconds, **cv)
+    print(f"📊 Tuned model: R² {tuned_metrics['r2']:.3f} ({tuned.named_steps['rf'].n_estimators} trees)")
+
+    params = dict(best, n_estimators=tuned.named_steps['rf'].n_estimators)
+    report = {
+        "dataset_fingerprint": fingerprint,
+        "rows": int(len(df)),
+        "cpu_count": os.cpu_count(),
+        "fixed": {"params": FIXED_PARAMS, **fixed_metrics},
+        "search": {"seconds": search_seconds, "grid": {k: [str(v) for v in vs] for k, vs in PARAM_GRID.items()}, **cv},
+        "tuned": {"params": {k: str(v) for k, v in params.items()}, **tuned_metrics},
+    }
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("📝 Training report →", REPORT_PATH)
+
+    publish(tuned, y, df, fingerprint, tuned_metrics, {k: str(v) for k, v in params.items()})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# warmup.py
+"""Background warm-up of per-version state.
+
+A WarmupWorker thread polls `is_stale()` (cheap stat checks of the CSV, the
+delta log, the snapshot and the model metadata) every `interval` seconds and
+runs `warm()` whenever it reports a change, and once at start-up. warm()
+builds the next version's indexes and default responses and publishes them
+in one swap, so requests keep being served from the previous, already warm
+version meanwhile. warm() returns the version it warmed.
+
+`ready` turns true after the first successful warm-up; /readyz reports it so
+a load balancer only sends traffic to warmed workers.
+"""
+import time, logging, threading
+
+WARMUP_INTERVAL = 2.0  # seconds between change checks
+
+log = logging.getLogger(__name__)
+
+
+class WarmupWorker:
+    """Re-runs warm() off the request path whenever is_stale() says so."""
+
+    def __init__(self, warm, is_stale, interval=WARMUP_INTERVAL):
+        self.warm = warm
+        self.is_stale = is_stale
+        self.interval = interval
+        self.ready = False
+        self.warming = False
+        self.version = None
+        self.warmed_at = None
+        self.duration = None
+        self.runs = 0
+        self.error = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self._thread.join()
+            return True
+
+    def run_once(self):
+        """Warm up now (in the calling thread); returns the warmed version, or None on failure."""
+        self.warming = True
+        t0 = time.perf_counter()
+        try:
+            version = self.warm()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            log.exception("Warm-up failed")
+            return None
+        finally:
+            self.warming = False
+        self.duration = time.perf_counter() - t0
+        self.version, self.warmed_at, self.error = version, time.time(), None
+        self.runs += 1
+        self.ready = True
+        log.info("🔥 Warmed up %s in %.2fs", version, self.duration)
+        return version
+
+    def _run(self):
+        while True:
+            stale = self.error is not None or not self.ready
+            if not stale:
+                try:
+                    stale = self.is_stale()
+                except Exception as e:
+                    log.warning("Warm-up change check failed: %s", e)
+            if stale:
+                self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def status(self):
+        return {"ready": self.ready, "warming": self.warming, "running": self.running,
+                "version": self.version, "warmed_at": self.warmed_at,
+                "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+                "runs": self.runs, "error": self.error, "interval_s": self.interval}